@@ -1,480 +1,726 @@
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-import csv
-from abc import ABC, abstractmethod
-
-# ---------------- Abstract Parent Class ----------------
-class Person(ABC):
-    def __init__(self, pid, name):
-        self.__id = pid  # private student id
-        self.__name = name  # private student name
-
-    def get_id(self):
-        return self.__id  # get id
-
-    def get_name(self):
-        return self.__name  # get name
-
-    @abstractmethod
-    def summary(self):
-        pass  # abstract method (to be defined by subclass)
-
-# ---------------- Application ----------------
-class GradeCalculatorApp:
-    def __init__(self, root):
-        # main window setup
-        self.root = root
-        self.root.title("Student Grade Calculator")
-        self.root.geometry("1050x700")
-        self.root.config(bg="#F5F7FA")
-
-        # data storage
-        self.students = {}  # all students data
-        self.editing_id = None  # id being edited
-        self.editing_year = None  # year being edited
-
-        # available years and modules
-        self.year_modules = {
-            "Year 1": ["Problem Solving and Programming", "Operating System", "Information Security", "Networking"],
-            "Year 2": ["Computer Hardware", "Human-Computer Interaction and Web Development", "Algorithms and Data Structure", "Communications"],
-            "Year 3": ["Big Data", "Internet of Things", "Contemporary Issues in Computing", "Project"]
-        }
-
-        # theme colors
-        self.primary = "#4C51BF"
-        self.secondary = "#667EEA"
-        self.bg_color = "#F5F7FA"
-        self.card_color = "#FFFFFF"
-        self.text_color = "#1A202C"
-
-        # style setup
-        style = ttk.Style()
-        try:
-            style.theme_use("clam")
-        except Exception:
-            pass
-        style.configure("TLabel", background=self.bg_color, foreground=self.text_color, font=("Arial", 9, "bold"))
-        style.configure("TButton", background=self.primary, foreground="white", font=("Arial", 9, "bold"), padding=4)
-        style.map("TButton", background=[("active", self.secondary)])
-        style.configure("Treeview.Heading", font=("Arial", 9, "bold"), background=self.primary, foreground="white")
-        style.configure("Treeview", font=("Arial", 9), rowheight=20, background="white", fieldbackground="white")
-
-        # header label
-        header = tk.Label(root, text="Coventry University London (Dagenham)", bg=self.primary, fg="white",
-                          font=("Arial", 13, "bold"), pady=8)
-        header.pack(fill="x")
-
-        # input section frame
-        input_frame = tk.LabelFrame(root, text="Student Details", bg=self.card_color, padx=8, pady=8,
-                                    font=("Arial", 9, "bold"))
-        input_frame.pack(fill="x", padx=8, pady=6)
-
-        # student id input
-        ttk.Label(input_frame, text="Student ID:").grid(row=0, column=0, padx=4, pady=3, sticky="w")
-        self.id_entry = ttk.Entry(input_frame, width=18)
-        self.id_entry.grid(row=0, column=1, padx=4, pady=3)
-
-        # student name input
-        ttk.Label(input_frame, text="Name:").grid(row=1, column=0, padx=4, pady=3, sticky="w")
-        self.name_entry = ttk.Entry(input_frame, width=18)
-        self.name_entry.grid(row=1, column=1, padx=4, pady=3)
-
-        # year selection
-        ttk.Label(input_frame, text="Year:").grid(row=2, column=0, padx=4, pady=3, sticky="w")
-        self.year_combobox = ttk.Combobox(input_frame, values=list(self.year_modules.keys()), state="readonly", width=40)
-        self.year_combobox.current(0)
-        self.year_combobox.grid(row=2, column=1, padx=4, pady=3, columnspan=2, sticky="w")
-        self.year_combobox.bind("<<ComboboxSelected>>", self.show_modules)
-
-        # frame for module marks
-        self.modules_frame = tk.LabelFrame(input_frame, text="Modules & Marks", bg=self.card_color,
-                                           font=("Arial", 9, "bold"), padx=8, pady=8)
-        self.modules_frame.grid(row=0, column=3, rowspan=4, padx=8, pady=4)
-        self.module_entries = {}
-        self.show_modules()  # show modules for selected year
-
-        # add/update and clear buttons
-        tk.Button(input_frame, text="➕ Add/Update", bg=self.primary, fg="white", font=("Arial", 9, "bold"),
-                  relief="flat", width=15, command=self.add_student).grid(row=0, column=4, padx=6, pady=3)
-        tk.Button(input_frame, text="🧹 Clear", bg=self.secondary, fg="white", font=("Arial", 9, "bold"),
-                  relief="flat", width=15, command=self.clear_inputs).grid(row=1, column=4, padx=6, pady=3)
-
-        # table frame
-        table_frame = tk.LabelFrame(root, text="Student Records", bg=self.card_color, padx=6, pady=6,
-                                    font=("Arial", 9, "bold"))
-        table_frame.pack(fill="both", expand=False, padx=8, pady=4)
-
-        # columns for table
-        columns = ("ID", "Name", "Year", "Modules", "Average", "Grade", "Remark", "Weighted Avg")
-        self.tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=8)
-        for col in columns:
-            self.tree.heading(col, text=col)
-            width = 120
-            if col == "Name": width = 180
-            if col == "Modules": width = 140
-            if col == "Remark": width = 160
-            if col == "Weighted Avg": width = 160
-            self.tree.column(col, width=width, anchor="center")
-
-        # row colors
-        self.tree.tag_configure("evenrow", background="#EEF2FF")
-        self.tree.tag_configure("oddrow", background="white")
-
-        # scrollbars
-        vsb = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
-        hsb = ttk.Scrollbar(table_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscroll=vsb.set, xscroll=hsb.set)
-        vsb.pack(side="right", fill="y")
-        hsb.pack(side="bottom", fill="x")
-        self.tree.pack(fill="both", expand=True)
-
-        # button row for actions
-        btn_frame = tk.Frame(root, bg=self.bg_color, pady=5)
-        btn_frame.pack(fill="x", padx=8, pady=4)
-
-        # all buttons
-        buttons = [
-            ("📄 Report", self.show_report, self.primary),
-            ("✏️ Edit", self.edit_student, self.secondary),
-            ("🗑️ Delete", self.delete_student, "#E53E3E"),
-            ("💾 Save CSV", self.save_to_csv, "#2F855A"),
-            ("📂 Load CSV", self.load_from_csv, "#3182CE"),
-            ("🔄 Reset", self.reset_all, "#38B2AC"),
-            ("🌐 Overall Visualization", self.visualize_overall, "#805AD5")
-        ]
-        for text, cmd, color in buttons:
-            tk.Button(btn_frame, text=text, bg=color, fg="white", font=("Arial", 9, "bold"),
-                      relief="flat", width=16, command=cmd).pack(side="left", padx=3)
-
-        # report section (bottom)
-        report_frame = tk.LabelFrame(root, text="📊 Student Report", bg=self.card_color, padx=8, pady=8,
-                                     font=("Arial", 9, "bold"))
-        report_frame.pack(fill="both", expand=True, padx=8, pady=4)
-
-        # scroll bar for report box
-        report_scroll = ttk.Scrollbar(report_frame, orient="vertical")
-        report_scroll.pack(side="right", fill="y")
-
-        # text area for report
-        self.report_text = tk.Text(report_frame, width=110, height=10, wrap="word", bg="#FFFFFF",
-                                   fg=self.text_color, font=("Consolas", 10), relief="solid", borderwidth=1,
-                                   yscrollcommand=report_scroll.set)
-        report_scroll.config(command=self.report_text.yview)
-        self.report_text.insert(tk.END, "Add students, then click 'Report'.")
-        self.report_text.config(state="disabled")
-        self.report_text.pack(fill="both", expand=True)
-
-    # ---------------- Display modules ----------------
-    def show_modules(self, event=None):
-        # show modules for the selected year
-        for widget in self.modules_frame.winfo_children():
-            widget.destroy()
-        self.module_entries.clear()
-        selected_year = self.year_combobox.get()
-        modules = self.year_modules.get(selected_year, [])
-        for i, mod in enumerate(modules):
-            ttk.Label(self.modules_frame, text=mod + ":").grid(row=i, column=0, padx=4, pady=2, sticky="w")
-            entry = ttk.Entry(self.modules_frame, width=12)
-            entry.grid(row=i, column=1, padx=4, pady=2)
-            self.module_entries[mod] = entry
-
-    # ---------------- Calculate grade ----------------
-    def calculate_grade(self, marks):
-        # calculate average and grade
-        average = sum(marks)/len(marks) if marks else 0
-        if any(m<40 for m in marks): return average, "F", "Fail - Resit Required"
-        if average>=70: return average,"A","Excellent"
-        elif average>=60: return average,"B","Very Good"
-        elif average>=50: return average,"C","Good"
-        elif average>=40: return average,"D","Pass"
-        else: return average,"F","Fail - Resit Required"
-
-    # ---------------- Compute weighted avg ----------------
-    def compute_weighted_avg(self, record):
-        # compute weighted average per year
-        year_avgs = {}
-        for y, data in record["year_data"].items():
-            avg, _, _ = self.calculate_grade(data["marks"])
-            year_avgs[y] = avg
-        return year_avgs
-
-    # ---------------- Add / Update student ----------------
-    def add_student(self):
-        try:
-            # get input data
-            sid = self.id_entry.get().strip()
-            name = self.name_entry.get().strip()
-            year = self.year_combobox.get()
-            sid = str(sid)
-
-            # validate id
-            if not sid or not sid.isdigit():
-                messagebox.showerror("Input Error","Student ID must be numeric."); return
-
-            # validate name
-            if not name or not all(c.isalpha() or c.isspace() for c in name):
-                messagebox.showerror("Input Error","Name must contain only letters/spaces."); return
-
-            # get marks
-            modules = list(self.module_entries.keys())
-            marks=[]
-            for mod in modules:
-                raw = self.module_entries[mod].get().strip()
-                if raw=="": raise ValueError("Empty mark")
-                val=float(raw)
-                if val<0 or val>100: raise ValueError("Out of range")
-                marks.append(val)
-        except ValueError:
-            messagebox.showerror("Input Error","Marks must be numbers between 0 and 100 for all modules."); return
-        except Exception as e:
-            messagebox.showerror("Unexpected Error", f"An unexpected error occurred: {e}"); return
-
-        # if editing existing record
-        if self.editing_id:
-            record = self.students[self.editing_id]
-            record["year_data"][self.editing_year]={"modules":modules,"marks":marks}
-            all_marks = [m for y in record["year_data"].values() for m in y["marks"]]
-            record["average"], record["grade"], record["remark"] = self.calculate_grade(all_marks)
-            year_avgs = self.compute_weighted_avg(record)
-            weighted_avg_text = " | ".join([f"{y}: {avg:.2f}" for y, avg in year_avgs.items()])
-            for item in self.tree.get_children():
-                if str(self.tree.item(item)["values"][0])==self.editing_id:
-                    self.tree.item(item, values=(self.editing_id, record["name"], ", ".join(record["year_data"].keys()), len(all_marks),
-                                                 f"{record['average']:.2f}", record["grade"], record["remark"], weighted_avg_text))
-                    break
-            self.editing_id = None
-            self.editing_year = None
-            messagebox.showinfo("Updated", f"Marks updated for {record['name']} ({year}).")
-            self.clear_inputs()
-            return
-
-        # if student exists (adding new year)
-        if sid in self.students:
-            existing = self.students[sid]
-            if existing["name"] != name:
-                messagebox.showerror("Error", f"Student ID {sid} already exists with a different name ({existing['name']})."); return
-            if year in existing["year_data"]:
-                messagebox.showerror("Error", f"Student ID {sid} with Name {name} already has marks for {year}."); return
-
-            # add new year data
-            existing["year_data"][year] = {"modules": modules, "marks": marks}
-            all_marks = [m for y in existing["year_data"].values() for m in y["marks"]]
-            existing["average"], existing["grade"], existing["remark"] = self.calculate_grade(all_marks)
-            year_avgs = self.compute_weighted_avg(existing)
-            weighted_avg_text = " | ".join([f"{y}: {avg:.2f}" for y, avg in year_avgs.items()])
-            for item in self.tree.get_children():
-                if str(self.tree.item(item)["values"][0]) == sid:
-                    self.tree.item(item, values=(sid, name, ", ".join(existing["year_data"].keys()), len(all_marks),
-                                                 f"{existing['average']:.2f}", existing["grade"], existing["remark"], weighted_avg_text))
-                    break
-            messagebox.showinfo("Added Year", f"Added marks for {year} to student {name}.")
-            self.clear_inputs()
-            return
-
-        # new student data
-        avg,grade,remark=self.calculate_grade(marks)
-        self.students[sid]={"name":name,"year_data":{year:{"modules":modules,"marks":marks}},"average":avg,"grade":grade,"remark":remark}
-        year_avgs=self.compute_weighted_avg(self.students[sid])
-        weighted_avg_text=" | ".join([f"{y}: {avg:.2f}" for y, avg in year_avgs.items()])
-        tag="evenrow" if len(self.students)%2==0 else "oddrow"
-        self.tree.insert("", "end", values=(sid, name, year, len(marks),
-                                            f"{avg:.2f}", grade, remark, weighted_avg_text), tags=(tag,))
-        self.clear_inputs()
-
-    # ---------------- Edit student ----------------
-    def edit_student(self):
-        # get selected record
-        selected = self.tree.selection()
-        if not selected:
-            messagebox.showwarning("Select", "Select a student to edit.")
-            return
-
-        sid = str(self.tree.item(selected[0])["values"][0])
-        if sid not in self.students:
-            messagebox.showerror("Error", f"Student ID {sid} not found.")
-            return
-
-        record = self.students[sid]
-        self.editing_id = sid
-
-        # fill form with existing data
-        self.id_entry.delete(0, tk.END)
-        self.id_entry.insert(0, sid)
-        self.name_entry.delete(0, tk.END)
-        self.name_entry.insert(0, record["name"])
-
-        # populate years
-        years_list = list(record["year_data"].keys())
-        self.year_combobox.config(values=years_list)
-        self.year_combobox.set(years_list[0])
-        self.editing_year = self.year_combobox.get()
-
-        # bind year selection
-        self.year_combobox.bind("<<ComboboxSelected>>", self.on_year_select_edit)
-
-        # show modules and marks
-        self.show_modules()
-        self.populate_marks_for_year(self.editing_year, record)
-
-        messagebox.showinfo("Edit Mode", "Select the year to edit, modify marks, and click 'Add/Update'.")
-
-    # ---------------- Year select callback ----------------
-    def on_year_select_edit(self, event):
-        if not self.editing_id: return
-        self.editing_year=self.year_combobox.get()
-        record=self.students[self.editing_id]
-        self.populate_marks_for_year(self.editing_year, record)
-
-    # ---------------- Populate marks ----------------
-    def populate_marks_for_year(self, year, record):
-        # show marks for selected year
-        self.show_modules()
-        if year not in record["year_data"]: return
-        data = record["year_data"][year]
-        for i, mod in enumerate(self.year_modules[year]):
-            if mod in self.module_entries:
-                self.module_entries[mod].delete(0, tk.END)
-                self.module_entries[mod].insert(0, str(data["marks"][i]))
-
-    # ---------------- Delete student ----------------
-    def delete_student(self):
-        selected=self.tree.selection()
-        if not selected: messagebox.showwarning("Select","Select a student to delete."); return
-        sid=str(self.tree.item(selected[0])["values"][0])
-        if sid not in self.students: messagebox.showerror("Error",f"Student ID {sid} not found."); return
-        confirm=messagebox.askyesno("Confirm",f"Are you sure you want to delete student ID {sid}?")
-        if not confirm: return
-        del self.students[sid]
-        self.tree.delete(selected[0])
-        messagebox.showinfo("Deleted", f"Student ID {sid} deleted.")
-
-    # ---------------- Clear inputs ----------------
-    def clear_inputs(self):
-        # clear all input fields
-        self.id_entry.delete(0, tk.END)
-        self.name_entry.delete(0, tk.END)
-        for e in self.module_entries.values():
-            e.delete(0, tk.END)
-        self.year_combobox.config(values=list(self.year_modules.keys()))
-        self.year_combobox.current(0)
-        self.show_modules()
-        self.editing_id=None
-        self.editing_year=None
-
-    # ---------------- Show report ----------------
-    def show_report(self):
-        # generate student report
-        if not self.students: messagebox.showwarning("No Data","No students added yet."); return
-        self.report_text.config(state="normal")
-        self.report_text.delete(1.0, tk.END)
-        self.report_text.insert(tk.END,"----- 📊 Student Grade Report -----\n\n")
-        for sid,s in self.students.items():
-            all_marks = [m for y in s["year_data"].values() for m in y["marks"]]
-            overall_avg, overall_grade, overall_remark = self.calculate_grade(all_marks)
-            for y,data in s["year_data"].items():
-                mods=", ".join(f"{m}:{mark}" for m, mark in zip(data["modules"],data["marks"]))
-                self.report_text.insert(tk.END,f"ID:{sid} | Name:{s['name']} | Year:{y}\nModules:{mods}\n\n")
-            self.report_text.insert(tk.END,f"Overall Average:{overall_avg:.2f} | Grade:{overall_grade} ({overall_remark})\n")
-            self.report_text.insert(tk.END,"-------------------------------------------\n\n")
-        self.report_text.config(state="disabled")
-
-    # ---------------- Reset ----------------
-    def reset_all(self):
-        # clear all data
-        self.students.clear()
-        self.tree.delete(*self.tree.get_children())
-        self.report_text.config(state="normal")
-        self.report_text.delete(1.0, tk.END)
-        self.report_text.insert(tk.END,"Add students, then click 'Report'.")
-        self.report_text.config(state="disabled")
-        self.editing_id=None
-        self.editing_year=None
-
-    # ---------------- Save CSV ----------------
-    def save_to_csv(self):
-        # save all student data to csv file
-        if not self.students: messagebox.showwarning("No Data","No student data to save."); return
-        file_path=filedialog.asksaveasfilename(defaultextension=".csv",filetypes=[("CSV files","*.csv")])
-        if not file_path: return
-        try:
-            with open(file_path,"w",newline="",encoding="utf-8") as f:
-                writer=csv.writer(f)
-                writer.writerow(["ID","Name","Year_Data","Average","Grade","Remark"])
-                for sid,s in self.students.items():
-                    year_data_str=";".join([f"{y}:{'|'.join(data['modules'])}:{'|'.join(map(str,data['marks']))}" for y,data in s["year_data"].items()])
-                    writer.writerow([sid,s["name"],year_data_str,f"{s['average']:.2f}",s["grade"],s["remark"]])
-            messagebox.showinfo("Saved",f"Data saved to {file_path}")
-        except Exception as e:
-            messagebox.showerror("Error",f"Failed to save file: {e}")
-
-    # ---------------- Load CSV ----------------
-    def load_from_csv(self):
-        # load student data from csv file
-        file_path=filedialog.askopenfilename(filetypes=[("CSV files","*.csv")])
-        if not file_path: return
-        try:
-            with open(file_path,"r",encoding="utf-8") as f:
-                reader=csv.DictReader(f)
-                self.students.clear()
-                for row in reader:
-                    year_data={}
-                    for ydata in row["Year_Data"].split(";"):
-                        if not ydata: continue
-                        y,m_str,marks_str=ydata.split(":")
-                        year_data[y]={"modules":m_str.split("|"),"marks":list(map(float,marks_str.split("|")))}
-                    self.students[row["ID"]]={"name":row["Name"],"year_data":year_data,"average":float(row["Average"]),"grade":row["Grade"],"remark":row["Remark"]}
-            self.tree.delete(*self.tree.get_children())
-            for i,(sid,s) in enumerate(self.students.items()):
-                tag="evenrow" if i%2==0 else "oddrow"
-                year_avgs=self.compute_weighted_avg(s)
-                weighted_avg_text=" | ".join([f"{y}: {avg:.2f}" for y,avg in year_avgs.items()])
-                self.tree.insert("", "end", values=(sid,s["name"],", ".join(s["year_data"].keys()), sum(len(d['marks']) for d in s['year_data'].values()),
-                                                    f"{s['average']:.2f}", s["grade"], s["remark"], weighted_avg_text), tags=(tag,))
-            messagebox.showinfo("Loaded",f"Data loaded from {file_path}")
-        except Exception as e:
-            messagebox.showerror("Error",f"Failed to load file: {e}")
-
-          # ---------------- Visualization ----------------
-    def visualize_overall(self):
-        import pandas as pd
-        import matplotlib.pyplot as plt
-
-        if not self.students:
-            messagebox.showwarning("No Data", "No student data to visualize.")
-            return
-
-        # Prepare data
-        data = []
-        for sid, s in self.students.items():
-            data.append({
-                "ID": sid,
-                "Name": s["name"],
-                "Average": s["average"],
-                "Grade": s["grade"]
-            })
-        df = pd.DataFrame(data)
-
-        # Grade distribution (pie chart)
-        grade_counts = df["Grade"].value_counts()
-        plt.figure(figsize=(10, 4))
-
-        plt.subplot(1, 2, 1)
-        plt.pie(grade_counts, labels=grade_counts.index, autopct="%1.1f%%", startangle=140)
-        plt.title("Grade Distribution")
-
-        # Average marks (bar chart)
-        plt.subplot(1, 2, 2)
-        plt.bar(df["Name"], df["Average"])
-        plt.xticks(rotation=45, ha="right")
-        plt.title("Average Marks per Student")
-        plt.ylabel("Average (%)")
-        plt.tight_layout()
-
-        plt.show()
-# ---------------- Run ----------------
-if __name__=="__main__":
-    # create main window and run app
-    root=tk.Tk()
-    app=GradeCalculatorApp(root)
-    root.mainloop()
-
+import os
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+# Person lives in grading_engine now, imported here so older imports keep working
+from grading_engine import (DEFAULT_CATALOG, Person, Gradebook, GradebookError,
+                            weighted_avg_text, validate_id, validate_name, parse_marks)
+from grading_scheme import DEFAULT_SCHEME, load_config
+from batch_grading import regrade_cohort
+from classification import DEFAULT_RULES, DegreeClassifier, degree_text, find_classifier, load_rules
+from columnar_store import ColumnarStore
+from csv_io import BUFFER_SIZE, atomic_write, load_students, write_error_report, write_students
+from bulk_ingest import ingest_files
+from snapshot import Snapshot, write_snapshot
+from sqlite_store import DB_EXT, SQLiteStore, write_database
+from virtual_table import VirtualTable
+from background import PROGRESS_EVERY, BackgroundTask, prewarm, with_progress
+from report import ReportView, export_report, report_blocks
+from search_index import StudentIndex, find_index
+from charts import DETAIL_LIMIT, cohort_bins, draw_charts
+
+SNAPSHOT_EXT = ".sgcs"
+FILE_TYPES = [("CSV files","*.csv"), ("Snapshot files","*"+SNAPSHOT_EXT), ("Database files","*"+DB_EXT)]
+REPORT_TYPES = [("Text files","*.txt"), ("HTML files","*.html")]
+REPORT_HINT = "Add students, then click 'Report'."
+SEARCH_DELAY_MS = 150  # typing pause before the table is filtered
+CHART_MODULES = ("matplotlib.pyplot", "matplotlib.backends.backend_tkagg")  # imported in the background
+PREWARM_DELAY_MS = 500  # after the window is up
+VERIFY_GRADES = True  # recompute the stored grades of loaded CSV files (default scheme only, see apply_scheme)
+LOAD_ERRORS_SHOWN = 10  # row errors listed in the load dialog, the rest are in the saved report
+GRADING_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "grading.json")  # scheme and modules
+
+# ---------------- Application ----------------
+class GradeCalculatorApp:
+    def __init__(self, root):
+        # main window setup
+        self.root = root
+        self.root.title("Student Grade Calculator")
+        self.root.geometry("1050x700")
+        self.root.config(bg="#F5F7FA")
+
+        # grading rules, module catalog and degree classification (grading.json, defaults without one)
+        self.scheme, self.catalog, self.rules = self.load_grading_config()
+
+        # data storage
+        self.gradebook = self.new_gradebook(ColumnarStore())  # grading engine (no GUI needed), array-backed records
+        self.students = self.gradebook.students  # all students data
+        self.index = find_index(self.gradebook)  # name/grade/year/average indexes for the search bar
+        self.classifier = find_classifier(self.gradebook)  # credit-weighted year results and degree class (cached)
+        self.search_job = None  # pending live search
+        self.editing_id = None  # id being edited
+        self.editing_year = None  # year being edited
+        self.task = None  # running background task (load, save, report, ...)
+        self.chart_bins = None  # (stats version, CohortBins) of the last aggregated charts
+
+        # available years and modules
+        self.year_modules = {y: list(mods) for y, mods in self.catalog.year_modules.items()}
+
+        # theme colors
+        self.primary = "#4C51BF"
+        self.secondary = "#667EEA"
+        self.bg_color = "#F5F7FA"
+        self.card_color = "#FFFFFF"
+        self.text_color = "#1A202C"
+
+        # style setup
+        style = ttk.Style()
+        try:
+            style.theme_use("clam")
+        except Exception:
+            pass
+        style.configure("TLabel", background=self.bg_color, foreground=self.text_color, font=("Arial", 9, "bold"))
+        style.configure("TButton", background=self.primary, foreground="white", font=("Arial", 9, "bold"), padding=4)
+        style.map("TButton", background=[("active", self.secondary)])
+        style.configure("Treeview.Heading", font=("Arial", 9, "bold"), background=self.primary, foreground="white")
+        style.configure("Treeview", font=("Arial", 9), rowheight=20, background="white", fieldbackground="white")
+
+        # header label
+        header = tk.Label(root, text="Coventry University London (Dagenham)", bg=self.primary, fg="white",
+                          font=("Arial", 13, "bold"), pady=8)
+        header.pack(fill="x")
+
+        # input section frame
+        input_frame = tk.LabelFrame(root, text="Student Details", bg=self.card_color, padx=8, pady=8,
+                                    font=("Arial", 9, "bold"))
+        input_frame.pack(fill="x", padx=8, pady=6)
+
+        # student id input
+        ttk.Label(input_frame, text="Student ID:").grid(row=0, column=0, padx=4, pady=3, sticky="w")
+        self.id_entry = ttk.Entry(input_frame, width=18)
+        self.id_entry.grid(row=0, column=1, padx=4, pady=3)
+
+        # student name input
+        ttk.Label(input_frame, text="Name:").grid(row=1, column=0, padx=4, pady=3, sticky="w")
+        self.name_entry = ttk.Entry(input_frame, width=18)
+        self.name_entry.grid(row=1, column=1, padx=4, pady=3)
+
+        # year selection
+        ttk.Label(input_frame, text="Year:").grid(row=2, column=0, padx=4, pady=3, sticky="w")
+        self.year_combobox = ttk.Combobox(input_frame, values=list(self.year_modules.keys()), state="readonly", width=40)
+        self.year_combobox.current(0)
+        self.year_combobox.grid(row=2, column=1, padx=4, pady=3, columnspan=2, sticky="w")
+        self.year_combobox.bind("<<ComboboxSelected>>", self.show_modules)
+
+        # frame for module marks
+        self.modules_frame = tk.LabelFrame(input_frame, text="Modules & Marks", bg=self.card_color,
+                                           font=("Arial", 9, "bold"), padx=8, pady=8)
+        self.modules_frame.grid(row=0, column=3, rowspan=4, padx=8, pady=4)
+        self.module_entries = []  # (module, Entry) in form order, a resit lists its module again
+        self.show_modules()  # show modules for selected year
+
+        # add/update and clear buttons
+        tk.Button(input_frame, text="➕ Add/Update", bg=self.primary, fg="white", font=("Arial", 9, "bold"),
+                  relief="flat", width=15, command=self.add_student).grid(row=0, column=4, padx=6, pady=3)
+        tk.Button(input_frame, text="🧹 Clear", bg=self.secondary, fg="white", font=("Arial", 9, "bold"),
+                  relief="flat", width=15, command=self.clear_inputs).grid(row=1, column=4, padx=6, pady=3)
+
+        # table frame
+        table_frame = tk.LabelFrame(root, text="Student Records", bg=self.card_color, padx=6, pady=6,
+                                    font=("Arial", 9, "bold"))
+        table_frame.pack(fill="both", expand=False, padx=8, pady=4)
+
+        # search bar (filters the table through the index, no scans)
+        search_frame = tk.Frame(table_frame, bg=self.card_color)
+        search_frame.pack(side="top", fill="x", pady=(0, 4))
+        ttk.Label(search_frame, text="🔍 Name:", background=self.card_color).pack(side="left", padx=3)
+        self.search_entry = ttk.Entry(search_frame, width=18)
+        self.search_entry.pack(side="left", padx=3)
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
+        ttk.Label(search_frame, text="Grade:", background=self.card_color).pack(side="left", padx=3)
+        # the grades of the configured scheme, best first (the fail grade last)
+        self.grade_filter = ttk.Combobox(search_frame, values=["All"] + list(dict.fromkeys(self.scheme.letters)), state="readonly", width=5)
+        self.grade_filter.current(0)
+        self.grade_filter.pack(side="left", padx=3)
+        ttk.Label(search_frame, text="Year:", background=self.card_color).pack(side="left", padx=3)
+        self.year_filter = ttk.Combobox(search_frame, values=["All"] + list(self.year_modules), state="readonly", width=8)
+        self.year_filter.current(0)
+        self.year_filter.pack(side="left", padx=3)
+        self.failing_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(search_frame, text="Failing a module", variable=self.failing_var, bg=self.card_color,
+                       font=("Arial", 9), command=self.apply_search).pack(side="left", padx=3)
+        # sort label -> (sort, sort_year, descending) for StudentIndex.search
+        self.sort_options = {"Added": (None, None, False), "Name": ("name", None, False),
+                             "Average ↓": ("average", None, True), "Average ↑": ("average", None, False)}
+        for y in self.year_modules:
+            self.sort_options[f"{y} average ↓"] = ("year", y, True)
+        ttk.Label(search_frame, text="Sort:", background=self.card_color).pack(side="left", padx=3)
+        self.sort_combobox = ttk.Combobox(search_frame, values=list(self.sort_options), state="readonly", width=16)
+        self.sort_combobox.current(0)
+        self.sort_combobox.pack(side="left", padx=3)
+        for combo in (self.grade_filter, self.year_filter, self.sort_combobox):
+            combo.bind("<<ComboboxSelected>>", self.apply_search)
+        self.match_label = tk.Label(search_frame, text="", bg=self.card_color, fg=self.text_color, font=("Arial", 9))
+        self.match_label.pack(side="right", padx=3)
+
+        # cohort numbers (kept up to date by the gradebook, no rescans)
+        self.stats_label = tk.Label(table_frame, text="", bg=self.card_color, fg=self.text_color, anchor="w",
+                                    font=("Arial", 9))
+        self.stats_label.pack(side="bottom", fill="x")
+
+        # columns for table
+        columns = ("ID", "Name", "Year", "Modules", "Average", "Grade", "Remark", "Weighted Avg", "Degree")
+        # only the visible rows live in the Treeview (see virtual_table)
+        self.table = VirtualTable(table_frame, columns, self.table_values, height=8)
+        self.tree = self.table.tree
+        for col in columns:
+            self.tree.heading(col, text=col)
+            width = 120
+            if col == "Name": width = 180
+            if col == "Modules": width = 140
+            if col == "Remark": width = 160
+            if col == "Weighted Avg": width = 160
+            self.tree.column(col, width=width, anchor="center")
+
+        # row colors
+        self.tree.tag_configure("evenrow", background="#EEF2FF")
+        self.tree.tag_configure("oddrow", background="white")
+
+        # button row for actions
+        btn_frame = tk.Frame(root, bg=self.bg_color, pady=5)
+        btn_frame.pack(fill="x", padx=8, pady=4)
+
+        # all buttons
+        buttons = [
+            ("📄 Report", self.show_report, self.primary),
+            ("📝 Export Report", self.export_report, self.primary),
+            ("✏️ Edit", self.edit_student, self.secondary),
+            ("🗑️ Delete", self.delete_student, "#E53E3E"),
+            ("💾 Save CSV", self.save_to_csv, "#2F855A"),
+            ("📂 Load CSV", self.load_from_csv, "#3182CE"),
+            ("📁 Bulk Load", self.bulk_load, "#2B6CB0"),
+            ("🔄 Reset", self.reset_all, "#38B2AC"),
+            ("🌐 Overall Visualization", self.visualize_overall, "#805AD5")
+        ]
+        for text, cmd, color in buttons:
+            tk.Button(btn_frame, text=text, bg=color, fg="white", font=("Arial", 9, "bold"),
+                      relief="flat", width=14, command=cmd).pack(side="left", padx=3)
+
+        # progress of background tasks
+        status_frame = tk.Frame(root, bg=self.bg_color)
+        status_frame.pack(fill="x", padx=8)
+        self.progress_bar = ttk.Progressbar(status_frame, length=240, maximum=100)
+        self.progress_bar.pack(side="left", padx=3)
+        self.cancel_button = tk.Button(status_frame, text="✖ Cancel", bg="#E53E3E", fg="white", font=("Arial", 9, "bold"),
+                                       relief="flat", width=10, state="disabled", command=self.cancel_task)
+        self.cancel_button.pack(side="left", padx=3)
+        self.status_label = tk.Label(status_frame, text="", bg=self.bg_color, fg=self.text_color, anchor="w",
+                                     font=("Arial", 9))
+        self.status_label.pack(side="left", fill="x", expand=True, padx=3)
+
+        # report section (bottom)
+        report_frame = tk.LabelFrame(root, text="📊 Student Report", bg=self.card_color, padx=8, pady=8,
+                                     font=("Arial", 9, "bold"))
+        report_frame.pack(fill="both", expand=True, padx=8, pady=4)
+
+        # scroll bar for report box
+        report_scroll = ttk.Scrollbar(report_frame, orient="vertical")
+        report_scroll.pack(side="right", fill="y")
+
+        # text area for report
+        self.report_text = tk.Text(report_frame, width=110, height=10, wrap="word", bg="#FFFFFF",
+                                   fg=self.text_color, font=("Consolas", 10), relief="solid", borderwidth=1)
+        report_scroll.config(command=self.report_text.yview)
+        # the report is added a page at a time while scrolling (see report.ReportView)
+        self.report_view = ReportView(self.report_text, report_scroll)
+        self.report_view.show_message(REPORT_HINT)
+        self.report_text.pack(fill="both", expand=True)
+        self.refresh_table()
+
+        # load matplotlib while the user is busy with the form, so the first chart opens at once
+        self.root.after(PREWARM_DELAY_MS, lambda: prewarm(CHART_MODULES))
+
+    # ---------------- Display modules ----------------
+    def show_modules(self, event=None, modules=None):
+        # show modules for the selected year (or the given modules)
+        for widget in self.modules_frame.winfo_children():
+            widget.destroy()
+        self.module_entries.clear()
+        selected_year = self.year_combobox.get()
+        if modules is None: modules = self.year_modules.get(selected_year, [])
+        for i, mod in enumerate(modules):
+            ttk.Label(self.modules_frame, text=mod + ":").grid(row=i, column=0, padx=4, pady=2, sticky="w")
+            entry = ttk.Entry(self.modules_frame, width=12)
+            entry.grid(row=i, column=1, padx=4, pady=2)
+            self.module_entries.append((mod, entry))
+
+    # ---------------- Table row ----------------
+    def row_values(self, sid, record):
+        # values shown in the records table for one student
+        return (sid, record.get_name(), ", ".join(record.year_data.keys()), record.module_count(),
+                f"{record.average:.2f}", record.grade, record.remark,
+                weighted_avg_text(self.classifier.year_averages(sid)), degree_text(self.classifier.classify(sid)))
+
+    def table_values(self, sid):
+        return self.row_values(sid, self.students[sid])
+
+    def update_stats(self):
+        self.stats_label.config(text=self.gradebook.stats.summary())
+
+    # ---------------- Background tasks ----------------
+    def busy(self):
+        # one background task at a time, and no changes while it works on the data
+        if self.task is not None and self.task.running():
+            messagebox.showwarning("Busy", "Please wait for the current task to finish (or cancel it).")
+            return True
+        return False
+
+    def run_task(self, title, work, on_done, error_text):
+        # run work(task) on a worker thread, on_done(result) runs back on the Tk thread
+        def finish(text):
+            self.progress_bar["value"] = 0
+            self.cancel_button.config(state="disabled")
+            self.status_label.config(text=text)
+        def done(result):
+            finish(f"{title} done.")
+            on_done(result)
+        def failed(e):
+            finish(f"{title} failed.")
+            messagebox.showerror("Error", f"{error_text}: {e}")
+        def progress(fraction, message):
+            self.progress_bar["value"] = fraction * 100
+            self.status_label.config(text=message)
+        self.status_label.config(text=f"{title}...")
+        self.cancel_button.config(state="normal")
+        self.task = BackgroundTask(self.root, work, done, failed, lambda: finish(f"{title} cancelled."), progress).start()
+
+    def cancel_task(self):
+        if self.task is not None: self.task.cancel()
+
+    def load_grading_config(self):
+        # (scheme, catalog, classification rules) from GRADING_CONFIG, the defaults for a missing file or section
+        scheme, catalog, rules = None, None, None
+        if os.path.exists(GRADING_CONFIG):
+            try:
+                scheme, catalog = load_config(GRADING_CONFIG)
+                rules = load_rules(GRADING_CONFIG)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                messagebox.showerror("Grading Config", f"Failed to read {GRADING_CONFIG}, using the default scheme.\n{e}")
+                scheme, catalog = None, None
+        return scheme or DEFAULT_SCHEME, catalog or DEFAULT_CATALOG, rules or DEFAULT_RULES
+
+    def new_gradebook(self, store):
+        # gradebook with the classifier and the search index attached (also used from worker threads)
+        # the index sorts years by the classifier's weighted averages, so the classifier listens first
+        gradebook = Gradebook(store, self.scheme)
+        classifier = DegreeClassifier(gradebook, self.catalog, self.rules)
+        gradebook.add_listener(classifier)
+        index = StudentIndex(gradebook, classifier.year_averages)
+        gradebook.add_listener(index)
+        index.flush()
+        return gradebook
+
+    def use_gradebook(self, gradebook):
+        # switch to a gradebook built by a background task
+        # a replaced database store is closed, after dropping the report pages still to be read from it
+        old = self.students
+        self.gradebook = gradebook
+        self.chart_bins = None
+        self.students = gradebook.students
+        self.index = find_index(gradebook)
+        self.classifier = find_classifier(gradebook)
+        self.refresh_table()
+        if self.editing_id is not None: self.clear_inputs()  # the edited student is not in the new data
+        if isinstance(old, SQLiteStore) and old is not self.students:
+            self.report_view.show_message(REPORT_HINT)
+            old.close()
+
+    def apply_scheme(self, gradebook):
+        # files keep the grades they were saved with: regrade them under a configured scheme (one vectorized pass)
+        if self.scheme == DEFAULT_SCHEME: return gradebook
+        if isinstance(gradebook.students, SQLiteStore):
+            with gradebook.students.batch():
+                regrade_cohort(gradebook, self.scheme)
+        else:
+            regrade_cohort(gradebook, self.scheme)
+        return gradebook
+
+    # ---------------- Search ----------------
+    def search_filters(self):
+        # search bar state as StudentIndex.search arguments
+        grade = self.grade_filter.get()
+        year = self.year_filter.get()
+        sort, sort_year, descending = self.sort_options[self.sort_combobox.get()]
+        return {"prefix": self.search_entry.get(), "grade": None if grade == "All" else grade,
+                "year": None if year == "All" else year, "failing": self.failing_var.get(),
+                "sort": sort, "sort_year": sort_year, "descending": descending}
+
+    def filtering(self):
+        # True when the table shows something else than every student in insertion order
+        f = self.search_filters()
+        return bool(f["prefix"].strip() or f["grade"] or f["year"] or f["failing"] or f["sort"])
+
+    def schedule_search(self, event=None):
+        # live search: filter once typing pauses
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(SEARCH_DELAY_MS, self.apply_search)
+
+    def apply_search(self, event=None):
+        self.search_job = None
+        self.table.set_ids(self.index.search(**self.search_filters()))
+        self.match_label.config(text=f"Showing {len(self.table):,} of {len(self.students):,}")
+
+    def show_student(self, sid, created):
+        # put a changed student on screen, the filtered list is recomputed when a search is active
+        if self.filtering():
+            self.apply_search()
+            self.table.see(sid)
+        elif created:
+            self.table.append(sid)
+            self.match_label.config(text=f"Showing {len(self.table):,} of {len(self.students):,}")
+        else:
+            self.table.refresh(sid)
+
+    # ---------------- Add / Update student ----------------
+    def add_student(self):
+        if self.busy(): return
+        try:
+            # get input data
+            sid = self.id_entry.get().strip()
+            name = self.name_entry.get().strip()
+            year = self.year_combobox.get()
+
+            # validate id and name
+            sid = validate_id(sid)
+            name = validate_name(name)
+
+            # get marks
+            modules = [mod for mod, _ in self.module_entries]
+            marks = parse_marks(entry.get() for _, entry in self.module_entries)
+        except GradebookError as e:
+            messagebox.showerror("Input Error", str(e)); return
+        except ValueError:
+            messagebox.showerror("Input Error","Marks must be numbers between 0 and 100 for all modules."); return
+        except Exception as e:
+            messagebox.showerror("Unexpected Error", f"An unexpected error occurred: {e}"); return
+
+        # if editing existing record
+        if self.editing_id:
+            try:
+                record = self.gradebook.update_year(self.editing_id, self.editing_year, modules, marks)
+            except GradebookError as e:
+                messagebox.showerror("Error", str(e)); return
+            self.show_student(self.editing_id, False)
+            self.update_stats()
+            self.editing_id = None
+            self.editing_year = None
+            messagebox.showinfo("Updated", f"Marks updated for {record.get_name()} ({year}).")
+            self.clear_inputs()
+            return
+
+        # new student, or new year for an existing student
+        try:
+            created = self.gradebook.add_student(sid, name, year, modules, marks)
+        except GradebookError as e:
+            messagebox.showerror("Error", str(e)); return
+        record = self.students[sid]
+        self.show_student(sid, created)
+
+        # if student exists (added new year)
+        if not created:
+            self.update_stats()
+            messagebox.showinfo("Added Year", f"Added marks for {year} to student {name}.")
+            self.clear_inputs()
+            return
+
+        # new student row
+        self.update_stats()
+        self.clear_inputs()
+
+    # ---------------- Edit student ----------------
+    def edit_student(self):
+        # get selected record
+        sid = self.table.selected_id()
+        if sid is None:
+            messagebox.showwarning("Select", "Select a student to edit.")
+            return
+
+        if sid not in self.students:
+            messagebox.showerror("Error", f"Student ID {sid} not found.")
+            return
+
+        record = self.students[sid]
+        self.editing_id = sid
+
+        # fill form with existing data
+        self.id_entry.delete(0, tk.END)
+        self.id_entry.insert(0, sid)
+        self.name_entry.delete(0, tk.END)
+        self.name_entry.insert(0, record.get_name())
+
+        # populate years
+        years_list = list(record.year_data.keys())
+        self.year_combobox.config(values=years_list)
+        self.year_combobox.set(years_list[0])
+        self.editing_year = self.year_combobox.get()
+
+        # bind year selection
+        self.year_combobox.bind("<<ComboboxSelected>>", self.on_year_select_edit)
+
+        # show modules and marks
+        self.show_modules()
+        self.populate_marks_for_year(self.editing_year, record)
+
+        messagebox.showinfo("Edit Mode", "Select the year to edit, modify marks, and click 'Add/Update'.")
+
+    # ---------------- Year select callback ----------------
+    def on_year_select_edit(self, event):
+        if not self.editing_id: return
+        self.editing_year=self.year_combobox.get()
+        record=self.students[self.editing_id]
+        self.populate_marks_for_year(self.editing_year, record)
+
+    # ---------------- Populate marks ----------------
+    def populate_marks_for_year(self, year, record):
+        # show marks for selected year
+        if year not in record.year_data: self.show_modules(); return
+        # the stored modules with their own marks (the catalog may list other modules, or in another order)
+        data = record.year_data[year]
+        self.show_modules(modules=data["modules"])
+        for (_, entry), mark in zip(self.module_entries, data["marks"]):
+            entry.insert(0, str(mark))
+
+    # ---------------- Delete student ----------------
+    def delete_student(self):
+        if self.busy(): return
+        sid=self.table.selected_id()
+        if sid is None: messagebox.showwarning("Select","Select a student to delete."); return
+        if sid not in self.students: messagebox.showerror("Error",f"Student ID {sid} not found."); return
+        confirm=messagebox.askyesno("Confirm",f"Are you sure you want to delete student ID {sid}?")
+        if not confirm: return
+        self.gradebook.delete_student(sid)
+        if sid==self.editing_id: self.clear_inputs()
+        self.table.remove(sid)
+        self.match_label.config(text=f"Showing {len(self.table):,} of {len(self.students):,}")
+        self.update_stats()
+        messagebox.showinfo("Deleted", f"Student ID {sid} deleted.")
+
+    # ---------------- Clear inputs ----------------
+    def clear_inputs(self):
+        # clear all input fields
+        self.id_entry.delete(0, tk.END)
+        self.name_entry.delete(0, tk.END)
+        for _, e in self.module_entries:
+            e.delete(0, tk.END)
+        self.year_combobox.config(values=list(self.year_modules.keys()))
+        self.year_combobox.current(0)
+        self.show_modules()
+        self.editing_id=None
+        self.editing_year=None
+
+    # ---------------- Show report ----------------
+    def show_report(self):
+        # generate student report (streamed, the widget only gets the pages scrolled to)
+        if not self.students: messagebox.showwarning("No Data","No students added yet."); return
+        self.report_view.show(report_blocks(self.students))
+
+    # ---------------- Export report ----------------
+    def export_report(self):
+        # write the full cohort report to a txt or html file
+        if self.busy(): return
+        if not self.students: messagebox.showwarning("No Data","No students added yet."); return
+        file_path=filedialog.asksaveasfilename(defaultextension=".txt",filetypes=REPORT_TYPES)
+        if not file_path: return
+        def work(task):
+            export_report(file_path, self.students, progress=lambda blocks: with_progress(task, blocks, len(self.students), "Report"))
+        self.run_task("Export report", work, lambda _: messagebox.showinfo("Saved",f"Report saved to {file_path}"),
+                      "Failed to export report")
+
+    # ---------------- Reset ----------------
+    def reset_all(self):
+        # clear all data
+        if self.busy(): return
+        self.gradebook.clear()
+        self.refresh_table()
+        self.report_view.show_message(REPORT_HINT)
+        self.editing_id=None
+        self.editing_year=None
+
+    # ---------------- Save CSV ----------------
+    def save_to_csv(self):
+        # save all student data to csv file (or a binary snapshot, or a database that keeps later edits)
+        if self.busy(): return
+        if not self.students: messagebox.showwarning("No Data","No student data to save."); return
+        file_path=filedialog.asksaveasfilename(defaultextension=".csv",filetypes=FILE_TYPES)
+        if not file_path: return
+        if file_path.lower().endswith(DB_EXT):
+            self.save_to_database(file_path); return
+        def work(task):
+            # a cancelled save leaves the old file alone
+            with atomic_write(file_path) as part_path:
+                if file_path.lower().endswith(SNAPSHOT_EXT):
+                    write_snapshot(part_path, self.students)
+                else:
+                    with open(part_path,"w",newline="",encoding="utf-8",buffering=BUFFER_SIZE) as f:
+                        write_students(f, with_progress(task, self.students.values(), len(self.students), "Saved"))
+        self.run_task("Save", work, lambda _: messagebox.showinfo("Saved",f"Data saved to {file_path}"), "Failed to save file")
+
+    def save_to_database(self, file_path):
+        # write a database, then keep working on it: every later add/delete/reset is written straight to it
+        if isinstance(self.students, SQLiteStore) and os.path.abspath(self.students.path)==os.path.abspath(file_path):
+            messagebox.showinfo("Saved",f"Data saved to {file_path}"); return
+        def work(task):
+            task.progress(0, "Writing database")
+            with atomic_write(file_path) as part_path:
+                write_database(part_path, self.students)
+            return self.new_gradebook(SQLiteStore(file_path))
+        def done(gradebook):
+            self.use_gradebook(gradebook)
+            messagebox.showinfo("Saved",f"Data saved to {file_path}")
+        self.run_task("Save", work, done, "Failed to save file")
+
+    # ---------------- Load CSV ----------------
+    def load_from_csv(self):
+        # load student data from csv file (or a binary snapshot, or a database)
+        if self.busy(): return
+        file_path=filedialog.askopenfilename(filetypes=FILE_TYPES)
+        if not file_path: return
+        def work(task):
+            # loads into a new gradebook, the current data stays on screen until it is done
+            # returns (gradebook, report of the CSV rows, None for the binary formats)
+            if file_path.lower().endswith(DB_EXT):
+                # opened in place: only the summary rows are read, marks are read when a student is shown
+                task.progress(0, "Opening database")
+                store=SQLiteStore(file_path)
+                try:
+                    return self.apply_scheme(self.new_gradebook(store)), None
+                except BaseException:
+                    store.close()
+                    raise
+            if file_path.lower().endswith(SNAPSHOT_EXT):
+                # copied into an editable store (the app edits it and may save over the same file, which cannot
+                # be replaced while mapped on Windows): the copy reads every page anyway, so the checksum pass
+                # is skipped, the header and section bounds are still checked
+                with Snapshot(file_path, verify=False) as snap:
+                    task.progress(0, "Copying snapshot")
+                    return self.apply_scheme(self.new_gradebook(snap.to_store())), None
+            gradebook=self.new_gradebook(ColumnarStore())
+            size=os.path.getsize(file_path) or 1
+            verify=self.scheme if VERIFY_GRADES and self.scheme == DEFAULT_SCHEME else None
+            with open(file_path,"r",newline="",encoding="utf-8",buffering=BUFFER_SIZE) as f:
+                progress=lambda report: task.progress(f.buffer.tell()/size, f"Loaded {report.loaded:,} students")
+                report=load_students(f, gradebook, verify, progress, file_path, PROGRESS_EVERY)
+            return self.apply_scheme(gradebook), report
+        def done(result):
+            gradebook, report=result
+            if report is not None and report.error_count() and not self.confirm_load(file_path, report): return
+            self.use_gradebook(gradebook)
+            messagebox.showinfo("Loaded",f"Data loaded from {file_path}")
+        self.run_task("Load", work, done, "Failed to load file")
+
+    def confirm_load(self, file_path, report):
+        # rows with errors: list the first ones, offer the full report, and ask before the current data is replaced
+        lines="\n".join(str(e) for e in report.errors[:LOAD_ERRORS_SHOWN])
+        if report.error_count()>LOAD_ERRORS_SHOWN: lines+=f"\n... and {report.error_count()-LOAD_ERRORS_SHOWN:,} more"
+        if messagebox.askyesno("Load problems",f"{os.path.basename(file_path)}: {report.summary()}\n\n{lines}\n\nSave the full error report?"):
+            report_path=filedialog.asksaveasfilename(defaultextension=".json",filetypes=[("JSON files","*.json")])
+            if report_path:
+                try:
+                    write_error_report(report_path, report)
+                except OSError as e:
+                    messagebox.showerror("Error",f"Failed to save report: {e}")
+        if not report.skipped: return True
+        if not report.loaded:
+            messagebox.showerror("Error","No valid rows to load, the current data is kept.")
+            return False
+        return messagebox.askyesno("Load problems",f"Load the {report.loaded:,} valid students? Rows with errors are left out.")
+
+    # ---------------- Bulk load ----------------
+    def bulk_load(self):
+        # merge every CSV file of a folder into the current data (files are parsed in parallel)
+        if self.busy(): return
+        folder=filedialog.askdirectory(title="Folder with department CSV files")
+        if not folder: return
+        def work(task):
+            # merged into a copy, so the table keeps reading unchanged data meanwhile
+            # (a database is merged through a second connection in one transaction, undone if cancelled)
+            progress=lambda done, total: task.progress(done/total, f"Merged {done}/{total} files")
+            if isinstance(self.students, SQLiteStore):
+                store=SQLiteStore(self.students.path)
+                try:
+                    with store.batch():
+                        return ingest_files(folder, self.new_gradebook(store), progress=progress)
+                except BaseException:
+                    store.close()
+                    raise
+            return ingest_files(folder, self.new_gradebook(self.students.copy()), progress=progress)
+        self.run_task("Bulk load", work, lambda result: self.bulk_loaded(folder, result), "Failed to load files")
+
+    def bulk_loaded(self, folder, result):
+        gradebook, conflicts = result
+        self.use_gradebook(gradebook)
+        if conflicts:
+            lines=[f"{os.path.basename(path)}: {msg}" for path, msgs in conflicts.items() for msg in msgs[:5]]
+            messagebox.showwarning("Loaded with conflicts","Rows skipped:\n"+"\n".join(lines[:20]))
+        else:
+            messagebox.showinfo("Loaded",f"Data loaded from {folder}")
+
+    # ---------------- Refresh table ----------------
+    def refresh_table(self):
+        # reload the table rows from the gradebook, through the search bar filters (only the visible rows are drawn)
+        self.apply_search()
+        self.update_stats()
+
+          # ---------------- Visualization ----------------
+    def visualize_overall(self):
+        if self.busy(): return
+        if not self.students:
+            messagebox.showwarning("No Data", "No student data to visualize.")
+            return
+
+        # Large cohorts: aggregated charts drawn from binned counts (one bar per student is unreadable)
+        # the bins are kept until the gradebook changes, the overall averages come from its maintained stats
+        if len(self.students) > DETAIL_LIMIT:
+            stats = self.gradebook.stats
+            if self.chart_bins is not None and self.chart_bins[0] == stats.version:
+                self.plot_aggregated(self.chart_bins[1]); return
+            version = stats.version
+            def done(bins):
+                self.chart_bins = (version, bins)
+                self.plot_aggregated(bins)
+            self.run_task("Visualization", lambda task: cohort_bins(self.students, self.gradebook.scheme, stats), done,
+                          "Failed to prepare charts")
+            return
+
+        # Prepare data on the worker thread, matplotlib only runs on the Tk thread
+        def work(task):
+            names, averages = [], []
+            for s in with_progress(task, self.students.values(), len(self.students), "Prepared"):
+                names.append(s.get_name())
+                averages.append(s.average)
+            return {"Name": names, "Average": averages}
+        self.run_task("Visualization", work, self.plot_overall, "Failed to prepare charts")
+
+    def plot_overall(self, df):
+        import matplotlib.pyplot as plt
+
+        # Grade distribution (pie chart), counts kept by the gradebook
+        grade_counts = self.gradebook.stats.grade_counts
+        plt.figure(figsize=(10, 4))
+
+        plt.subplot(1, 2, 1)
+        plt.pie(list(grade_counts.values()), labels=list(grade_counts.keys()), autopct="%1.1f%%", startangle=140)
+        plt.title("Grade Distribution")
+
+        # Average marks (bar chart)
+        plt.subplot(1, 2, 2)
+        plt.bar(df["Name"], df["Average"])
+        plt.xticks(rotation=45, ha="right")
+        plt.title("Average Marks per Student")
+        plt.ylabel("Average (%)")
+        plt.tight_layout()
+
+        plt.show()
+
+    def plot_aggregated(self, bins):
+        import matplotlib.pyplot as plt
+
+        draw_charts(plt.figure(figsize=(12, 8)), bins)
+        plt.show()
+# ---------------- Run ----------------
+if __name__=="__main__":
+    # create main window and run app
+    root=tk.Tk()
+    app=GradeCalculatorApp(root)
+    root.mainloop()
+
@@ -0,0 +1,106 @@
+import importlib
+import queue
+import threading
+
+PROGRESS_EVERY = 2000  # items between two progress messages
+
+class TaskCancelled(Exception):
+    # raised inside the worker once the task has been cancelled
+    pass
+
+# ---------------- Background task ----------------
+class BackgroundTask:
+    # runs work(task) on a worker thread, the worker never touches Tk:
+    # progress and callbacks go through a queue that the Tk thread drains with root.after
+    POLL_MS = 50
+    BATCH = 200  # queued messages handled per poll
+
+    def __init__(self, root, work, on_done=None, on_error=None, on_cancel=None, on_progress=None):
+        self.root = root
+        self.work = work
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.on_progress = on_progress  # (fraction, message)
+        self.queue = queue.Queue()
+        self.cancelled = threading.Event()
+        self.finished = False
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        self.root.after(self.POLL_MS, self._poll)
+        return self
+
+    def _run(self):
+        try:
+            result = self.work(self)
+        except TaskCancelled:
+            self.queue.put(("cancelled", None))
+        except Exception as e:
+            self.queue.put(("error", e))
+        else:
+            self.queue.put(("done", result))
+
+    # ---------------- Worker side ----------------
+    def check(self):
+        # stop the worker if the user cancelled
+        if self.cancelled.is_set():
+            raise TaskCancelled()
+
+    def progress(self, fraction, message=""):
+        self.check()
+        self.queue.put(("progress", (fraction, message)))
+
+    def post(self, callback, *args):
+        # run callback(*args) on the Tk thread
+        self.queue.put(("call", (callback, args)))
+
+    # ---------------- Tk side ----------------
+    def cancel(self):
+        self.cancelled.set()
+
+    def running(self):
+        return not self.finished
+
+    def _poll(self):
+        # handle a batch of messages, only the latest progress of the batch is shown
+        last_progress = None
+        for _ in range(self.BATCH):
+            try:
+                kind, value = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                last_progress = value
+            elif kind == "call":
+                value[0](*value[1])
+            else:
+                self.finished = True
+                callback = {"done": self.on_done, "error": self.on_error, "cancelled": self.on_cancel}[kind]
+                if callback is not None:
+                    callback(value) if kind != "cancelled" else callback()
+                return
+        if last_progress is not None and self.on_progress is not None:
+            self.on_progress(*last_progress)
+        self.root.after(self.POLL_MS, self._poll)
+
+def prewarm(modules):
+    # import heavy modules on a daemon thread so their first use does not block the UI
+    # (if the UI needs one while it is still loading, the import lock makes it wait, nothing is imported twice)
+    def run():
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass  # reported when the feature that needs it is used
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+def with_progress(task, items, total, label):
+    # pass items through, reporting "label n/total" every PROGRESS_EVERY items
+    total = max(total, 1)
+    for i, item in enumerate(items, 1):
+        if i % PROGRESS_EVERY == 0:
+            task.progress(i / total, f"{label} {i:,}/{total:,}")
+        yield item
@@ -0,0 +1,140 @@
+import sys
+
+from grading_engine import YEAR_MODULES
+from grading_scheme import DEFAULT_SCHEME
+
+# ---------------- Grade tables ----------------
+# grade codes of the default scheme used by the batch functions, index -> letter / remark
+GRADE_LETTERS = DEFAULT_SCHEME.letters
+GRADE_REMARKS = DEFAULT_SCHEME.remarks
+FAIL_CODE = DEFAULT_SCHEME.fail_code
+GRADE_BOUNDARIES = DEFAULT_SCHEME.boundaries
+
+# sum() of floats is compensated (Neumaier) from Python 3.12 on,
+# the batch sums follow the same order and rounding so results equal calculate_grade exactly
+COMPENSATED_SUM = sys.version_info >= (3, 12)
+
+# ---------------- Row sums ----------------
+def _row_sums(np, columns):
+    # sum every student's marks left to right, like sum() over the list of marks
+    # columns: modules x students, missing marks are 0.0 (adding 0.0 changes neither sum nor compensation)
+    if not len(columns):
+        return np.zeros(columns.shape[1])
+    total = columns[0].copy()
+    comp = np.zeros(columns.shape[1]) if COMPENSATED_SUM else None
+    for x in columns[1:]:
+        t = total + x
+        if comp is not None:
+            comp += np.where(np.abs(total) >= np.abs(x), (total - t) + x, (x - t) + total)
+        total = t
+    if comp is not None:
+        total += comp
+    return total
+
+def _averages(np, columns, present):
+    total, count = _row_sums(np, columns), present.sum(axis=1)
+    return np.where(count > 0, total / np.maximum(count, 1), 0.0), count
+
+# ---------------- Batch grading ----------------
+def grade_batch(marks, mask=None, column_years=None, scheme=DEFAULT_SCHEME):
+    # grade a whole cohort in one pass
+    # marks: students x modules array, missing marks are NaN (or False in mask)
+    # column_years: year index of every column, gives per-year averages (NaN where a year was not taken)
+    # scheme: grading_scheme.GradingScheme, its boundaries are searched for the whole column at once
+    import numpy as np
+
+    marks = np.asarray(marks, dtype=np.float64)
+    if marks.ndim != 2:
+        raise ValueError("marks must be a 2-D array (students x modules)")
+    present = ~np.isnan(marks) if mask is None else np.asarray(mask, dtype=bool) & ~np.isnan(marks)
+    columns = np.ascontiguousarray(np.where(present, marks, 0.0).T)
+
+    average, _ = _averages(np, columns, present)
+    if scheme.pass_mark is None:
+        fails = np.zeros(marks.shape[0], dtype=np.int64)
+    else:
+        fails = (present & (marks < scheme.pass_mark)).sum(axis=1)
+    # boundaries (>= like calculate_grade), number passed -> code fail_code (F) .. 0 (A)
+    codes = (scheme.fail_code - np.searchsorted(scheme.boundaries, average, side="right")).astype(np.int8)
+    codes[fails > 0] = scheme.fail_code
+
+    result = {
+        "average": average,
+        "grade_code": codes,
+        "fails": fails,  # modules below the pass mark
+        # object arrays pointing at the shared letter/remark strings
+        "grade": np.array(scheme.letters, dtype=object).take(codes),
+        "remark": np.array(scheme.remarks, dtype=object).take(codes),
+        "year_averages": None,
+    }
+    if column_years is not None:
+        # one year index per column, or per cell (students x modules, -1 for padding) when rows differ
+        column_years = np.asarray(column_years)
+        n_years = int(column_years.max()) + 1 if column_years.size else 0
+        year_avgs = np.full((marks.shape[0], n_years), np.nan)
+        for k in range(n_years):
+            if column_years.ndim == 2:
+                in_year = present & (column_years == k)
+                avg, count = _averages(np, np.where(in_year.T, columns, 0.0), in_year)
+            else:
+                cols = column_years == k
+                avg, count = _averages(np, columns[cols], present[:, cols])
+            year_avgs[:, k] = np.where(count > 0, avg, np.nan)
+        result["year_averages"] = year_avgs
+    return result
+
+# ---------------- Gradebook -> arrays ----------------
+def cohort_matrix(gradebook, year_modules=YEAR_MODULES):
+    # lay a gradebook out as a students x modules matrix padded with NaN
+    # every row holds the student's marks in all_marks() order (their own year order), so the row sums
+    # add the same marks in the same order as calculate_grade
+    # returns (ids, marks, cell_years, years): cell_years is the year index of every cell (-1 for padding)
+    import numpy as np
+
+    years = list(year_modules)
+    year_index = {y: k for k, y in enumerate(years)}
+    width = 0
+    for student in gradebook.students.values():
+        width = max(width, student.module_count())
+        for y in student.year_data:
+            if y not in year_index:
+                year_index[y] = len(years)
+                years.append(y)
+
+    ids = list(gradebook.students)
+    marks = np.full((len(ids), width), np.nan)
+    cell_years = np.full((len(ids), width), -1, dtype=np.int16)
+    for i, student in enumerate(gradebook.students.values()):
+        col = 0
+        for y, data in student.year_data.items():
+            end = col + len(data["marks"])
+            marks[i, col:end] = data["marks"]
+            cell_years[i, col:end] = year_index[y]
+            col = end
+    return ids, marks, cell_years, years
+
+def grade_gradebook(gradebook, year_modules=YEAR_MODULES):
+    # batch-grade every student of a gradebook, returns (ids, years, results)
+    ids, marks, cell_years, years = cohort_matrix(gradebook, year_modules)
+    return ids, years, grade_batch(marks, column_years=cell_years)
+
+def regrade_cohort(gradebook, scheme):
+    # switch a gradebook to another grading scheme: the cohort is regraded in one vectorized pass,
+    # then only the students whose result changed are written back (and passed to the listeners)
+    # returns the number of students whose grade or remark changed
+    ids, marks, _, _ = cohort_matrix(gradebook)
+    results = grade_batch(marks, scheme=scheme)
+    old = [gradebook.result(sid) for sid in ids]  # under the old scheme (its pass mark)
+    gradebook.scheme = scheme
+    students = gradebook.students
+    changed = 0
+    for i, sid in enumerate(ids):
+        grade, remark = scheme.results[results["grade_code"][i]]
+        record = students[sid]
+        if grade == record.grade and remark == record.remark and old[i][2] == results["fails"][i]:
+            continue
+        students.set_result(sid, record.average, grade, remark)
+        gradebook.years_changed(sid, ())
+        gradebook.changed(sid, old[i])
+        changed += 1
+    return changed
@@ -0,0 +1,762 @@
+import argparse
+import json
+import platform
+import random
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from grading_engine import YEAR_MODULES, Gradebook, Student, calculate_grade
+from grading_scheme import DEFAULT_SCHEME, GradingScheme
+
+FIRST_NAMES = ["Amina", "Ben", "Chloe", "Daniel", "Emma", "Farhan", "Grace", "Hassan", "Isla", "Jack"]
+# a scheme with other bands and pass mark, for the regrading benchmarks
+STRICT_SCHEME = GradingScheme([(75, "A*", "Outstanding"), (65, "A", "Excellent"), (45, "P", "Pass")],
+                              ("U", "Unclassified"), 35, "Strict")
+LAST_NAMES = ["Ahmed", "Brown", "Clarke", "Davies", "Evans", "Khan", "Patel", "Smith", "Taylor", "Wilson"]
+
+# ---------------- Synthetic data ----------------
+def synthetic_rows(n, seed=1, first_id=100000):
+    # yields (id, name, year, modules, marks) for n students taking 1-3 years
+    rng = random.Random(seed)
+    years = list(YEAR_MODULES.keys())
+    for i in range(n):
+        sid = str(first_id + i)
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        for year in years[:rng.randint(1, len(years))]:
+            modules = YEAR_MODULES[year]
+            marks = [float(rng.randint(20, 95)) for _ in modules]
+            yield sid, name, year, modules, marks
+
+def synthetic_gradebook(n, seed=1, first_id=100000, store=None):
+    gradebook = Gradebook(store)
+    for row in synthetic_rows(n, seed, first_id):
+        gradebook.add_student(*row)
+    return gradebook
+
+# ---------------- Helpers ----------------
+RESULTS = {}  # "benchmark: name @ size" -> {"seconds": ..., "count": ..., info}, for --save-baseline / --baseline
+section = None  # benchmark being run
+MIN_COMPARE_SECONDS = 0.005  # shorter timings are too noisy to flag as regressions
+PROFILE_TOP = 25  # lines of the tracemalloc summary
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+def report(name, seconds, count=None, n=None, **info):
+    # results are keyed by name and cohort size n, measured values (MiB, hits, changed ...) go in info:
+    # they are printed and saved with the result but a different value never changes the key
+    details = [f"{n:,} students"] if n is not None and not name.startswith(" ") else []
+    details += [f"{v:,.1f} {k}" if isinstance(v, float) else f"{v:,} {k}" for k, v in info.items()]
+    label = f"{name} ({', '.join(details)})" if details else name
+    line = f"{label:<44} {seconds*1000:10.1f} ms"
+    if count:
+        line += f"  ({seconds/count*1e6:.2f} us/record, {count/seconds:,.0f} records/s)"
+    print(line)
+    key = f"{section}: {name.strip()}" + (f" @ {n}" if n is not None else "")
+    if key in RESULTS:
+        raise ValueError(f"benchmark result reported twice: {key}")
+    RESULTS[key] = {"seconds": seconds, "count": count, **info}
+
+def parse_sizes(text):
+    # "1000,100000" or with suffixes: "1k,100k,1M"
+    sizes = []
+    for part in text.lower().split(","):
+        part = part.strip()
+        scale = {"k": 1000, "m": 1000000}.get(part[-1:], 1)
+        sizes.append(int(float(part[:-1] if scale > 1 else part) * scale))
+    return sizes
+
+def tk_root():
+    # a hidden Tk root for the GUI benchmarks, None (and a note) without a display (see --xvfb)
+    import tkinter as tk
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"skipped (no display: {e}; try --xvfb)")
+        return None
+    root.withdraw()
+    return root
+
+def start_xvfb():
+    # run the GUI benchmarks on a virtual X display when there is no real one, returns the Xvfb process
+    if os.environ.get("DISPLAY"): return None
+    read_fd, write_fd = os.pipe()
+    try:
+        # -displayfd: Xvfb picks a free display and writes its number once it accepts connections
+        proc = subprocess.Popen(["Xvfb", "-displayfd", str(write_fd), "-nolisten", "tcp"], pass_fds=(write_fd,),
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except FileNotFoundError:
+        print("Xvfb not found, the GUI benchmarks will be skipped")
+        return None
+    finally:
+        os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        display = f.readline().strip()
+    if not display:
+        proc.kill()
+        print("Xvfb did not start, the GUI benchmarks will be skipped")
+        return None
+    os.environ["DISPLAY"] = ":" + display
+    return proc
+
+# ---------------- Baselines ----------------
+def save_baseline(path, sizes):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"python": platform.python_version(), "platform": platform.platform(), "sizes": sizes,
+                   "results": RESULTS}, f, indent=1)
+    print(f"baseline saved to {path} ({len(RESULTS)} results)")
+
+def compare_baseline(path, sizes, tolerance, sections):
+    # compare time per record (or total time) with a saved baseline, returns the number of regressions
+    # results of the benchmarks run that are in the baseline but were not measured are listed as missing
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    print(f"---------------- compared with {path} ----------------")
+    if saved["sizes"] != sizes:
+        print(f"not compared: the baseline was saved with --sizes {','.join(map(str, saved['sizes']))}")
+        return 0
+    baseline = saved["results"]
+    compared, regressions = 0, 0
+    for key, result in RESULTS.items():
+        old = baseline.get(key)
+        if old is None or max(old["seconds"], result["seconds"]) < MIN_COMPARE_SECONDS: continue
+        compared += 1
+        ratio = (result["seconds"]/(result["count"] or 1)) / (old["seconds"]/(old["count"] or 1))
+        if ratio > tolerance:
+            regressions += 1
+            print(f"REGRESSION {key}: {ratio:.2f}x slower ({old['seconds']*1000:.1f} -> {result['seconds']*1000:.1f} ms)")
+        elif ratio < 1/tolerance:
+            print(f"faster     {key}: {1/ratio:.2f}x")
+    missing = [key for key in baseline if key.split(": ", 1)[0] in sections and key not in RESULTS]
+    for key in missing:
+        print(f"MISSING    {key}: in the baseline, not measured")
+    print(f"{compared} results compared, {regressions} slower than {tolerance:.2f}x the baseline, {len(missing)} missing")
+    return regressions
+
+# ---------------- Profiling ----------------
+def profiled(name, sizes, directory):
+    # run one benchmark under cProfile and tracemalloc:
+    # <name>.prof (pstats, snakeviz ...) and <name>.memory.txt (peak, and the biggest allocations still alive)
+    import cProfile
+
+    os.makedirs(directory, exist_ok=True)
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        BENCHMARKS[name](sizes)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(os.path.join(directory, name + ".prof"))
+        with open(os.path.join(directory, name + ".memory.txt"), "w", encoding="utf-8") as f:
+            if tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                f.write(f"current {current/2**20:.1f} MiB, peak {peak/2**20:.1f} MiB\n\n")
+                for stat in snapshot.statistics("lineno")[:PROFILE_TOP]:
+                    f.write(f"{stat}\n")
+            else:
+                f.write("not traced: the benchmark measures memory with tracemalloc itself\n")
+        print(f"profile written to {os.path.join(directory, name)}.prof / .memory.txt")
+
+def import_time(module):
+    # cumulative import time (us) of a module in a fresh interpreter, from -X importtime
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         capture_output=True, text=True, check=True).stderr
+    for line in out.splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1])
+    return None
+
+# ---------------- Benchmarks ----------------
+def bench_hotpaths(sizes):
+    # the request paths of the app, on an app-like gradebook (array store, search index, classifier)
+    import tkinter as tk
+    from classification import DegreeClassifier, degree_text, find_classifier
+    from columnar_store import ColumnarStore
+    from csv_io import BUFFER_SIZE, load_students, write_students
+    from grading_engine import compute_weighted_avg, weighted_avg_text
+    from report import report_blocks, write_report
+    from search_index import StudentIndex
+    from virtual_table import VirtualTable
+
+    def app_gradebook():
+        gradebook = Gradebook(ColumnarStore())
+        gradebook.add_listener(StudentIndex(gradebook))
+        gradebook.add_listener(DegreeClassifier(gradebook))
+        return gradebook
+
+    root = tk_root()
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, report_path = os.path.join(tmp, "cohort.csv"), os.path.join(tmp, "report.txt")
+        for n in sizes:
+            students = synthetic_gradebook(n, store=ColumnarStore()).students
+            marks = [s.all_marks() for s in students.values()]
+            seconds, _ = timed(lambda: [calculate_grade(m) for m in marks])
+            report("calculate_grade", seconds, n, n)
+            marks = None
+            seconds, _ = timed(lambda: [compute_weighted_avg(s) for s in students.values()])
+            report("  compute_weighted_avg", seconds, n, n)
+
+            def save():
+                # save_to_csv without the dialog and the .part rename
+                with open(csv_path, "w", newline="", encoding="utf-8", buffering=BUFFER_SIZE) as f:
+                    return write_students(f, students.values())
+            seconds, _ = timed(save)
+            report("  save_to_csv", seconds, n, n, MiB=os.path.getsize(csv_path)/2**20)
+
+            def load():
+                # load_from_csv: check and regrade every row into a gradebook that keeps its indexes up to date
+                gradebook = app_gradebook()
+                with open(csv_path, "r", newline="", encoding="utf-8", buffering=BUFFER_SIZE) as f:
+                    load_students(f, gradebook, DEFAULT_SCHEME)
+                return gradebook
+            seconds, gradebook = timed(load)
+            report("  load_from_csv", seconds, n, n)
+            students = None
+
+            def export():
+                with open(report_path, "w", encoding="utf-8", buffering=BUFFER_SIZE) as f:
+                    return write_report(f, report_blocks(gradebook.students))
+            seconds, _ = timed(export)
+            report("  report (.txt)", seconds, n, n)
+
+            if root is not None:
+                # Treeview population: the app's row values (classifier columns included) for the rows in view
+                classifier = find_classifier(gradebook)
+
+                def row(sid):
+                    s = gradebook.students[sid]
+                    return (sid, s.get_name(), ", ".join(s.year_data), s.module_count(), f"{s.average:.2f}",
+                            s.grade, s.remark, weighted_avg_text(classifier.year_averages(sid)),
+                            degree_text(classifier.classify(sid)))
+                table = VirtualTable(tk.Frame(root), tuple(f"c{i}" for i in range(9)), row)
+                seconds, _ = timed(table.set_ids, list(gradebook.students))
+                report("  Treeview population", seconds, n=n)
+                table.tree.master.destroy()
+            gradebook = None
+    if root is not None: root.destroy()
+
+def bench_engine(sizes):
+    us = import_time("grading_engine")
+    print(f"{'import grading_engine':<44} {us/1000:10.1f} ms")
+    for n in sizes:
+        rows = list(synthetic_rows(n))
+        gradebook = Gradebook()
+        seconds, _ = timed(lambda: [gradebook.add_student(*row) for row in rows])
+        report("add_student", seconds, len(rows), n)
+        seconds, _ = timed(gradebook.grade_all)
+        report("grade_all", seconds, n, n)
+        marks = [s.all_marks() for s in gradebook.students.values()]
+        seconds, _ = timed(lambda: [calculate_grade(m) for m in marks])
+        report("calculate_grade", seconds, n, n)
+
+def bench_batch(sizes):
+    import numpy as np
+    from batch_grading import grade_batch, regrade_cohort
+
+    rng = np.random.default_rng(1)
+    for n in sizes:
+        # 3 years x 4 modules, later years missing for some students
+        marks = rng.integers(20, 96, size=(n, 12)).astype(np.float64)
+        taken = rng.integers(1, 4, size=n)
+        marks[taken < 2, 4:] = np.nan
+        marks[taken < 3, 8:] = np.nan
+        column_years = np.repeat(np.arange(3), 4)
+        years = [[[m for m in row[k:k + 4] if m == m] for k in (0, 4, 8)] for row in marks.tolist()]
+        rows = [[m for y in row for m in y] for row in years]
+        scalar, _ = timed(lambda: [calculate_grade(r) for r in rows])
+        report("calculate_grade loop", scalar, n, n)
+        batch, _ = timed(grade_batch, marks)
+        report("grade_batch", batch, n, n)
+        print(f"{'speedup':<44} {scalar/batch:10.1f} x")
+        scalar, _ = timed(lambda: [(calculate_grade(r), [calculate_grade(y) for y in row if y])
+                                   for r, row in zip(rows, years)])
+        report("  + per-year loop", scalar, n, n)
+        batch, _ = timed(grade_batch, marks, None, column_years)
+        report("  + per-year grade_batch", batch, n, n)
+        print(f"{'speedup':<44} {scalar/batch:10.1f} x")
+        scalar, _ = timed(lambda: [STRICT_SCHEME.grade_marks(r) for r in rows])
+        report("  Strict scheme, loop", scalar, n, n)
+        batch, _ = timed(grade_batch, marks, None, None, STRICT_SCHEME)
+        report("  Strict scheme, grade_batch", batch, n, n)
+    gradebook = synthetic_gradebook(sizes[-1])
+    seconds, changed = timed(regrade_cohort, gradebook, STRICT_SCHEME)
+    report("regrade_cohort", seconds, len(gradebook), len(gradebook), changed=changed)
+
+def bench_memory(sizes):
+    from columnar_store import ColumnarStore
+
+    for n in sizes:
+        # module names are split from text like load_from_csv does, so each record holds its own copies
+        records = {}
+        for sid, name, year, modules, marks in synthetic_rows(n):
+            records.setdefault(sid, (name, {}))[1][year] = ("|".join(modules), marks)
+        mark_count = sum(len(m) for _, years in records.values() for _, m in years.values())
+        for label, make_store in (("dict layout", None), ("columnar store", ColumnarStore)):
+            tracemalloc.start()
+            gradebook = Gradebook(make_store() if make_store else None)
+            for sid, (name, years) in records.items():
+                year_data = {y: {"modules": mods.split("|"), "marks": list(marks)} for y, (mods, marks) in years.items()}
+                gradebook.put(Student(sid, name, year_data, *calculate_grade([m for _, ms in years.values() for m in ms])))
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{label + f' ({n:,} students)':<44} {size/2**20:10.1f} MiB  "
+                  f"({size/n:.0f} bytes/student, {size/mark_count:.0f} bytes/mark)")
+            del gradebook
+
+def write_synthetic_csv(path, n):
+    from csv_io import write_students
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        write_students(f, synthetic_gradebook(n).students.values())
+
+def bench_csv(sizes):
+    from columnar_store import ColumnarStore
+    from csv_io import load_students, read_students, regrade_csv
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src, dst = os.path.join(tmp, "cohort.csv"), os.path.join(tmp, "graded.csv")
+        for n in sizes:
+            write_synthetic_csv(src, n)
+            size = os.path.getsize(src)
+            with open(src, newline="", encoding="utf-8") as f:
+                seconds, _ = timed(lambda: sum(1 for _ in read_students(f)))
+            report("read_students", seconds, n, n, MiB=size/2**20)
+            for verify in (None, DEFAULT_SCHEME):
+                with open(src, newline="", encoding="utf-8") as f:
+                    seconds, _ = timed(load_students, f, ColumnarStore(), verify)
+                report("  load_students" + (" (grades verified)" if verify else ""), seconds, n, n)
+            seconds, _ = timed(regrade_csv, src, dst)
+            report("regrade_csv", seconds, n, n)
+            # second run under tracemalloc: peak stays flat as the file grows
+            tracemalloc.start()
+            regrade_csv(src, dst)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{'  peak memory':<44} {peak/2**20:10.1f} MiB")
+
+def bench_ingest(sizes):
+    import pickle
+    from bulk_ingest import csv_files, ingest_files, merge_rows, pack_rows, read_graded, unpack_rows
+    from csv_io import write_students
+
+    cpus = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            # 8 department files with neighbouring id ranges (the first ids of each file clash with the previous one)
+            size = n // 8
+            for k in range(8):
+                with open(os.path.join(tmp, f"dept{k}.csv"), "w", newline="", encoding="utf-8") as f:
+                    write_students(f, synthetic_gradebook(size, seed=k, first_id=100000 + k * (size - 10)).students.values())
+            for w in sorted({1, cpus}):
+                seconds, (gradebook, conflicts) = timed(ingest_files, tmp, None, w)
+                report(f"ingest_files, {w} workers", seconds, n, n)
+            print(f"{'  merged students / conflicting rows':<44} {len(gradebook):,} / {sum(map(len, conflicts.values())):,}")
+
+            # where the time goes with a pool: the workers parse, the main process unpacks and merges
+            # (the wall time cannot drop below the main process share, whatever the number of cores)
+            files = csv_files(tmp)
+            parse, results = timed(lambda: [read_graded(path) for path in files])
+            report("  parse and grade (worker side)", parse, n, n)
+            payloads = [pickle.dumps(pack_rows(rows), pickle.HIGHEST_PROTOCOL) for rows, _ in results]
+            plain = sum(len(pickle.dumps(rows, pickle.HIGHEST_PROTOCOL)) for rows, _ in results)
+            results = None
+
+            def merge():
+                gradebook = Gradebook()
+                for payload in payloads:
+                    merge_rows(gradebook, unpack_rows(pickle.loads(payload)))
+            main, _ = timed(merge)
+            report("  unpickle, unpack and merge (main process)", main, n, n)
+            print(f"{'  payload packed / as row tuples':<44} {sum(map(len, payloads))/2**20:7.1f} / {plain/2**20:.1f} MiB")
+            for cores in (2, 4, 8):
+                print(f"{f'  best case on {cores} cores':<44} {max(main, parse/cores)*1000:10.1f} ms")
+            payloads = None
+            if cpus == 1:
+                print("  one CPU: the pool is not timed, ingest_files parses in process")
+
+def bench_snapshot(sizes):
+    from columnar_store import ColumnarStore
+    from csv_io import read_students, write_students
+    from snapshot import Snapshot, write_snapshot
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, snap_path = os.path.join(tmp, "cohort.csv"), os.path.join(tmp, "cohort.sgcs")
+        for n in sizes:
+            gradebook = Gradebook(ColumnarStore())
+            for row in synthetic_rows(n):
+                gradebook.add_student(*row)
+            with open(csv_path, "w", newline="", encoding="utf-8") as f:
+                write_students(f, gradebook.students.values())
+            seconds, _ = timed(write_snapshot, snap_path, gradebook.students)
+            report("write_snapshot", seconds, n, n, MiB=os.path.getsize(snap_path)/2**20)
+            del gradebook
+
+            def load_csv():
+                loaded = Gradebook(ColumnarStore())
+                with open(csv_path, newline="", encoding="utf-8") as f:
+                    for student in read_students(f):
+                        loaded.put(student)
+                return loaded
+            seconds, _ = timed(load_csv)
+            report("CSV load", seconds, n, n)
+            for verify in (False, True):
+                seconds, snap = timed(Snapshot, snap_path, verify)
+                report(f"Snapshot open (verify={verify})", seconds, n=n)
+                snap.close()
+            with Snapshot(snap_path, verify=False) as snap:
+                ids = random.Random(1).sample(range(100000, 100000 + n), min(n, 1000))
+                seconds, _ = timed(lambda: [snap[str(i)].all_marks() for i in ids])
+                report("  random lookups", seconds, len(ids), n)
+                seconds, store = timed(snap.to_store)
+                report("  to_store", seconds, n, n)
+
+def bench_sqlite(sizes):
+    from columnar_store import ColumnarStore
+    from csv_io import write_students
+    from sqlite_store import SQLiteStore, write_database
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, db_path = os.path.join(tmp, "cohort.csv"), os.path.join(tmp, "cohort.db")
+        for n in sizes:
+            gradebook = Gradebook(ColumnarStore())
+            for row in synthetic_rows(n):
+                gradebook.add_student(*row)
+
+            def write_csv(students):
+                with open(csv_path, "w", newline="", encoding="utf-8") as f:
+                    write_students(f, students.values())
+            seconds, _ = timed(write_csv, gradebook.students)
+            report("CSV rewrite", seconds, n, n)
+            seconds, _ = timed(write_database, db_path, gradebook.students)
+            report("write_database", seconds, n, n, MiB=os.path.getsize(db_path)/2**20)
+            del gradebook
+
+            seconds, store = timed(SQLiteStore, db_path)
+            report("  open (counts only)", seconds, n=n)
+            ids = [str(i) for i in random.Random(1).sample(range(100000, 100000 + n), min(n, 1000))]
+            seconds, _ = timed(lambda: [store[sid].all_marks() for sid in ids])
+            report("  random lookups", seconds, len(ids), n)
+            seconds, db_gradebook = timed(Gradebook, store)
+            report("  Gradebook (summaries read)", seconds, n, n)
+
+            # one edit is one transaction, to compare with the CSV rewrite above
+            edits = ids[:200]
+            seconds, _ = timed(lambda: [db_gradebook.delete_student(sid) for sid in edits])
+            report("  delete_student, persisted", seconds, len(edits), n)
+            rows = list(synthetic_rows(len(edits), seed=2, first_id=100000 + n))
+            seconds, _ = timed(lambda: [db_gradebook.add_student(*row) for row in rows])
+            report("  add_student rows, persisted", seconds, len(rows), n)
+            store.close()
+
+def bench_classification(sizes):
+    from classification import ClassificationRules, DegreeClassifier, degree_result, year_result
+
+    for n in sizes:
+        gradebook = synthetic_gradebook(n)
+        classifier = DegreeClassifier(gradebook)
+        gradebook.add_listener(classifier)
+
+        def uncached():
+            return {sid: degree_result({y: year_result(y, d) for y, d in s.year_data.items()})
+                    for sid, s in gradebook.items()}
+        seconds, _ = timed(uncached)
+        report("uncached classification", seconds, n, n)
+        seconds, _ = timed(classifier.classify_all)
+        report("  classify_all, cold cache", seconds, n, n)
+        seconds, _ = timed(classifier.classify_all)
+        report("  classify_all, warm cache", seconds, n, n)
+
+        # a few students get one year remarked: only those years are recomputed
+        rng = random.Random(2)
+        ids = rng.sample(list(gradebook.students), min(n, 1000))
+        for sid in ids:
+            year, data = next(iter(gradebook[sid].year_data.items()))
+            gradebook.update_year(sid, year, data["modules"], [float(rng.randint(20, 95)) for _ in data["marks"]])
+        seconds, _ = timed(classifier.classify_all)
+        report("  after year edits", seconds, n, n, edits=len(ids))
+        classifier.use_rules(ClassificationRules({"Year 1": 10, "Year 2": 30, "Year 3": 60}))
+        seconds, _ = timed(classifier.classify_all)
+        report("  after a year weight change", seconds, n, n)
+
+def bench_table(sizes):
+    import tkinter as tk
+    from virtual_table import VirtualTable
+
+    root = tk_root()
+    if root is None: return
+    try:
+        for n in sizes:
+            ids = [str(100000 + i) for i in range(n)]
+            table = VirtualTable(tk.Frame(root), ("ID", "Name"), lambda sid: (sid, "Name " + sid))
+            seconds, _ = timed(table.set_ids, ids)
+            report("VirtualTable.set_ids", seconds, n=n)
+            seconds, _ = timed(lambda: [table.scroll(37) for _ in range(1000)])
+            report("  scroll x1000", seconds, 1000, n)
+            seconds, _ = timed(lambda: [table.refresh(sid) for sid in table.visible * 100])
+            report("  refresh visible rows x100", seconds, len(table.visible) * 100, n)
+            seconds, _ = timed(table.remove, ids[n // 2])
+            report("  remove (middle row)", seconds, n=n)
+            table.tree.master.destroy()
+    finally:
+        root.destroy()
+
+def bench_incremental(sizes):
+    from columnar_store import ColumnarStore
+
+    for n in sizes:
+        gradebook = Gradebook(ColumnarStore())
+        for row in synthetic_rows(n):
+            gradebook.add_student(*row)
+        rng = random.Random(2)
+        ids = rng.choices(list(gradebook.students), k=1000)
+        modules = YEAR_MODULES["Year 1"]
+        seconds, _ = timed(lambda: [gradebook.update_year(sid, "Year 1", modules, [float(rng.randint(20, 95)) for _ in modules])
+                                    for sid in ids])
+        report("update_year + stats", seconds, len(ids), n)
+        seconds, _ = timed(lambda: gradebook.stats.summary())
+        report("  stats summary", seconds, n=n)
+
+        def rescan():
+            counts = {}
+            for record in gradebook.students.values():
+                counts[record.grade] = counts.get(record.grade, 0) + 1
+            return counts
+        seconds, counts = timed(rescan)
+        assert counts == gradebook.stats.grade_counts
+        report("  full rescan of grade counts (before)", seconds, n=n)
+
+class EventLoop:
+    # stand-in for the Tk mainloop: runs after() callbacks and records the longest gap between them
+    def __init__(self):
+        self.pending = []
+        self.longest_gap = 0
+
+    def after(self, ms, callback):
+        self.pending.append((time.perf_counter() + ms / 1000, callback))
+
+    def run(self, until):
+        last = time.perf_counter()
+        while not until():
+            self.pending.sort(key=lambda item: item[0])
+            due, callback = self.pending.pop(0)
+            time.sleep(max(0, due - time.perf_counter()))
+            now = time.perf_counter()
+            self.longest_gap = max(self.longest_gap, now - last)
+            last = now
+            callback()
+
+def bench_background(sizes):
+    from background import PROGRESS_EVERY, BackgroundTask
+    from columnar_store import ColumnarStore
+    from csv_io import read_students
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cohort.csv")
+        for n in sizes:
+            write_synthetic_csv(path, n)
+
+            def load(task):
+                gradebook = Gradebook(ColumnarStore())
+                with open(path, newline="", encoding="utf-8") as f:
+                    for k, student in enumerate(read_students(f), start=1):
+                        gradebook.put(student)
+                        if k % PROGRESS_EVERY == 0:
+                            task.progress(k / n, "")
+                return gradebook
+
+            loop = EventLoop()
+            updates = []
+            task = BackgroundTask(loop, load, on_progress=lambda fraction, message: updates.append(fraction))
+            seconds, _ = timed(lambda: (task.start(), loop.run(lambda: not task.running())))
+            report("background load", seconds, n, n)
+            print(f"{'  longest UI stall / progress updates':<44} {loop.longest_gap*1000:7.1f} ms / {len(updates):,}")
+            seconds, _ = timed(load, task)
+            report("  same load on the UI thread (one stall)", seconds, n, n)
+
+def bench_report(sizes):
+    from itertools import islice
+    from report import ReportView, export_report, report_blocks
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            students = synthetic_gradebook(n).students
+            seconds, _ = timed(lambda: "".join(islice(report_blocks(students), ReportView.PAGE)))
+            report("first report page", seconds, ReportView.PAGE, n)
+            for ext in ("txt", "html"):
+                path = os.path.join(tmp, "report." + ext)
+                seconds, _ = timed(export_report, path, students)
+                report(f"  export_report .{ext}", seconds, n, n, MiB=os.path.getsize(path)/2**20)
+
+def bench_search(sizes):
+    from columnar_store import ColumnarStore
+    from search_index import StudentIndex
+
+    queries = [("name prefix 'emma k'", {"prefix": "emma k"}), ("grade A", {"grade": "A"}),
+               ("failing + Year 2", {"failing": True, "year": "Year 2"}), ("grade B by average", {"grade": "B", "sort": "average"}),
+               ("all by Year 1 average", {"sort": "year", "sort_year": "Year 1", "descending": True})]
+    for n in sizes:
+        gradebook = Gradebook(ColumnarStore())
+        for row in synthetic_rows(n):
+            gradebook.add_student(*row)
+        index = StudentIndex(gradebook)
+        seconds, _ = timed(lambda: (gradebook.add_listener(index), index.flush()))
+        report("build StudentIndex", seconds, n, n)
+        for label, query in queries:
+            seconds, ids = timed(lambda: index.search(**query))
+            report(f"  {label}", seconds, n=n, hits=len(ids))
+        rng = random.Random(3)
+        ids = rng.choices(list(gradebook.students), k=1000)
+        modules = YEAR_MODULES["Year 1"]
+
+        def edit_and_search():
+            for sid in ids:
+                gradebook.update_year(sid, "Year 1", modules, [float(rng.randint(20, 95)) for _ in modules])
+                index.search(grade="A", sort="average")
+        seconds, _ = timed(edit_and_search)
+        report("  update_year + grade A by average", seconds, len(ids), n)
+
+        def scan():
+            return [sid for sid, record in gradebook.students.items() if record.get_name().casefold().startswith("emma k")]
+        seconds, _ = timed(scan)
+        report("  linear scan for a name prefix (before)", seconds, n=n)
+
+FIRST_CHART = """
+import time
+start = time.perf_counter()
+if {prewarm}:
+    from background import prewarm
+    prewarm(("matplotlib.pyplot",)).join()  # the user is still filling the form
+    start = time.perf_counter()
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+plt.figure(figsize=(10, 4))
+plt.subplot(1, 2, 1)
+plt.pie([5, 3, 2, 1, 4], labels=list("ABCDF"))
+plt.subplot(1, 2, 2)
+plt.bar([str(i) for i in range(20)], range(20))
+plt.gcf().canvas.draw()
+print(time.perf_counter() - start)
+"""
+
+def bench_startup(sizes):
+    for module in ("grading_engine", "Student_Grade_Calculator", "matplotlib.pyplot"):
+        us = import_time(module)
+        if us is None:
+            print(f"{'import ' + module:<44} {'not installed':>10}")
+        else:
+            print(f"{'import ' + module:<44} {us/1000:10.1f} ms")
+    for label, warm in (("first chart, cold import", False), ("first chart, after background import", True)):
+        done = subprocess.run([sys.executable, "-c", FIRST_CHART.format(prewarm=warm)], capture_output=True, text=True)
+        if done.returncode:
+            print(f"{label:<44} skipped ({done.stderr.strip().splitlines()[-1]})")
+        else:
+            report(label, float(done.stdout))
+
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"window build skipped (no display: {e})")
+        return
+    from Student_Grade_Calculator import GradeCalculatorApp
+    try:
+        seconds, _ = timed(lambda: (GradeCalculatorApp(root), root.update()))
+        report("GradeCalculatorApp window build", seconds)
+    finally:
+        root.destroy()
+
+def bench_charts(sizes):
+    try:
+        import matplotlib
+    except ImportError:
+        print("skipped (matplotlib not installed)")
+        return
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from charts import cohort_bins, export_charts
+    from columnar_store import ColumnarStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            gradebook = Gradebook(ColumnarStore())
+            for row in synthetic_rows(n):
+                gradebook.add_student(*row)
+            seconds, bins = timed(cohort_bins, gradebook.students)
+            report("cohort_bins", seconds, n, n)
+            for ext in ("png", "svg"):
+                seconds, _ = timed(export_charts, os.path.join(tmp, "charts." + ext), bins)
+                report(f"  aggregated charts -> .{ext}", seconds, n=n)
+            if n <= 1000:
+                # the per-student bar chart, for comparison
+                def bar_chart():
+                    records = list(gradebook.students.values())
+                    plt.figure(figsize=(10, 4))
+                    plt.bar([r.get_name() for r in records], [r.average for r in records])
+                    plt.xticks(rotation=45, ha="right")
+                    plt.tight_layout()
+                    plt.savefig(os.path.join(tmp, "bars.png"))
+                    plt.close("all")
+                seconds, _ = timed(bar_chart)
+                report("  per-student bar chart -> .png (before)", seconds, n=n)
+
+BENCHMARKS = {
+    "hotpaths": bench_hotpaths,
+    "engine": bench_engine,
+    "batch": bench_batch,
+    "classification": bench_classification,
+    "memory": bench_memory,
+    "csv": bench_csv,
+    "ingest": bench_ingest,
+    "snapshot": bench_snapshot,
+    "sqlite": bench_sqlite,
+    "table": bench_table,
+    "incremental": bench_incremental,
+    "background": bench_background,
+    "report": bench_report,
+    "search": bench_search,
+    "startup": bench_startup,
+    "charts": bench_charts,
+}
+
+# ---------------- Run ----------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the grading engine")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--sizes", default="1k,100k", help="comma separated cohort sizes, e.g. 1k,100k,1M")
+    parser.add_argument("--xvfb", action="store_true", help="start a virtual X display for the GUI benchmarks")
+    parser.add_argument("--profile", metavar="DIR", help="write cProfile and tracemalloc dumps of every benchmark")
+    parser.add_argument("--save-baseline", metavar="FILE", help="save the results as a baseline (JSON)")
+    parser.add_argument("--baseline", metavar="FILE", help="compare with a saved baseline, exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="slowdown reported as a regression")
+    args = parser.parse_args()
+    sizes = parse_sizes(args.sizes)
+    for name in args.names:
+        if name not in BENCHMARKS: parser.error(f"unknown benchmark: {name}")
+    if args.profile and (args.save_baseline or args.baseline):
+        parser.error("profiled timings are not comparable, run --profile without baselines")
+    xvfb = start_xvfb() if args.xvfb else None
+    try:
+        for section in args.names or BENCHMARKS:
+            print(f"---------------- {section} ----------------")
+            if args.profile:
+                profiled(section, sizes, args.profile)
+            else:
+                BENCHMARKS[section](sizes)
+    finally:
+        if xvfb is not None: xvfb.terminate()
+    if args.save_baseline:
+        save_baseline(args.save_baseline, sizes)
+    if args.baseline and compare_baseline(args.baseline, sizes, args.tolerance, args.names or list(BENCHMARKS)):
+        sys.exit(1)
@@ -0,0 +1,143 @@
+import csv
+import os
+from array import array
+from functools import partial
+
+from csv_io import BUFFER_SIZE, RowError, RowParser
+from grading_engine import Gradebook, GradebookError, Student
+from grading_scheme import DEFAULT_SCHEME
+
+POOL_MIN_BYTES = 8 << 20  # files smaller than this in total are parsed in process
+
+# ---------------- Files ----------------
+def csv_files(paths):
+    # expand directories into their .csv files (sorted), keep plain files as given
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(".csv"))
+        else:
+            files.append(os.fspath(path))
+    return files
+
+# ---------------- Worker ----------------
+def graded_rows(f, scheme=DEFAULT_SCHEME):
+    # parse an open CSV file, checking every row, and regrade it (under the gradebook's scheme)
+    # returns (rows, errors) where rows are (id, name, year_data, average, grade, remark, line) tuples
+    # and errors are csv_io.RowErrors for the bad rows that were left out
+    rows, errors = [], []
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None: return rows, errors
+    parser = RowParser(header, scheme)
+    for row in reader:
+        if not row: continue
+        line = reader.line_num
+        try:
+            student = parser.student(row, line)
+        except RowError as e:
+            errors.append(e)
+            continue
+        student.regrade(scheme)
+        rows.append((student.get_id(), student.get_name(), student.year_data,
+                     student.average, student.grade, student.remark, line))
+    return rows, errors
+
+def read_graded(path, scheme=DEFAULT_SCHEME):
+    # graded_rows of one file
+    try:
+        with open(path, "r", newline="", encoding="utf-8", buffering=BUFFER_SIZE) as f:
+            return graded_rows(f, scheme)
+    except RowError as e:
+        return [], [e]
+    except Exception as e:
+        # an unreadable file is skipped as a whole
+        return [], [RowError(None, None, f"Failed to load file: {e}")]
+
+def parse_and_grade(path, scheme=DEFAULT_SCHEME):
+    # runs in a worker process: read_graded, packed for the trip back (see pack_rows)
+    rows, errors = read_graded(path, scheme)
+    return path, pack_rows(rows), errors
+
+def pack_rows(rows):
+    # graded rows as flat columns: pickling a dict per student cost more than parsing the file,
+    # arrays are copied as one block and the repeated year/module lists and results are sent once
+    # (ids, names, averages, results, result codes, layouts, years per student, layout codes, marks, lines)
+    ids, names, averages, lines = [], [], array("d"), array("I")
+    results, result_codes = {}, array("I")
+    layouts, layout_codes, year_counts, marks = {}, array("I"), array("I"), array("d")
+    for sid, name, year_data, average, grade, remark, line in rows:
+        ids.append(sid)
+        lines.append(line)
+        names.append(name)
+        averages.append(average)
+        result_codes.append(results.setdefault((grade, remark), len(results)))
+        year_counts.append(len(year_data))
+        for year, data in year_data.items():
+            layout_codes.append(layouts.setdefault((year, tuple(data["modules"])), len(layouts)))
+            marks.extend(data["marks"])
+    return ids, names, averages, list(results), result_codes, list(layouts), year_counts, layout_codes, marks, lines
+
+def unpack_rows(packed):
+    # the rows of pack_rows again, one at a time
+    ids, names, averages, results, result_codes, layouts, year_counts, layout_codes, marks, lines = packed
+    marks, averages = marks.tolist(), averages.tolist()
+    pos = k = 0
+    for i, sid in enumerate(ids):
+        year_data = {}
+        for _ in range(year_counts[i]):
+            year, modules = layouts[layout_codes[k]]
+            k += 1
+            end = pos + len(modules)
+            year_data[year] = {"modules": list(modules), "marks": marks[pos:end]}
+            pos = end
+        grade, remark = results[result_codes[i]]
+        yield sid, names[i], year_data, averages[i], grade, remark, lines[i]
+
+# ---------------- Merge ----------------
+def merge_rows(gradebook, rows):
+    # merge graded rows (see graded_rows) with the add_student rules, returns a RowError for every conflicting row
+    conflicts = []
+    for row in rows:
+        try:
+            gradebook.add_record(Student(*row[:6]), graded=True)
+        except GradebookError as e:
+            conflicts.append(RowError(row[6], "ID", str(e), "conflict"))
+    return conflicts
+
+def ingest_files(paths, gradebook=None, workers=None, progress=None):
+    # parse and grade many CSV files (or directories of them), across a process pool when they are big enough,
+    # then merge them in file order into one gradebook
+    # workers: processes (None: one per CPU), the pool is only used for POOL_MIN_BYTES of files or more
+    # progress(done, total) is called after every merged file (an exception from it stops the load)
+    # returns (gradebook, conflicts) where conflicts maps file -> list of csv_io.RowErrors (bad rows and conflicts)
+    if gradebook is None:
+        gradebook = Gradebook()
+    files = csv_files(paths)
+    conflicts = {}
+    workers = min(workers or os.cpu_count() or 1, len(files))
+    if workers > 1 and sum(os.path.getsize(path) for path in files if os.path.isfile(path)) < POOL_MIN_BYTES:
+        workers = 1  # starting the processes costs more than parsing small files
+    if workers == 1:
+        parse = partial(read_graded, scheme=gradebook.scheme)
+        results = ((path, *parse(path)) for path in files)
+        pool = None
+    else:
+        # imported here: concurrent.futures.process pulls in multiprocessing, too slow for app startup
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = ((path, unpack_rows(packed), errors)
+                   for path, packed, errors in pool.map(partial(parse_and_grade, scheme=gradebook.scheme), files))
+    try:
+        for done, (path, rows, errors) in enumerate(results, start=1):
+            problems = errors + merge_rows(gradebook, rows)
+            if problems:
+                conflicts[path] = problems
+            if progress is not None:
+                progress(done, len(files))
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return gradebook, conflicts
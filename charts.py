@@ -0,0 +1,192 @@
+from columnar_store import ColumnarStore
+from grading_engine import AVERAGE_BINS
+from grading_scheme import DEFAULT_SCHEME
+
+BINS = AVERAGE_BINS  # one bin per whole mark (0-0.99, 1-1.99, ... 100)
+DETAIL_LIMIT = 50  # up to this many students the per-student bar chart is still readable
+WHISKERS = (0.05, 0.95)  # box plot whiskers (percentiles), outliers are not drawn
+
+# ---------------- Binned counts ----------------
+class CohortBins:
+    # the charts are drawn from these counts only, their size does not grow with the cohort
+    def __init__(self):
+        self.students = 0
+        self.averages = [0] * BINS  # overall averages
+        self.year_averages = {}  # year -> counts of the year averages
+        self.module_marks = {}  # module -> counts of its marks
+        self.year_grades = {}  # year -> students per band code, the band the year's marks alone would give
+        self.boundaries = DEFAULT_SCHEME.boundaries  # grade band minimums, drawn on the histogram
+        self.grades = band_labels(DEFAULT_SCHEME)  # label of every band code, stacking order of the grade chart
+
+def bin_index(value):
+    return min(max(int(value), 0), BINS - 1)
+
+def band_labels(scheme):
+    # legend label of every band code: the letter, with the band's minimum when another band has the same letter
+    labels = []
+    for code, letter in enumerate(scheme.letters):
+        if scheme.letters.count(letter) == 1:
+            labels.append(letter)
+        elif code == scheme.fail_code:
+            labels.append(f"{letter} (fail)")
+        else:
+            labels.append(f"{letter} ({scheme.boundaries[scheme.fail_code - 1 - code]:g}+)")
+    return labels
+
+def cohort_bins(students, scheme=DEFAULT_SCHEME, stats=None):
+    # one pass over a store: array columns are binned with numpy, other stores record by record
+    # year grades follow the given grading scheme; stats: the gradebook's CohortStats, its maintained
+    # student count and averages histogram are used instead of binning the overall averages again
+    bins = _columnar_bins(students, scheme, stats is None) if isinstance(students, ColumnarStore) \
+        else _record_bins(students, scheme, stats is None)
+    bins.boundaries, bins.grades = scheme.boundaries, band_labels(scheme)
+    if stats is not None:
+        bins.students, bins.averages = stats.students, list(stats.average_bins)
+    return bins
+
+def _record_bins(students, scheme, averages):
+    bins = CohortBins()
+    for record in students.values():
+        if averages:
+            bins.students += 1
+            bins.averages[bin_index(record.average)] += 1
+        for year, data in record.year_data.items():
+            marks = data["marks"]
+            average, _, _ = scheme.grade_marks(marks)
+            bins.year_averages.setdefault(year, [0] * BINS)[bin_index(average)] += 1
+            bins.year_grades.setdefault(year, [0] * len(scheme.letters))[scheme.code(average, scheme.fails(marks))] += 1
+            for module, mark in zip(data["modules"], marks):
+                bins.module_marks.setdefault(module, [0] * BINS)[bin_index(mark)] += 1
+    return bins
+
+def _columnar_bins(store, scheme, averages):
+    import numpy as np
+
+    def column(values, dtype):
+        # numpy view of an array/memoryview column (copied out below by fancy indexing)
+        return np.frombuffer(values, dtype=dtype) if len(values) else np.zeros(0, dtype)
+
+    def histogram(values):
+        return np.bincount(np.clip(values.astype(np.int64), 0, BINS - 1), minlength=BINS)
+
+    bins = CohortBins()
+    if len(store) == len(store._ids):
+        rows = np.arange(len(store))
+    else:
+        rows = np.flatnonzero(np.fromiter((sid is not None for sid in store._ids), bool, count=len(store._ids)))
+    if averages:
+        bins.students = len(rows)
+        bins.averages = histogram(column(store._average, np.float64)[rows]).tolist()
+
+    # live segments: follow the year links of the live rows level by level (stale ones are never reached)
+    seg_next = column(store._seg_next, np.int32)
+    segs, seg = [], column(store._first, np.int32)[rows]
+    while seg.size:
+        seg = seg[seg != -1]
+        segs.append(seg)
+        seg = seg_next[seg]
+    segs = np.concatenate(segs) if segs else np.zeros(0, np.int32)
+    years = column(store._seg_year, np.int32)[segs]
+    seg_avg = column(store._seg_avg, np.float64)[segs]
+    starts = column(store._seg_start, np.int64)[segs]
+    lengths = column(store._seg_len, np.int32)[segs].astype(np.int64)
+
+    # marks of the live segments
+    total = int(lengths.sum())
+    offsets = np.cumsum(lengths) - lengths
+    mark_idx = np.arange(total) - np.repeat(offsets, lengths) + np.repeat(starts, lengths)
+    marks = column(store._marks, np.float64)[mark_idx]
+    modules = column(store._modules, np.int32)[mark_idx]
+    seg_of_mark = np.repeat(np.arange(len(segs)), lengths)
+
+    # year grade: same bands as GradingScheme.code, any mark below the pass mark fails the year
+    codes = scheme.fail_code - np.searchsorted(scheme.boundaries, seg_avg, side="right")
+    if scheme.pass_mark is not None:
+        failed = np.bincount(seg_of_mark, weights=marks < scheme.pass_mark, minlength=len(segs)) > 0
+        codes[failed] = scheme.fail_code
+
+    strings = store.strings
+    n_strings = len(strings)
+    year_bins = np.bincount(years * BINS + np.clip(seg_avg.astype(np.int64), 0, BINS - 1),
+                            minlength=n_strings * BINS).reshape(n_strings, BINS)
+    n_grades = len(scheme.letters)
+    year_grades = np.bincount(years * n_grades + codes, minlength=n_strings * n_grades).reshape(n_strings, n_grades)
+    module_bins = np.bincount(modules * BINS + np.clip(marks.astype(np.int64), 0, BINS - 1),
+                              minlength=n_strings * BINS).reshape(n_strings, BINS)
+    for y in sorted(np.unique(years).tolist(), key=lambda i: strings[i]):
+        bins.year_averages[strings[y]] = year_bins[y].tolist()
+        bins.year_grades[strings[y]] = year_grades[y].tolist()
+    for m in np.unique(modules).tolist():
+        bins.module_marks[strings[m]] = module_bins[m].tolist()
+    return bins
+
+# ---------------- Percentiles ----------------
+def percentile(counts, q):
+    # q-th quantile (0..1) of binned values, interpolated inside the bin
+    total = sum(counts)
+    if not total: return 0.0
+    target = q * total
+    seen = 0
+    for i, count in enumerate(counts):
+        if count and seen + count >= target:
+            return min(i + (target - seen) / count, BINS - 1)
+        seen += count
+    return float(BINS - 1)
+
+def box_stats(counts, label):
+    # box plot numbers for Axes.bxp, from counts instead of raw values
+    mean = sum(i * c for i, c in enumerate(counts)) / max(sum(counts), 1) + 0.5
+    return {"label": label, "mean": mean, "med": percentile(counts, 0.5),
+            "q1": percentile(counts, 0.25), "q3": percentile(counts, 0.75),
+            "whislo": percentile(counts, WHISKERS[0]), "whishi": percentile(counts, WHISKERS[1]), "fliers": []}
+
+# ---------------- Drawing ----------------
+def draw_charts(fig, bins):
+    # four aggregated charts on a matplotlib figure: cost depends on the number of bins, not students
+    (hist_ax, year_ax), (module_ax, grade_ax) = fig.subplots(2, 2)
+
+    hist_ax.stairs(bins.averages, range(BINS + 1), fill=True)
+    for boundary in bins.boundaries:
+        hist_ax.axvline(boundary, color="grey", linestyle="--", linewidth=0.8)
+    hist_ax.set_title(f"Overall Averages ({bins.students:,} students)")
+    hist_ax.set_xlabel("Average (%)")
+    hist_ax.set_ylabel("Students")
+
+    stats = [box_stats(c, y) for y, c in bins.year_averages.items() if sum(c)]
+    if stats:
+        year_ax.bxp(stats, showfliers=False, showmeans=True)
+    year_ax.set_title("Year Averages (whiskers: 5th-95th percentile)")
+    year_ax.set_ylabel("Average (%)")
+
+    stats = [box_stats(c, m) for m, c in bins.module_marks.items() if sum(c)]
+    if stats:
+        module_ax.bxp(stats, showfliers=False)
+    module_ax.tick_params(axis="x", labelrotation=45, labelsize=7)
+    for label in module_ax.get_xticklabels():
+        label.set_horizontalalignment("right")
+    module_ax.set_title("Marks per Module")
+    module_ax.set_ylabel("Mark (%)")
+
+    years = list(bins.year_grades)
+    bottom = [0] * len(years)
+    for code, label in enumerate(bins.grades):
+        counts = [bins.year_grades[y][code] for y in years]
+        grade_ax.bar(years, counts, bottom=bottom, label=label)
+        bottom = [b + c for b, c in zip(bottom, counts)]
+    grade_ax.legend(title="Grade", fontsize=8)
+    grade_ax.set_title("Grade Distribution by Year")
+    grade_ax.set_ylabel("Students")
+
+    fig.tight_layout()
+    return fig
+
+def export_charts(path, bins, dpi=100):
+    # headless export (no Tk, no pyplot); the format follows the extension (.png, .svg, .pdf ...)
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(12, 8), dpi=dpi)
+    FigureCanvasAgg(fig)
+    draw_charts(fig, bins)
+    fig.savefig(path)
+    return path
@@ -0,0 +1,219 @@
+import json
+from bisect import bisect_right
+
+from grading_engine import DEFAULT_CATALOG
+from grading_scheme import PASS_MARK
+
+UNCLASSIFIED = "Not classified"  # no weighted year taken yet
+
+# ---------------- Rules ----------------
+class ClassificationRules:
+    # how a degree is classified from the years:
+    #   year_weights: {year: weight} of the final average (a year weighted 0 still has to be passed)
+    #   classes: (minimum average, class) bands, below the lowest one the degree is fail_class
+    #   compensation: failed modules with a mark of at least compensate_min, up to compensate_credits
+    #     credits in a year, still pass when the year's credit-weighted average reaches the pass mark
+    #   resit_cap: a resit (the same module listed again in a year) counts at most this much,
+    #     the better of the first attempt and the capped resit is kept
+    def __init__(self, year_weights=None, classes=None, fail_class="Fail", pass_mark=PASS_MARK,
+                 compensate_min=30, compensate_credits=30, resit_cap=PASS_MARK):
+        if year_weights is None: year_weights = {"Year 1": 0, "Year 2": 40, "Year 3": 60}
+        if classes is None:
+            classes = [(70, "First"), (60, "Upper Second (2:1)"), (50, "Lower Second (2:2)"), (40, "Third")]
+        if any(w < 0 for w in year_weights.values()) or not any(year_weights.values()):
+            raise ValueError("Year weights must not be negative, and at least one must be above 0.")
+        classes = sorted((float(minimum), name) for minimum, name in classes)
+        if not classes:
+            raise ValueError("A classification needs at least one class.")
+        self.year_weights = dict(year_weights)
+        self.boundaries = tuple(minimum for minimum, _ in classes)
+        self.classes = (fail_class,) + tuple(name for _, name in classes)  # bisect index -> class
+        self.fail_class = fail_class
+        self.pass_mark = pass_mark
+        self.compensate_min = compensate_min
+        self.compensate_credits = compensate_credits
+        self.resit_cap = resit_cap
+
+    def year_key(self):
+        # the rules a year result depends on: cached year results stay valid while it is unchanged
+        return self.pass_mark, self.compensate_min, self.compensate_credits, self.resit_cap
+
+    def classify(self, average):
+        return self.classes[bisect_right(self.boundaries, average)]
+
+    @classmethod
+    def from_config(cls, config):
+        # {"year_weights": {...}, "classes": [{"min": 70, "name": "First"}, ...], "fail_class": ...,
+        #  "pass_mark": 40, "compensation": {"min_mark": 30, "max_credits": 30}, "resit_cap": 40}
+        compensation = config.get("compensation", {})
+        try:
+            classes = [(c["min"], c["name"]) for c in config["classes"]] if "classes" in config else None
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Every class needs a min and a name ({e}).")
+        return cls(config.get("year_weights"), classes, config.get("fail_class", "Fail"),
+                   config.get("pass_mark", PASS_MARK), compensation.get("min_mark", 30),
+                   compensation.get("max_credits", 30), config.get("resit_cap", PASS_MARK))
+
+DEFAULT_RULES = ClassificationRules()
+
+# ---------------- Year result ----------------
+class YearResult:
+    # one year of one student under the rules
+    __slots__ = ("average", "credits", "passed", "failed", "compensated")
+
+    def __init__(self, average, credits, passed, failed, compensated):
+        self.average = average  # credit-weighted average of the effective module marks
+        self.credits = credits  # credits taken
+        self.passed = passed
+        self.failed = failed  # modules below the pass mark that were not compensated
+        self.compensated = compensated  # modules below the pass mark passed by compensation
+
+def year_result(year, data, catalog=DEFAULT_CATALOG, rules=DEFAULT_RULES):
+    # credit-weighted result of one year's {"modules": [...], "marks": [...]}
+    effective = {}  # module -> mark counted (first attempt, or the capped resit if that is better)
+    for module, mark in zip(data["modules"], data["marks"]):
+        if module in effective:
+            effective[module] = max(effective[module], min(mark, rules.resit_cap))
+        else:
+            effective[module] = mark
+    weighted, credits, below = 0.0, 0, []
+    for module, mark in effective.items():
+        weight = catalog.credits(year, module)
+        weighted += mark * weight
+        credits += weight
+        if mark < rules.pass_mark:
+            below.append((module, mark, weight))
+    average = weighted/credits if credits else 0
+    compensated = []
+    if below and average >= rules.pass_mark:
+        # compensate only when every failed module qualifies, within the credit limit
+        if (all(mark >= rules.compensate_min for _, mark, _ in below)
+                and sum(weight for _, _, weight in below) <= rules.compensate_credits):
+            compensated = [module for module, _, _ in below]
+    failed = [] if compensated else [module for module, _, _ in below]
+    return YearResult(average, credits, not failed and credits > 0, failed, compensated)
+
+def degree_result(year_results, rules=DEFAULT_RULES):
+    # (average, class, complete) from {year: YearResult}
+    # the average is weighted by year_weights over the weighted years taken, complete once every one is;
+    # any failed year (weighted or not) gives the fail class, no weighted year yet gives UNCLASSIFIED
+    weighted, weights = 0.0, 0
+    for year, weight in rules.year_weights.items():
+        result = year_results.get(year)
+        if weight and result is not None:
+            weighted += result.average * weight
+            weights += weight
+    average = weighted/weights if weights else 0
+    complete = all(year in year_results for year, weight in rules.year_weights.items() if weight)
+    if any(not result.passed for result in year_results.values()):
+        return average, rules.fail_class, complete
+    if not weights:
+        return average, UNCLASSIFIED, complete
+    return average, rules.classify(average), complete
+
+def degree_text(result):
+    # text shown in the "Degree" column
+    average, name, complete = result
+    if name == UNCLASSIFIED: return name
+    return f"{name} ({average:.2f})" if complete else f"{name} ({average:.2f}, provisional)"
+
+# ---------------- Classifier ----------------
+class DegreeClassifier:
+    # degree classification of every student, as a gradebook listener with a per-year cache:
+    # a year is computed once and recomputed only after its own marks change (years_changed), or when a
+    # whole record is replaced; changing year weights or classes reuses every cached year
+    def __init__(self, gradebook, catalog=DEFAULT_CATALOG, rules=DEFAULT_RULES):
+        self.gradebook = gradebook
+        self.catalog = catalog
+        self.rules = rules
+        self.reset()
+
+    def reset(self):
+        self.years = {}  # id -> {year: YearResult}, in the record's year order
+        self.stale = set()  # ids with cached years dropped, the rest of their years are still valid
+        self.partial = set()  # ids whose next change() only touched the years already dropped
+        self.degrees = {}  # id -> (average, class, complete), dropped with any of the student's years
+
+    # ---------------- Listener ----------------
+    def years_changed(self, sid, years):
+        # called before changed() when only these years' marks changed (empty: no marks changed)
+        cached = self.years.get(sid)
+        if years: self.degrees.pop(sid, None)
+        if cached is not None and years:
+            for year in years:
+                cached.pop(year, None)
+            self.stale.add(sid)
+        self.partial.add(sid)
+
+    def changed(self, sid, old, new):
+        if sid in self.partial:
+            self.partial.discard(sid)
+            if new is not None: return
+        self.years.pop(sid, None)
+        self.stale.discard(sid)
+        self.degrees.pop(sid, None)
+
+    # ---------------- Rules ----------------
+    def use_rules(self, rules, catalog=None):
+        # switch rules (and catalog); year results are kept unless the year rules or credits change
+        if catalog is not None and catalog is not self.catalog:
+            self.catalog = catalog
+            self.reset()
+        if rules.year_key() != self.rules.year_key():
+            self.reset()
+        self.degrees.clear()
+        self.rules = rules
+
+    # ---------------- Queries ----------------
+    def year_results(self, sid):
+        # {year: YearResult} of a student, in the record's year order (do not modify it)
+        # a cached student is answered without reading the store, otherwise only the missing years are computed
+        cached = self.years.get(sid)
+        if cached is not None and sid not in self.stale:
+            return cached
+        cached = cached or {}
+        year_data = self.gradebook.students[sid].year_data
+        results = {}
+        for year, data in year_data.items():
+            result = cached.get(year)
+            results[year] = result if result is not None else year_result(year, data, self.catalog, self.rules)
+        self.years[sid] = results
+        self.stale.discard(sid)
+        return results
+
+    def year_averages(self, sid):
+        # credit-weighted average of every year
+        return {year: result.average for year, result in self.year_results(sid).items()}
+
+    def classify(self, sid):
+        # (average, class, complete) of one student
+        result = self.degrees.get(sid)
+        if result is None:
+            result = self.degrees[sid] = degree_result(self.year_results(sid), self.rules)
+        return result
+
+    def classify_all(self, ids=None):
+        # id -> (average, class, complete) for a cohort (every student by default)
+        ids = self.gradebook.students if ids is None else ids
+        return {sid: self.classify(sid) for sid in ids}
+
+    def class_counts(self, ids=None):
+        # class -> number of students (complete or provisional)
+        counts = {}
+        for _, name, _ in self.classify_all(ids).values():
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+def find_classifier(gradebook):
+    # the DegreeClassifier listening to a gradebook, None if there is none
+    for listener in gradebook.listeners:
+        if isinstance(listener, DegreeClassifier):
+            return listener
+    return None
+
+# ---------------- Config file ----------------
+def load_rules(path):
+    # the "classification" section of a grading config (see grading_scheme.load_config), None without one
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    return ClassificationRules.from_config(config["classification"]) if "classification" in config else None
@@ -0,0 +1,314 @@
+from array import array
+
+from grading_engine import Person, GradebookError, mark_totals
+
+# ---------------- String table ----------------
+class StringTable:
+    # every distinct string (module, year, grade, remark) is kept once and referenced by index
+    __slots__ = ("strings", "ids")
+
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def intern(self, text):
+        idx = self.ids.get(text)
+        if idx is None:
+            idx = self.ids[text] = len(self.strings)
+            self.strings.append(text)
+        return idx
+
+    def __getitem__(self, idx):
+        return self.strings[idx]
+
+    def __len__(self):
+        return len(self.strings)
+
+# ---------------- Record view ----------------
+class StudentRecord(Person):
+    # read-only view of one student in a ColumnarStore, same interface as grading_engine.Student
+    # (id and name live in the store columns, so Person.__init__ is not used)
+    __slots__ = ("_store", "_sid")
+
+    def __init__(self, store, sid):
+        self._store = store
+        self._sid = sid
+
+    def get_id(self):
+        return self._sid
+
+    def get_name(self):
+        return self._store._names[self._store._rows[self._sid]]
+
+    @property
+    def average(self):
+        return self._store._average[self._store._rows[self._sid]]
+
+    @property
+    def grade(self):
+        return self._store.strings[self._store._grade[self._store._rows[self._sid]]]
+
+    @property
+    def remark(self):
+        return self._store.strings[self._store._remark[self._store._rows[self._sid]]]
+
+    @property
+    def year_data(self):
+        return self._store.year_data(self._sid)
+
+    def all_marks(self):
+        return self._store.all_marks(self._sid)
+
+    def module_count(self):
+        return self._store.module_count(self._sid)
+
+    def year_averages(self):
+        return self._store.year_averages(self._sid)
+
+    def summary(self):
+        return f"ID:{self._sid} | Name:{self.get_name()} | Average:{self.average:.2f} | Grade:{self.grade} ({self.remark})"
+
+# ---------------- Columnar store ----------------
+class ColumnarStore:
+    # compact student store: one array per column instead of a dict per student
+    #   rows:     name, average, grade/remark (string ids), first/last year segment,
+    #             running total / count / fails (marks below 40) of all the student's marks
+    #   segments: one per student-year, linked per row in insertion order, with the year's average
+    #   marks:    flat mark and module-id columns, a segment points at a slice of them
+    # marks are array("d"): float32 would change user-entered marks such as 67.3
+    COMPACT_MIN = 4096  # garbage (stale marks / deleted rows) tolerated before compacting
+
+    def __init__(self):
+        self.strings = StringTable()
+        self.clear()
+
+    def clear(self):
+        self._rows = {}  # id -> row
+        self._ids = []  # row -> id (None once deleted)
+        self._names = []
+        self._average = array("d")
+        self._grade = array("i")
+        self._remark = array("i")
+        self._first = array("i")
+        self._last = array("i")
+        self._total = array("d")
+        self._count = array("i")
+        self._fails = array("i")
+        self._seg_year = array("i")
+        self._seg_start = array("q")
+        self._seg_len = array("i")
+        self._seg_next = array("i")
+        self._seg_avg = array("d")
+        self._marks = array("d")
+        self._modules = array("i")
+        self._garbage = 0
+
+    # ---------------- Mapping interface ----------------
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, sid):
+        return sid in self._rows
+
+    def __iter__(self):
+        return (sid for sid in self._ids if sid is not None)
+
+    def __getitem__(self, sid):
+        if sid not in self._rows:
+            raise KeyError(sid)
+        return StudentRecord(self, sid)
+
+    def get(self, sid, default=None):
+        return StudentRecord(self, sid) if sid in self._rows else default
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        return (StudentRecord(self, sid) for sid in self)
+
+    def items(self):
+        return ((sid, StudentRecord(self, sid)) for sid in self)
+
+    # ---------------- Reading ----------------
+    def _segments(self, row):
+        seg = self._first[row]
+        while seg != -1:
+            yield seg
+            seg = self._seg_next[seg]
+
+    def _find_segment(self, row, year_id):
+        for seg in self._segments(row):
+            if self._seg_year[seg] == year_id:
+                return seg
+        return -1
+
+    def year_data(self, sid):
+        # rebuild the {year: {"modules": [...], "marks": [...]}} layout for one student
+        strings = self.strings.strings
+        data = {}
+        for seg in self._segments(self._rows[sid]):
+            start, end = self._seg_start[seg], self._seg_start[seg] + self._seg_len[seg]
+            data[strings[self._seg_year[seg]]] = {"modules": [strings[m] for m in self._modules[start:end]],
+                                                  "marks": self._marks[start:end].tolist()}
+        return data
+
+    def all_marks(self, sid):
+        marks = []
+        for seg in self._segments(self._rows[sid]):
+            start = self._seg_start[seg]
+            marks += self._marks[start:start + self._seg_len[seg]].tolist()
+        return marks
+
+    def module_count(self, sid):
+        return self._count[self._rows[sid]]
+
+    def aggregates(self, sid):
+        # (total, count, fails) of all the student's marks, kept up to date on every write
+        row = self._rows[sid]
+        return self._total[row], self._count[row], self._fails[row]
+
+    def year_averages(self, sid):
+        strings = self.strings.strings
+        return {strings[self._seg_year[seg]]: self._seg_avg[seg] for seg in self._segments(self._rows[sid])}
+
+    # ---------------- Writing ----------------
+    def _new_row(self, sid, name):
+        row = len(self._ids)
+        self._rows[sid] = row
+        self._ids.append(sid)
+        self._names.append(name)
+        self._average.append(0.0)
+        self._grade.append(0)
+        self._remark.append(0)
+        self._first.append(-1)
+        self._last.append(-1)
+        self._total.append(0.0)
+        self._count.append(0)
+        self._fails.append(0)
+        return row
+
+    def _update_aggregates(self, row):
+        self._total[row], self._count[row], self._fails[row] = mark_totals(self.all_marks(self._ids[row]))
+
+    def _segment_average(self, start, length):
+        marks = self._marks[start:start + length].tolist()
+        return sum(marks)/len(marks) if marks else 0
+
+    def _append_marks(self, modules, marks):
+        if len(modules) != len(marks):
+            raise GradebookError(f"{len(modules)} modules but {len(marks)} marks.")
+        start = len(self._marks)
+        self._marks.extend(marks)
+        self._modules.extend(self.strings.intern(m) for m in modules)
+        return start
+
+    def _add_segment(self, row, year_id, start, length, average):
+        # link a new segment at the end of the row's years
+        seg = len(self._seg_year)
+        self._seg_year.append(year_id)
+        self._seg_start.append(start)
+        self._seg_len.append(length)
+        self._seg_next.append(-1)
+        self._seg_avg.append(average)
+        if self._last[row] == -1:
+            self._first[row] = seg
+        else:
+            self._seg_next[self._last[row]] = seg
+        self._last[row] = seg
+
+    def _append_segment(self, row, year, modules, marks):
+        start = self._append_marks(modules, marks)
+        self._add_segment(row, self.strings.intern(year), start, len(marks), self._segment_average(start, len(marks)))
+
+    def put(self, student):
+        # store a whole record, replacing (in place) any record with the same id
+        sid = student.get_id()
+        for data in student.year_data.values():
+            if len(data["modules"]) != len(data["marks"]):
+                raise GradebookError(f"Student ID {sid}: {len(data['modules'])} modules but {len(data['marks'])} marks.")
+        row = self._rows.get(sid)
+        if row is None:
+            row = self._new_row(sid, student.get_name())
+        else:
+            self._names[row] = student.get_name()
+            self._garbage += self.module_count(sid)
+            self._first[row] = self._last[row] = -1
+        for year, data in student.year_data.items():
+            self._append_segment(row, year, data["modules"], data["marks"])
+        self._update_aggregates(row)
+        self.set_result(sid, student.average, student.grade, student.remark)
+        self._maybe_compact()
+        return self[sid]
+
+    def set_year(self, sid, year, modules, marks):
+        # add a year, or replace its marks (same length -> overwritten in place)
+        row = self._rows[sid]
+        seg = self._find_segment(row, self.strings.intern(year))
+        if seg == -1:
+            self._append_segment(row, year, modules, marks)
+        elif self._seg_len[seg] == len(marks) == len(modules):
+            start = self._seg_start[seg]
+            self._marks[start:start + len(marks)] = array("d", marks)
+            self._modules[start:start + len(modules)] = array("i", [self.strings.intern(m) for m in modules])
+            self._seg_avg[seg] = self._segment_average(start, len(marks))
+        else:
+            self._seg_start[seg] = self._append_marks(modules, marks)
+            self._garbage += self._seg_len[seg]
+            self._seg_len[seg] = len(marks)
+            self._seg_avg[seg] = self._segment_average(self._seg_start[seg], len(marks))
+        self._update_aggregates(row)
+        self._maybe_compact()
+
+    def set_result(self, sid, average, grade, remark):
+        row = self._rows[sid]
+        self._average[row] = average
+        self._grade[row] = self.strings.intern(grade)
+        self._remark[row] = self.strings.intern(remark)
+
+    def delete(self, sid):
+        row = self._rows.pop(sid)
+        self._garbage += self._count[row] + 1
+        self._ids[row] = None
+        self._names[row] = None
+        self._maybe_compact()
+
+    # ---------------- Compaction ----------------
+    def _maybe_compact(self):
+        if self._garbage > self.COMPACT_MIN and self._garbage * 2 > len(self._marks) + len(self._ids):
+            self.compact()
+
+    def compact(self):
+        # rewrite the columns without deleted rows and stale marks (row order is kept)
+        if not self._garbage:
+            return
+        old = dict(vars(self))
+        live = [(sid, old["_rows"][sid]) for sid in self]
+        self.clear()
+        for sid, row in live:
+            new_row = self._new_row(sid, old["_names"][row])
+            self._average[new_row] = old["_average"][row]
+            self._grade[new_row] = old["_grade"][row]
+            self._remark[new_row] = old["_remark"][row]
+            self._total[new_row] = old["_total"][row]
+            self._count[new_row] = old["_count"][row]
+            self._fails[new_row] = old["_fails"][row]
+            seg = old["_first"][row]
+            while seg != -1:
+                start, end = old["_seg_start"][seg], old["_seg_start"][seg] + old["_seg_len"][seg]
+                new_start = len(self._marks)
+                self._marks.extend(old["_marks"][start:end])
+                self._modules.extend(old["_modules"][start:end])
+                self._add_segment(new_row, old["_seg_year"][seg], new_start, end - start, old["_seg_avg"][seg])
+                seg = old["_seg_next"][seg]
+
+    def copy(self):
+        # independent copy made of bulk column copies (lets a worker thread change it while the UI reads this one)
+        other = ColumnarStore()
+        for name, value in vars(self).items():
+            if isinstance(value, (dict, list, array)):
+                setattr(other, name, value.copy() if isinstance(value, dict) else value[:])
+        other._garbage = self._garbage
+        other.strings.strings = list(self.strings.strings)
+        other.strings.ids = dict(self.strings.ids)
+        return other
@@ -0,0 +1,275 @@
+import csv
+import json
+import os
+from contextlib import contextmanager
+from itertools import islice
+
+from grading_engine import GradebookError, Student, validate_id, validate_name
+from grading_scheme import DEFAULT_SCHEME
+
+CSV_HEADER = ["ID", "Name", "Year_Data", "Average", "Grade", "Remark"]
+REQUIRED_COLUMNS = ("ID", "Name", "Year_Data")  # without the result columns every row is graded
+CHUNK_SIZE = 1000  # rows handled per writerows() call
+BUFFER_SIZE = 1 << 20  # file buffer for large exports
+AVERAGE_TOLERANCE = 0.0051  # stored averages are rounded to 2 decimals
+MAX_ROW_ERRORS = 10000  # errors kept per file, the rest are only counted
+
+# ---------------- Year_Data cell ----------------
+def parse_year_data(text):
+    # "Year 1:Mod A|Mod B:55.0|61.5;Year 2:..." -> {year: {"modules": [...], "marks": [...]}}
+    year_data = {}
+    for ydata in text.split(";"):
+        if not ydata: continue
+        y, m_str, marks_str = ydata.split(":")
+        year_data[y] = {"modules": m_str.split("|"), "marks": list(map(float, marks_str.split("|")))}
+    return year_data
+
+def check_year_data(text):
+    # parse_year_data that says what is wrong: a module or year name containing ':' or '|',
+    # module and mark counts that differ, marks that are not numbers between 0 and 100
+    year_data = {}
+    for ydata in text.split(";"):
+        if not ydata: continue
+        parts = ydata.split(":")
+        if len(parts) != 3:
+            if len(parts) < 3: raise ValueError(f"{ydata[:40]!r} is not Year:Modules:Marks")
+            raise ValueError(f"{parts[0]}: a year or module name contains ':'")
+        y, m_str, marks_str = parts
+        if not y: raise ValueError("empty year name")
+        if y in year_data: raise ValueError(f"{y} is listed twice")
+        modules, raw_marks = m_str.split("|"), marks_str.split("|")
+        if len(modules) != len(raw_marks):
+            hint = " (a module name contains '|'?)" if len(modules) > len(raw_marks) else ""
+            raise ValueError(f"{y}: {len(modules)} modules but {len(raw_marks)} marks{hint}")
+        if "" in modules: raise ValueError(f"{y}: empty module name")
+        try:
+            marks = list(map(float, raw_marks))
+        except ValueError:
+            raise ValueError(f"{y}: marks must be numbers ({marks_str[:40]!r})")
+        total = sum(marks)  # nan if any mark is nan
+        if total != total or min(marks) < 0 or max(marks) > 100:
+            raise ValueError(f"{y}: marks must be between 0 and 100")
+        year_data[y] = {"modules": modules, "marks": marks}
+    if not year_data: raise ValueError("no marks")
+    return year_data
+
+def format_year_data(year_data):
+    return ";".join([f"{y}:{'|'.join(data['modules'])}:{'|'.join(map(str, data['marks']))}" for y, data in year_data.items()])
+
+# ---------------- Reading ----------------
+def iter_chunks(iterable, size=CHUNK_SIZE):
+    # yield lists of up to size items
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk: return
+        yield chunk
+
+def read_students(f):
+    # yield one Student per row of a save_to_csv file, keeping the stored average/grade/remark
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None: return
+    col = {name: i for i, name in enumerate(header)}
+    i_id, i_name, i_years = col["ID"], col["Name"], col["Year_Data"]
+    i_avg, i_grade, i_remark = col["Average"], col["Grade"], col["Remark"]
+    for row in reader:
+        if not row: continue
+        yield Student(row[i_id], row[i_name], parse_year_data(row[i_years]),
+                      float(row[i_avg]), row[i_grade], row[i_remark])
+
+# ---------------- Validating reader ----------------
+class RowError(Exception):
+    # one problem of one row: line number in the file (the header is line 1, None: not tied to a line),
+    # column (None: the whole row), action: "skipped" (the row was not loaded), "regraded" (loaded, its stored
+    # result did not match the marks) or "conflict" (clashes with a row merged or loaded before it)
+    def __init__(self, line, column, message, action="skipped"):
+        super().__init__(message)
+        self.line = line
+        self.column = column
+        self.message = message
+        self.action = action
+
+    def __reduce__(self):
+        # sent back from worker processes (see bulk_ingest)
+        return RowError, (self.line, self.column, self.message, self.action)
+
+    def __str__(self):
+        where = [f"line {self.line}"] if self.line is not None else []
+        if self.column is not None: where.append(self.column)
+        return f"{', '.join(where)}: {self.message}" if where else self.message
+
+    def to_dict(self):
+        return {"line": self.line, "column": self.column, "message": self.message, "action": self.action}
+
+class RowParser:
+    # checks every cell of save_to_csv rows, a RowError names the first bad one
+    # verify: scheme to recompute stored results with (None trusts them); files without result columns are graded with it
+    def __init__(self, header, verify=None):
+        col = {name: i for i, name in enumerate(header)}
+        missing = [name for name in REQUIRED_COLUMNS if name not in col]
+        if missing:
+            raise RowError(1, None, f"missing column(s) {', '.join(missing)}")
+        self.width = len(header)
+        self.i_id, self.i_name, self.i_years = col["ID"], col["Name"], col["Year_Data"]
+        self.stored = all(name in col for name in CSV_HEADER[3:])
+        if self.stored:
+            self.i_avg, self.i_grade, self.i_remark = col["Average"], col["Grade"], col["Remark"]
+        elif verify is None:
+            verify = DEFAULT_SCHEME
+        self.verify = verify
+
+    def student(self, row, line):
+        # the row's student with its marks only (no result yet)
+        if len(row) != self.width:
+            raise RowError(line, None, f"{len(row)} cells, the header has {self.width}")
+        # the usual cells pass the quick checks, the rest go through the app's own validation
+        sid, name = row[self.i_id], row[self.i_name]
+        if not sid.isdigit():
+            try:
+                sid = validate_id(sid)
+            except GradebookError as e:
+                raise RowError(line, "ID", str(e))
+        if not name.replace(" ", "").isalpha() or name[0] == " " or name[-1] == " ":
+            try:
+                name = validate_name(name)
+            except GradebookError as e:
+                raise RowError(line, "Name", str(e))
+        try:
+            year_data = check_year_data(row[self.i_years])
+        except ValueError as e:
+            raise RowError(line, "Year_Data", str(e))
+        return Student(sid, name, year_data)
+
+    def parse(self, row, line):
+        # (student, problem): problem is a "regraded" RowError when verify changed the stored result, else None
+        student = self.student(row, line)
+        if not self.stored:
+            student.regrade(self.verify)
+            return student, None
+        try:
+            average = float(row[self.i_avg])
+        except ValueError:
+            raise RowError(line, "Average", f"{row[self.i_avg][:20]!r} is not a number")
+        grade, remark = row[self.i_grade], row[self.i_remark]
+        if self.verify is None:
+            student.average, student.grade, student.remark = average, grade, remark
+            return student, None
+        student.regrade(self.verify)
+        if abs(student.average - average) > AVERAGE_TOLERANCE or grade != student.grade or remark != student.remark:
+            return student, RowError(line, "Grade", f"stored {average:.2f} {grade} but the marks give "
+                                     f"{student.average:.2f} {student.grade}", "regraded")
+        return student, None
+
+class LoadReport:
+    # outcome of load_students: rows read, students loaded, and the row errors in file order
+    def __init__(self, path=None):
+        self.path = path
+        self.rows = 0
+        self.loaded = 0
+        self.errors = []
+        self.more_errors = 0  # errors beyond MAX_ROW_ERRORS, counted only
+        self.skipped = 0
+
+    def add(self, error):
+        if error.action == "skipped": self.skipped += 1
+        if len(self.errors) < MAX_ROW_ERRORS: self.errors.append(error)
+        else: self.more_errors += 1
+
+    def error_count(self):
+        return len(self.errors) + self.more_errors
+
+    def summary(self):
+        text = f"{self.loaded:,} of {self.rows:,} rows loaded"
+        if self.skipped: text += f", {self.skipped:,} skipped"
+        regraded = self.error_count() - self.skipped
+        if regraded: text += f", {regraded:,} regraded"
+        return text
+
+    def to_dict(self):
+        return {"file": self.path, "rows": self.rows, "loaded": self.loaded, "skipped": self.skipped,
+                "errors": self.error_count(), "listed": [e.to_dict() for e in self.errors]}
+
+def load_students(f, target, verify=None, progress=None, path=None, every=10000, lines=None):
+    # one validating pass over a save_to_csv file into target (a staging store or gradebook: put() and 'in')
+    # bad rows and repeated ids are skipped and reported, the rest is loaded; returns a LoadReport
+    # progress(report) is called every so many rows, lines (a dict) gets the line number of every loaded id
+    report = LoadReport(path)
+    reader = csv.reader(f)
+    try:
+        header = next(reader, None)
+        if header is None: raise RowError(1, None, "empty file")
+        parser = RowParser(header, verify)
+    except (RowError, csv.Error) as e:
+        report.add(e if isinstance(e, RowError) else RowError(1, None, str(e)))
+        return report
+    parse, put, add = parser.parse, target.put, report.add
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        except csv.Error as e:
+            report.rows += 1
+            add(RowError(reader.line_num, None, str(e)))
+            continue
+        if not row: continue
+        report.rows += 1
+        try:
+            student, problem = parse(row, reader.line_num)
+        except RowError as e:
+            add(e)
+            continue
+        if student.get_id() in target:
+            add(RowError(reader.line_num, "ID", f"Student ID {student.get_id()} is on an earlier line"))
+            continue
+        put(student)
+        if lines is not None: lines[student.get_id()] = reader.line_num
+        report.loaded += 1
+        if problem is not None: add(problem)
+        if progress is not None and report.rows % every == 0: progress(report)
+    return report
+
+def write_error_report(path, reports):
+    # machine-readable report of one or more loads (JSON)
+    reports = [reports] if isinstance(reports, LoadReport) else reports
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"files": [report.to_dict() for report in reports]}, f, indent=1)
+
+def grade_stream(students):
+    # regrade records on the fly while they stream past
+    for student in students:
+        student.regrade()
+        yield student
+
+# ---------------- Writing ----------------
+@contextmanager
+def atomic_write(path):
+    # yields a path next to the target to write to, renamed over the target once the block completes:
+    # a failed or cancelled write (any exception, KeyboardInterrupt included) leaves the old file alone
+    part_path = path + ".part"
+    try:
+        yield part_path
+        os.replace(part_path, path)
+    except BaseException:
+        if os.path.exists(part_path): os.remove(part_path)
+        raise
+
+def student_row(student):
+    return [student.get_id(), student.get_name(), format_year_data(student.year_data), f"{student.average:.2f}", student.grade, student.remark]
+
+def write_students(f, students, chunk_size=CHUNK_SIZE):
+    # write the header and one row per student, chunk by chunk; returns the number of rows
+    writer = csv.writer(f)
+    writer.writerow(CSV_HEADER)
+    count = 0
+    for chunk in iter_chunks(students, chunk_size):
+        writer.writerows([student_row(s) for s in chunk])
+        count += len(chunk)
+    return count
+
+def regrade_csv(src_path, dst_path, chunk_size=CHUNK_SIZE):
+    # read, regrade and rewrite a file without holding it in memory; returns the number of rows
+    with open(src_path, "r", newline="", encoding="utf-8", buffering=BUFFER_SIZE) as src, \
+         open(dst_path, "w", newline="", encoding="utf-8", buffering=BUFFER_SIZE) as dst:
+        return write_students(dst, grade_stream(read_students(src)), chunk_size)
@@ -0,0 +1,409 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from html import escape
+
+from csv_io import (BUFFER_SIZE, CSV_HEADER, RowError, RowParser, atomic_write, iter_chunks, load_students, student_row,
+                    write_error_report)
+from grading_engine import Gradebook, GradebookError
+from grading_scheme import DEFAULT_SCHEME, load_config
+from report import HTML_HEAD, HTML_TAIL, REPORT_TITLE, student_report
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "grading.json")  # same file as the app
+FORMATS = ("csv", "jsonl", "txt", "html")
+CHART_FORMATS = ("png", "svg", "pdf")  # export only
+FORMAT_EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".json": "jsonl", ".txt": "txt", ".html": "html",
+                     ".htm": "html", ".png": "png", ".svg": "svg", ".pdf": "pdf"}
+ROWS_PER_TASK = 5000  # CSV rows sent to a worker process at a time
+MAX_ERRORS = 20  # problems listed on stderr by default
+
+# exit codes for scripts and cron jobs
+EXIT_OK = 0
+EXIT_PROBLEMS = 1  # bad rows, merge conflicts or failed validation (the output still has the good rows)
+EXIT_USAGE = 2  # bad arguments (argparse)
+EXIT_ERROR = 3  # nothing could be done: missing file, unreadable config ...
+
+class CliError(Exception):
+    # stops the command with EXIT_ERROR
+    pass
+
+# ---------------- Input / output ----------------
+def open_input(path):
+    # "-" is stdin (read as UTF-8 with newline="" like the files, for the csv module)
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    try:
+        return open(path, "r", newline="", encoding="utf-8", buffering=BUFFER_SIZE)
+    except OSError as e:
+        raise CliError(f"cannot read {path}: {e.strerror}")
+
+def check_inputs(paths):
+    # fail before any output is written when an input cannot be read
+    for path in paths:
+        if path != "-": open_input(path).close()
+
+@contextmanager
+def open_output(path):
+    # stdout, or a file written through csv_io.atomic_write (like save_to_csv)
+    # devices and pipes (e.g. /dev/null) are written directly, renaming over them would replace them
+    if path == "-":
+        f = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", newline="", write_through=False)
+        try:
+            yield f
+        finally:
+            f.flush()
+            f.detach()
+        return
+    if os.path.exists(path) and not os.path.isfile(path):
+        with output_file(path, path) as f:
+            yield f
+        return
+    with atomic_write(path) as part_path, output_file(part_path, path) as f:
+        yield f
+
+def output_file(path, target):
+    try:
+        return open(path, "w", newline="", encoding="utf-8", buffering=BUFFER_SIZE)
+    except OSError as e:
+        raise CliError(f"cannot write {target}: {e.strerror}")
+
+def output_format(path, fmt, allowed=FORMATS):
+    # --format, or the output file's extension, csv for stdout
+    if fmt is None:
+        fmt = "csv" if path == "-" else FORMAT_EXTENSIONS.get(os.path.splitext(path)[1].lower(), "csv")
+    if fmt not in allowed:
+        raise CliError(f"format {fmt} is not supported here (use {', '.join(allowed)})")
+    return fmt
+
+def student_json(student):
+    return {"id": student.get_id(), "name": student.get_name(), "years": student.year_data,
+            "average": student.average, "grade": student.grade, "remark": student.remark}
+
+def render(students, fmt):
+    # text of some students in an output format (no header/footer, see write_head/write_tail)
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(student_row(s) for s in students)
+        return buffer.getvalue()
+    if fmt == "jsonl":
+        return "".join(json.dumps(student_json(s), ensure_ascii=False) + "\n" for s in students)
+    blocks = (student_report(s.get_id(), s) for s in students)
+    return "".join(map(escape, blocks) if fmt == "html" else blocks)
+
+def write_head(f, fmt):
+    if fmt == "csv": csv.writer(f).writerow(CSV_HEADER)
+    elif fmt == "txt": f.write(REPORT_TITLE)
+    elif fmt == "html": f.write(HTML_HEAD)
+
+def write_tail(f, fmt):
+    if fmt == "html": f.write(HTML_TAIL)
+
+def write_students(f, students, fmt):
+    # a whole cohort in one format, chunk by chunk; returns the number of students
+    write_head(f, fmt)
+    count = 0
+    for chunk in iter_chunks(students):
+        f.write(render(chunk, fmt))
+        count += len(chunk)
+    write_tail(f, fmt)
+    return count
+
+def load_scheme(path):
+    # grading scheme of a config file (grading.json next to this file by default, built-in rules without one)
+    if path is None:
+        if not os.path.exists(DEFAULT_CONFIG): return DEFAULT_SCHEME
+        path = DEFAULT_CONFIG
+    try:
+        scheme, _ = load_config(path)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise CliError(f"cannot use config {path}: {e}")
+    return scheme or DEFAULT_SCHEME
+
+# ---------------- Grade ----------------
+def located(path, error):
+    # "path:line: column: message", like compiler errors
+    column = f"{error.column}: " if error.column else ""
+    return f"{path}:{error.line}: {column}{error.message}" if error.line else f"{path}: {column}{error.message}"
+
+def row_chunks(f, path, scheme):
+    # (parser, [(line number, row), ...]) chunks of a CSV file
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None: return
+    parser = RowParser(header, scheme)
+    chunk = []
+    for row in reader:
+        if not row: continue
+        chunk.append((reader.line_num, row))
+        if len(chunk) == ROWS_PER_TASK:
+            yield parser, chunk
+            chunk = []
+    if chunk:
+        yield parser, chunk
+
+def grade_chunk(path, parser, rows, scheme, fmt):
+    # runs in a worker process (or inline): check, regrade and render CSV rows (stored results are ignored)
+    # returns (text, students, problems)
+    students, problems = [], []
+    for line, row in rows:
+        try:
+            student = parser.student(row, line)
+        except RowError as e:
+            problems.append(located(path, e))
+            continue
+        student.regrade(scheme)
+        students.append(student)
+    return render(students, fmt), len(students), problems
+
+def graded_chunks(inputs, scheme, fmt, workers):
+    # (text, students, problems) for every chunk of every input, in input order
+    # with workers, at most two chunks per worker are in flight (the input is never read ahead whole)
+    def tasks():
+        for path in inputs:
+            with open_input(path) as f:
+                try:
+                    for parser, rows in row_chunks(f, path, scheme):
+                        yield path, parser, rows
+                except RowError as e:
+                    yield path, None, located(path, e)
+                except (csv.Error, UnicodeDecodeError) as e:
+                    yield path, None, f"{path}: {e}"
+
+    if workers == 1:
+        for path, parser, rows in tasks():
+            yield ("", 0, [rows]) if parser is None else grade_chunk(path, parser, rows, scheme, fmt)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for path, parser, rows in tasks():
+            if parser is None:
+                pending.append(("", 0, [rows]))
+            else:
+                pending.append(pool.submit(grade_chunk, path, parser, rows, scheme, fmt))
+            while len(pending) > 2 * workers or (pending and isinstance(pending[0], tuple)):
+                yield result_of(pending.popleft())
+        while pending:
+            yield result_of(pending.popleft())
+
+def result_of(item):
+    return item if isinstance(item, tuple) else item.result()
+
+def cmd_grade(args):
+    # regrade every row of the inputs into one output (rows are not merged, see merge)
+    scheme = load_scheme(args.config)
+    fmt = output_format(args.output, args.format)
+    check_inputs(args.inputs)
+    count, problems = 0, []
+    with open_output(args.output) as out:
+        write_head(out, fmt)
+        for text, students, chunk_problems in graded_chunks(args.inputs, scheme, fmt, args.workers):
+            out.write(text)
+            count += students
+            problems += chunk_problems
+        write_tail(out, fmt)
+    show_problems(problems, args.max_errors)
+    return count, EXIT_PROBLEMS if problems else EXIT_OK
+
+# ---------------- Merge ----------------
+def cmd_merge(args):
+    # merge the inputs with the app's rules (new years are added, conflicting rows are skipped)
+    from bulk_ingest import graded_rows, ingest_files, merge_rows
+    from columnar_store import ColumnarStore
+
+    scheme = load_scheme(args.config)
+    fmt = output_format(args.output, args.format)
+    gradebook = Gradebook(ColumnarStore(), scheme)
+    problems, files = [], []
+
+    def merge_files():
+        if not files: return
+        for path in files:
+            if not os.path.exists(path): raise CliError(f"cannot read {path}: No such file or directory")
+        _, conflicts = ingest_files(files, gradebook, workers=args.workers)
+        for path, errors in conflicts.items():
+            problems.extend(located(path, e) for e in errors)
+        files.clear()
+
+    for path in args.inputs:
+        if path != "-":
+            files.append(path)
+            continue
+        merge_files()  # keep the input order
+        with open_input(path) as f:
+            try:
+                rows, errors = graded_rows(f, scheme)
+            except RowError as e:
+                rows, errors = [], [e]
+            except (csv.Error, UnicodeDecodeError) as e:
+                raise CliError(f"cannot read <stdin>: {e}")
+        errors += merge_rows(gradebook, rows)
+        problems.extend(located("<stdin>", e) for e in errors)
+    merge_files()
+    with open_output(args.output) as out:
+        count = write_students(out, gradebook.students.values(), fmt)
+    show_problems(problems, args.max_errors)
+    return count, EXIT_PROBLEMS if problems else EXIT_OK
+
+# ---------------- Validate ----------------
+def merge_conflicts(store, report, seen, lines):
+    # rows the app would refuse to merge with the earlier inputs (seen: id -> (name, years) so far)
+    # lines: id -> line number in this input (from load_students)
+    for sid, student in store.items():
+        name, years = student.get_name(), student.year_data
+        if sid not in seen:
+            seen[sid] = (name, set(years))
+            continue
+        old_name, old_years = seen[sid]
+        if old_name != name:
+            message = f"Student ID {sid} already exists with a different name ({old_name})."
+        else:
+            repeated = [year for year in years if year in old_years]
+            old_years.update(years)
+            if not repeated: continue
+            message = f"Student ID {sid} with Name {name} already has marks for {repeated[0]}."
+        report.add(RowError(lines.get(sid), "ID", message, "conflict"))
+
+def cmd_validate(args):
+    # the load_from_csv checks (every cell, stored results against the scheme) and merge conflicts across the inputs
+    from columnar_store import ColumnarStore
+
+    scheme = load_scheme(args.config)
+    seen, reports, problems = {}, [], []
+    for path in args.inputs:
+        store, lines = ColumnarStore(), {}
+        with open_input(path) as f:
+            try:
+                report = load_students(f, store, scheme, path=path, lines=lines)
+            except UnicodeDecodeError as e:
+                raise CliError(f"cannot read {path}: {e}")
+        merge_conflicts(store, report, seen, lines)
+        reports.append(report)
+        problems.extend(located(path, e) for e in report.errors)
+    if args.report:
+        try:
+            write_error_report(args.report, reports)
+        except OSError as e:
+            raise CliError(f"cannot write {args.report}: {e.strerror}")
+    show_problems(problems, args.max_errors)
+    count = sum(report.rows for report in reports)
+    errors = sum(report.error_count() for report in reports)
+    if not args.quiet:
+        print(f"{errors:,} problem(s) in {count:,} rows", file=sys.stderr)
+    return count, EXIT_PROBLEMS if errors else EXIT_OK
+
+# ---------------- Export ----------------
+def load_cohort(path):
+    # a store from a CSV file (or stdin), a snapshot (.sgcs) or a database (.db), stored results kept
+    from columnar_store import ColumnarStore
+
+    lower = path.lower()
+    if lower.endswith(".sgcs"):
+        from snapshot import Snapshot
+        try:
+            return Snapshot(path)
+        except (OSError, GradebookError) as e:
+            raise CliError(f"cannot read {path}: {e}")
+    if lower.endswith(".db"):
+        from sqlite_store import SQLiteStore
+        if not os.path.exists(path): raise CliError(f"cannot read {path}: No such file or directory")
+        return SQLiteStore(path)
+    store = ColumnarStore()
+    with open_input(path) as f:
+        report = load_students(f, store, path=path)
+    if report.errors:
+        show_problems([located(path, e) for e in report.errors], MAX_ERRORS)
+        raise CliError(f"{path}: {report.error_count():,} bad row(s), nothing exported (see validate)")
+    return store
+
+def cmd_export(args):
+    # one cohort file to another format, or to aggregated charts (png/svg/pdf)
+    scheme = load_scheme(args.config)
+    fmt = output_format(args.output, args.format, FORMATS + CHART_FORMATS)
+    students = load_cohort(args.input)
+    if fmt in CHART_FORMATS:
+        if args.output == "-": raise CliError("charts need an output file (-o)")
+        from charts import cohort_bins, export_charts
+        export_charts(args.output, cohort_bins(students, scheme))
+        return len(students), EXIT_OK
+    with open_output(args.output) as out:
+        count = write_students(out, students.values(), fmt)
+    return count, EXIT_OK
+
+# ---------------- Main ----------------
+def show_problems(problems, limit):
+    for problem in problems[:limit]:
+        print(problem, file=sys.stderr)
+    if len(problems) > limit:
+        print(f"... and {len(problems) - limit:,} more", file=sys.stderr)
+
+def parser():
+    parser = argparse.ArgumentParser(description="Grade, merge, validate and export student cohorts without the GUI. "
+                                     "Inputs are save_to_csv files, '-' reads stdin.")
+    parser.add_argument("--config", help=f"grading config (default: {os.path.basename(DEFAULT_CONFIG)} if present)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="no timing line on stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def outputs(command, formats):
+        command.add_argument("-o", "--output", default="-", help="output file, '-' for stdout (default)")
+        command.add_argument("-f", "--format", choices=formats, help="output format (default: from the extension)")
+
+    def max_errors(command):
+        command.add_argument("--max-errors", type=int, default=MAX_ERRORS, help="problems listed on stderr")
+
+    def workers(command):
+        command.add_argument("-j", "--workers", type=int, default=1,
+                             help="worker processes (0: one per CPU, default: 1)")
+
+    grade = commands.add_parser("grade", help="regrade every row (streamed, rows are not merged)")
+    grade.add_argument("inputs", nargs="+")
+    outputs(grade, FORMATS)
+    workers(grade)
+    max_errors(grade)
+    merge = commands.add_parser("merge", help="merge cohorts with the app's rules, conflicts are reported")
+    merge.add_argument("inputs", nargs="+")
+    outputs(merge, FORMATS)
+    workers(merge)
+    max_errors(merge)
+    validate = commands.add_parser("validate", help="check the inputs without writing anything")
+    validate.add_argument("inputs", nargs="+")
+    validate.add_argument("--report", help="write every problem to this JSON file")
+    max_errors(validate)
+    export = commands.add_parser("export", help="convert one cohort (.csv, .sgcs, .db) or draw its charts")
+    export.add_argument("input")
+    outputs(export, FORMATS + CHART_FORMATS)
+    return parser
+
+COMMANDS = {"grade": cmd_grade, "merge": cmd_merge, "validate": cmd_validate, "export": cmd_export}
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    if getattr(args, "workers", 1) == 0:
+        args.workers = os.cpu_count() or 1
+    start = time.perf_counter()
+    try:
+        count, status = COMMANDS[args.command](args)
+    except CliError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    except BrokenPipeError:
+        # stdout closed early (e.g. piped into head): stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_ERROR
+    except KeyboardInterrupt:
+        return EXIT_ERROR
+    seconds = time.perf_counter() - start
+    if not args.quiet:
+        rate = f", {count/seconds:,.0f} students/s" if seconds > 0 and count else ""
+        print(f"{args.command}: {count:,} students in {seconds:.2f} s{rate}", file=sys.stderr)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+from abc import ABC, abstractmethod
+from contextlib import nullcontext
+
+from grading_scheme import DEFAULT_SCHEME, PASS_MARK, ModuleCatalog
+
+# ---------------- Default modules ----------------
+# available years and modules
+YEAR_MODULES = {
+    "Year 1": ["Problem Solving and Programming", "Operating System", "Information Security", "Networking"],
+    "Year 2": ["Computer Hardware", "Human-Computer Interaction and Web Development", "Algorithms and Data Structure", "Communications"],
+    "Year 3": ["Big Data", "Internet of Things", "Contemporary Issues in Computing", "Project"]
+}
+DEFAULT_CATALOG = ModuleCatalog(YEAR_MODULES)  # 30 credits per module (see grading_scheme for config files)
+
+# ---------------- Errors ----------------
+class GradebookError(Exception):
+    # raised when a change breaks the gradebook rules (bad input or conflicting data)
+    pass
+
+# ---------------- Abstract Parent Class ----------------
+class Person(ABC):
+    __slots__ = ("__id", "__name")
+
+    def __init__(self, pid, name):
+        self.__id = pid  # private student id
+        self.__name = name  # private student name
+
+    def get_id(self):
+        return self.__id  # get id
+
+    def get_name(self):
+        return self.__name  # get name
+
+    @abstractmethod
+    def summary(self):
+        pass  # abstract method (to be defined by subclass)
+
+# ---------------- Calculate grade ----------------
+def calculate_grade(marks):
+    # calculate average and grade (default scheme: 70 A, 60 B, 50 C, 40 D, any module below 40 fails)
+    return DEFAULT_SCHEME.grade_marks(marks)
+
+# ---------------- Compute weighted avg ----------------
+def compute_weighted_avg(record):
+    # average per year, every module counts the same (credit-weighted results: see classification)
+    year_avgs = {}
+    for y, data in record.year_data.items():
+        avg, _, _ = calculate_grade(data["marks"])
+        year_avgs[y] = avg
+    return year_avgs
+
+def weighted_avg_text(year_avgs):
+    # text shown in the "Weighted Avg" column
+    return " | ".join([f"{y}: {avg:.2f}" for y, avg in year_avgs.items()])
+
+# ---------------- Validation ----------------
+def validate_id(sid):
+    # student id must be numeric
+    sid = str(sid).strip()
+    if not sid or not sid.isdigit():
+        raise GradebookError("Student ID must be numeric.")
+    return sid
+
+def validate_name(name):
+    # name must contain only letters/spaces
+    name = str(name).strip()
+    if not name or not all(c.isalpha() or c.isspace() for c in name):
+        raise GradebookError("Name must contain only letters/spaces.")
+    return name
+
+def parse_marks(raw_marks):
+    # convert raw mark values to floats between 0 and 100
+    marks = []
+    for raw in raw_marks:
+        raw = str(raw).strip()
+        if raw == "": raise ValueError("Empty mark")
+        val = float(raw)
+        if not 0 <= val <= 100: raise ValueError("Out of range")
+        marks.append(val)
+    return marks
+
+# ---------------- Student ----------------
+class Student(Person):
+    def __init__(self, pid, name, year_data=None, average=0, grade="F", remark="Fail - Resit Required"):
+        super().__init__(pid, name)
+        self.year_data = year_data if year_data is not None else {}  # year -> {"modules": [...], "marks": [...]}
+        self.average = average
+        self.grade = grade
+        self.remark = remark
+
+    def all_marks(self):
+        # marks of every year, in year order
+        return [m for data in self.year_data.values() for m in data["marks"]]
+
+    def module_count(self):
+        return sum(len(data["marks"]) for data in self.year_data.values())
+
+    def regrade(self, scheme=DEFAULT_SCHEME):
+        # recompute overall average, grade and remark
+        self.average, self.grade, self.remark = scheme.grade_marks(self.all_marks())
+
+    def year_averages(self):
+        return compute_weighted_avg(self)
+
+    def summary(self):
+        return f"ID:{self.get_id()} | Name:{self.get_name()} | Average:{self.average:.2f} | Grade:{self.grade} ({self.remark})"
+
+# ---------------- Cohort stats ----------------
+AVERAGE_BINS = 101  # histogram of the overall averages, one bin per whole mark (0-0.99, 1-1.99, ... 100)
+
+class CohortStats:
+    # cohort-wide numbers kept up to date on every change, so nothing has to be rescanned
+    # version changes with every change, results derived from the cohort (e.g. chart bins) can be reused until it does
+    def __init__(self):
+        self.version = 0
+        self.reset()
+
+    def reset(self):
+        self.version += 1
+        self.students = 0
+        self.average_total = 0.0
+        self.average_bins = [0] * AVERAGE_BINS
+        self.grade_counts = {}  # grade -> number of students
+        self.failing_students = 0  # students with a module below 40
+
+    def changed(self, sid, old, new):
+        # old/new are (average, grade, fails) before and after, None when added/deleted
+        self.version += 1
+        if old is not None: self._apply(old, -1)
+        if new is not None: self._apply(new, 1)
+
+    def _apply(self, result, sign):
+        average, grade, fails = result
+        self.students += sign
+        self.average_total = self.average_total + sign*average if self.students else 0.0
+        self.average_bins[min(max(int(average), 0), AVERAGE_BINS - 1)] += sign
+        count = self.grade_counts.get(grade, 0) + sign
+        if count: self.grade_counts[grade] = count
+        else: self.grade_counts.pop(grade, None)
+        if fails: self.failing_students += sign
+
+    def mean_average(self):
+        return self.average_total/self.students if self.students else 0
+
+    def summary(self):
+        parts = [f"Students: {self.students}", f"Mean average: {self.mean_average():.2f}"]
+        if self.grade_counts:
+            parts.append("  ".join(f"{g}: {self.grade_counts[g]}" for g in sorted(self.grade_counts)))
+        parts.append(f"Failing a module: {self.failing_students}")
+        return " | ".join(parts)
+
+# ---------------- Stores ----------------
+def mark_totals(marks):
+    # (total, count, fails) kept by every store, marks in all_marks() order: the same sum() as calculate_grade
+    # so averages match it exactly, fails are the marks below the default pass mark (see Gradebook.totals)
+    return sum(marks), len(marks), sum(1 for m in marks if m<PASS_MARK)
+
+class DictStore(dict):
+    # default store: id -> Student objects (the original nested dict layout)
+    # other stores (e.g. columnar_store.ColumnarStore) provide the same methods
+    def aggregates(self, sid):
+        # (total, count, fails) of all the student's marks
+        return mark_totals(self[sid].all_marks())
+
+    def year_averages(self, sid):
+        return compute_weighted_avg(self[sid])
+
+    def put(self, student):
+        self[student.get_id()] = student
+        return student
+
+    def set_year(self, sid, year, modules, marks):
+        self[sid].year_data[year] = {"modules": list(modules), "marks": list(marks)}
+
+    def set_result(self, sid, average, grade, remark):
+        student = self[sid]
+        student.average, student.grade, student.remark = average, grade, remark
+
+    def delete(self, sid):
+        del self[sid]
+
+# ---------------- Gradebook ----------------
+class Gradebook:
+    def __init__(self, store=None, scheme=None):
+        self.students = store if store is not None else DictStore()  # id -> student record
+        self.scheme = scheme if scheme is not None else DEFAULT_SCHEME  # grade bands and pass mark
+        self.stats = CohortStats()
+        # objects with changed(sid, old, new) and reset(), optionally years_changed(sid, years)
+        self.listeners = [self.stats]
+        self.rebuild_listeners()
+
+    # ---------------- Listeners ----------------
+    def result(self, sid):
+        # (average, grade, fails) of a student, None if missing
+        record = self.students.get(sid)
+        if record is None: return None
+        return record.average, record.grade, self.totals(sid)[2]
+
+    def totals(self, sid):
+        # (total, count, fails) of a student under the gradebook's scheme
+        # the stores count marks below the default pass mark, another pass mark recounts the marks
+        total, count, fails = self.students.aggregates(sid)
+        if self.scheme.pass_mark != PASS_MARK:
+            fails = self.scheme.fails(self.students[sid].all_marks())
+        return total, count, fails
+
+    def changed(self, sid, old):
+        # tell listeners that a student changed from old (None when added)
+        new = self.result(sid)
+        for listener in self.listeners:
+            listener.changed(sid, old, new)
+
+    def years_changed(self, sid, years):
+        # tell listeners caching per-year results which years' marks changed, just before changed()
+        # (no notice means the whole record may have changed)
+        for listener in self.listeners:
+            notify = getattr(listener, "years_changed", None)
+            if notify is not None: notify(sid, years)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+        for sid in self.students:
+            listener.changed(sid, None, self.result(sid))
+
+    def rebuild_listeners(self):
+        # one pass over the store, e.g. after switching stores
+        for listener in self.listeners:
+            listener.reset()
+        for sid in self.students:
+            new = self.result(sid)
+            for listener in self.listeners:
+                listener.changed(sid, None, new)
+
+    def __len__(self):
+        return len(self.students)
+
+    def __contains__(self, sid):
+        return sid in self.students
+
+    def __getitem__(self, sid):
+        return self.students[sid]
+
+    def __iter__(self):
+        return iter(self.students)
+
+    def get(self, sid, default=None):
+        return self.students.get(sid, default)
+
+    def items(self):
+        return self.students.items()
+
+    def transaction(self):
+        # one store transaction around a whole change (stores with batch(), e.g. sqlite_store.SQLiteStore),
+        # so new marks and the result they give are written together or not at all
+        batch = getattr(self.students, "batch", None)
+        return batch() if batch is not None else nullcontext()
+
+    # ---------------- Add / Update ----------------
+    def add_student(self, sid, name, year, modules, marks):
+        # add a new student, or a new year for an existing one
+        # returns True when a new student was created
+        if sid in self.students:
+            self.merge_year(sid, name, year, modules, marks)
+            return False
+        student = Student(sid, name, {year: {"modules": list(modules), "marks": list(marks)}})
+        student.regrade(self.scheme)
+        with self.transaction():
+            self.students.put(student)
+        self.changed(sid, None)
+        return True
+
+    def merge_year(self, sid, name, year, modules, marks):
+        # add marks for a year the student does not have yet
+        existing = self.students[sid]
+        if existing.get_name() != name:
+            raise GradebookError(f"Student ID {sid} already exists with a different name ({existing.get_name()}).")
+        if year in existing.year_data:
+            raise GradebookError(f"Student ID {sid} with Name {name} already has marks for {year}.")
+        old = self.result(sid)
+        with self.transaction():
+            self.students.set_year(sid, year, modules, marks)
+            self.students.set_result(sid, *self.scheme.from_totals(*self.totals(sid)))
+        return self.regraded(sid, old, (year,))
+
+    def update_year(self, sid, year, modules, marks):
+        # replace the marks of one year (edit mode)
+        if sid not in self.students:
+            raise GradebookError(f"Student ID {sid} not found.")
+        old = self.result(sid)
+        with self.transaction():
+            self.students.set_year(sid, year, modules, marks)
+            self.students.set_result(sid, *self.scheme.from_totals(*self.totals(sid)))
+        return self.regraded(sid, old, (year,))
+
+    def add_record(self, student, graded=False):
+        # merge a whole student record (e.g. read from a file)
+        # every year is checked first so a conflict leaves the gradebook unchanged
+        # graded=True: the record's average/grade are already up to date, a new student is stored as-is
+        sid, name = student.get_id(), student.get_name()
+        existing = self.students.get(sid)
+        if existing is None and graded:
+            return self.put(student)
+        if existing is not None:
+            if existing.get_name() != name:
+                raise GradebookError(f"Student ID {sid} already exists with a different name ({existing.get_name()}).")
+            for year in student.year_data:
+                if year in existing.year_data:
+                    raise GradebookError(f"Student ID {sid} with Name {name} already has marks for {year}.")
+        with self.transaction():
+            for year, data in student.year_data.items():
+                self.add_student(sid, name, year, data["modules"], data["marks"])
+        return self.students[sid]
+
+    def put(self, student):
+        # store a record as-is (stored average/grade are kept)
+        old = self.result(student.get_id())
+        record = self.students.put(student)
+        self.changed(student.get_id(), old)
+        return record
+
+    # ---------------- Delete ----------------
+    def delete_student(self, sid):
+        if sid not in self.students:
+            raise GradebookError(f"Student ID {sid} not found.")
+        old = self.result(sid)
+        self.students.delete(sid)
+        for listener in self.listeners:
+            listener.changed(sid, old, None)
+
+    def clear(self):
+        self.students.clear()
+        for listener in self.listeners:
+            listener.reset()
+
+    # ---------------- Bulk grading ----------------
+    def regrade(self, sid, old=None, years=()):
+        # recompute one student's overall average, grade and remark from the stored totals
+        # old: result before the marks changed (defaults to the current one)
+        # years: the years whose marks were just changed
+        if old is None: old = self.result(sid)
+        self.students.set_result(sid, *self.scheme.from_totals(*self.totals(sid)))
+        return self.regraded(sid, old, years)
+
+    def regraded(self, sid, old, years):
+        # tell listeners about a student whose marks and result were just written
+        self.years_changed(sid, years)
+        self.changed(sid, old)
+        return self.students[sid]
+
+    def grade_all(self):
+        # regrade every student (one store transaction), returns how many were graded
+        with self.transaction():
+            for sid in self.students:
+                self.regrade(sid)
+        return len(self.students)
@@ -0,0 +1,125 @@
+import json
+from bisect import bisect_right
+
+PASS_MARK = 40  # module pass mark of the default scheme (the stores count marks below it as fails)
+DEFAULT_CREDITS = 30  # credits of a module listed without any, four of them make a 120-credit year
+SEPARATORS = (";", ":", "|")  # used by the Year_Data column of the CSV files
+
+# ---------------- Grading scheme ----------------
+class GradingScheme:
+    # grade bands compiled into sorted boundaries: grading is one bisect instead of a chain of ifs
+    # bands: (minimum average, grade, remark) in any order, below the lowest minimum the fail grade applies
+    # pass_mark: any module below it fails the student whatever the average (None turns the rule off)
+    # grade codes follow batch_grading: 0 is the best band, fail_code the fail grade
+    def __init__(self, bands, fail=("F", "Fail - Resit Required"), pass_mark=PASS_MARK, name="Default"):
+        bands = sorted((float(minimum), str(grade), str(remark)) for minimum, grade, remark in bands)
+        if not bands:
+            raise ValueError("A grading scheme needs at least one grade band.")
+        boundaries = [minimum for minimum, _, _ in bands]
+        if len(set(boundaries)) != len(boundaries):
+            raise ValueError("Two grade bands start at the same mark.")
+        if boundaries[0] < 0 or boundaries[-1] > 100:
+            raise ValueError("Grade band minimums must be between 0 and 100.")
+        if pass_mark is not None and not 0 <= pass_mark <= 100:
+            raise ValueError("The pass mark must be between 0 and 100.")
+        self.name = name
+        self.boundaries = tuple(boundaries)
+        self.letters = tuple(grade for _, grade, _ in reversed(bands)) + (fail[0],)
+        self.remarks = tuple(remark for _, _, remark in reversed(bands)) + (fail[1],)
+        self.fail_code = len(bands)
+        self.pass_mark = pass_mark
+        self.results = tuple(zip(self.letters, self.remarks))  # code -> (grade, remark)
+
+    def __eq__(self, other):
+        return isinstance(other, GradingScheme) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def key(self):
+        # everything grading depends on (the name is only a label)
+        return self.boundaries, self.results, self.pass_mark
+
+    def code(self, average, fails=0):
+        if fails and self.pass_mark is not None: return self.fail_code
+        return self.fail_code - bisect_right(self.boundaries, average)
+
+    def fails(self, marks):
+        # number of modules below the pass mark
+        if self.pass_mark is None: return 0
+        return sum(1 for m in marks if m<self.pass_mark)
+
+    def from_totals(self, total, count, fails):
+        # (average, grade, remark) from a running total, number of marks and number of failed modules
+        average = total/count if count else 0
+        grade, remark = self.results[self.code(average, fails)]
+        return average, grade, remark
+
+    def grade_marks(self, marks):
+        return self.from_totals(sum(marks), len(marks), self.fails(marks))
+
+    @classmethod
+    def from_config(cls, config):
+        # {"name": ..., "pass_mark": 40 or null, "fail": {"grade": ..., "remark": ...},
+        #  "bands": [{"min": 70, "grade": "A", "remark": "Excellent"}, ...]}
+        fail = config.get("fail", {})
+        try:
+            bands = [(band["min"], band["grade"], band.get("remark", band["grade"])) for band in config["bands"]]
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Every grade band needs a min and a grade ({e}).")
+        return cls(bands, (fail.get("grade", "F"), fail.get("remark", "Fail - Resit Required")),
+                   config.get("pass_mark", PASS_MARK), config.get("name", "Custom"))
+
+# the rules the app always used: 70 A, 60 B, 50 C, 40 D, otherwise (or any module below 40) F
+DEFAULT_SCHEME = GradingScheme([(70, "A", "Excellent"), (60, "B", "Very Good"), (50, "C", "Good"), (40, "D", "Pass")])
+
+# ---------------- Module catalog ----------------
+class ModuleCatalog:
+    # the modules of every year with their credit weights
+    def __init__(self, years):
+        # years: {year: [module, ...]} (DEFAULT_CREDITS each)
+        #     or {year: {"credits": n, "modules": [module or {"name": ..., "credits": n}, ...]}}
+        self.year_modules = {}  # year -> module names, in form order
+        self.module_credits = {}  # year -> {module: credits}
+        self.year_credits = {}  # year -> credits of the year (defaults to the sum of its modules)
+        for year, spec in years.items():
+            if isinstance(spec, dict):
+                modules, credits = spec.get("modules", []), spec.get("credits")
+            else:
+                modules, credits = spec, None
+            if any(c in year for c in SEPARATORS):
+                raise ValueError(f"The year name {year} cannot contain {' '.join(SEPARATORS)}.")
+            names, weights = [], {}
+            for module in modules:
+                if isinstance(module, dict):
+                    name, weight = module["name"], module.get("credits", DEFAULT_CREDITS)
+                else:
+                    name, weight = module, DEFAULT_CREDITS
+                if not name or any(c in name for c in SEPARATORS):
+                    raise ValueError(f"{year}: a module name cannot be empty or contain {' '.join(SEPARATORS)} ({name!r}).")
+                if name in weights:
+                    raise ValueError(f"{year} lists the module {name} twice.")
+                if weight <= 0:
+                    raise ValueError(f"{year}: module {name} needs a positive number of credits.")
+                names.append(name)
+                weights[name] = weight
+            self.year_modules[year] = names
+            self.module_credits[year] = weights
+            self.year_credits[year] = credits if credits is not None else sum(weights.values())
+
+    def modules(self, year):
+        return self.year_modules.get(year, [])
+
+    def credits(self, year, module):
+        # credits of a module, DEFAULT_CREDITS for modules the catalog does not know
+        return self.module_credits.get(year, {}).get(module, DEFAULT_CREDITS)
+
+# ---------------- Config file ----------------
+def load_config(path):
+    # read a JSON grading config, returns (scheme, catalog); a missing section gives None
+    # {"scheme": {...see GradingScheme.from_config...}, "years": {...see ModuleCatalog...}}
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    scheme = GradingScheme.from_config(config["scheme"]) if "scheme" in config else None
+    catalog = ModuleCatalog(config["years"]) if "years" in config else None
+    return scheme, catalog
@@ -0,0 +1,105 @@
+from html import escape
+from itertools import islice
+
+from csv_io import BUFFER_SIZE, atomic_write, iter_chunks
+
+REPORT_TITLE = "----- 📊 Student Grade Report -----\n\n"
+REPORT_RULE = "-------------------------------------------\n\n"
+HTML_HEAD = ('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Student Grade Report</title></head>\n'
+             '<body>\n<h1>📊 Student Grade Report</h1>\n<pre>\n')
+HTML_TAIL = "</pre>\n</body></html>\n"
+
+# ---------------- Report text ----------------
+def student_report(sid, s):
+    # report block of one student: one entry per year, then the overall result (as graded by the gradebook's scheme)
+    parts = []
+    for y, data in s.year_data.items():
+        mods = ", ".join(f"{m}:{mark}" for m, mark in zip(data["modules"], data["marks"]))
+        parts.append(f"ID:{sid} | Name:{s.get_name()} | Year:{y}\nModules:{mods}\n\n")
+    parts.append(f"Overall Average:{s.average:.2f} | Grade:{s.grade} ({s.remark})\n")
+    parts.append(REPORT_RULE)
+    return "".join(parts)
+
+def report_blocks(students, ids=None):
+    # stream the report one student block at a time
+    # the ids are fixed up front, students edited meanwhile show their current data, deleted ones are skipped
+    ids = list(students) if ids is None else ids
+    for sid in ids:
+        s = students.get(sid)
+        if s is not None:
+            yield student_report(sid, s)
+
+# ---------------- Files ----------------
+def report_format(path):
+    return "html" if path.lower().endswith((".html", ".htm")) else "txt"
+
+def write_report(f, blocks, fmt="txt"):
+    # write a streamed report (txt or html) chunk by chunk; returns the number of students
+    if fmt == "html":
+        f.write(HTML_HEAD)
+        blocks = map(escape, blocks)
+    else:
+        f.write(REPORT_TITLE)
+    count = 0
+    for chunk in iter_chunks(blocks):
+        f.write("".join(chunk))
+        count += len(chunk)
+    if fmt == "html":
+        f.write(HTML_TAIL)
+    return count
+
+def export_report(path, students, fmt=None, progress=None):
+    # full cohort report to a file, the format follows the extension unless given
+    # progress: wraps the block stream (e.g. background.with_progress)
+    blocks = report_blocks(students)
+    if progress is not None: blocks = progress(blocks)
+    with atomic_write(path) as part_path, open(part_path, "w", encoding="utf-8", buffering=BUFFER_SIZE) as f:
+        return write_report(f, blocks, fmt or report_format(path))
+
+# ---------------- Paged view ----------------
+class ReportView:
+    # shows a streamed report in a Text widget a page at a time:
+    # a page is one insert, the next one is added when the view gets near the end
+    PAGE = 200  # students per page
+    PRELOAD = 0.9  # load more once the bottom of the view passes this fraction
+
+    def __init__(self, text, scrollbar):
+        self.text = text
+        self.scrollbar = scrollbar
+        self.blocks = None  # iterator of pending blocks, None when everything is shown
+        self.loading = False
+        text.config(yscrollcommand=self.on_scroll)
+
+    def show(self, blocks, title=REPORT_TITLE):
+        self.blocks = None
+        self.replace(title)
+        self.blocks = iter(blocks)
+        self.next_page()
+
+    def show_message(self, message):
+        self.blocks = None
+        self.replace(message)
+
+    def replace(self, text):
+        self.text.config(state="normal")
+        self.text.delete(1.0, "end")
+        self.text.insert("end", text)
+        self.text.config(state="disabled")
+
+    def next_page(self):
+        self.loading = False
+        if self.blocks is None: return
+        page = "".join(islice(self.blocks, self.PAGE))
+        if not page:
+            self.blocks = None
+            return
+        self.text.config(state="normal")
+        self.text.insert("end", page)
+        self.text.config(state="disabled")
+
+    def on_scroll(self, first, last):
+        # yscrollcommand: move the scrollbar, and queue the next page near the end
+        self.scrollbar.set(first, last)
+        if self.blocks is not None and not self.loading and float(last) >= self.PRELOAD:
+            self.loading = True
+            self.text.after_idle(self.next_page)
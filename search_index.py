@@ -0,0 +1,201 @@
+from bisect import bisect_left, insort
+from operator import itemgetter
+
+MAX_CHAR = chr(0x10FFFF)  # sorts after every character, closes a prefix range
+_key = itemgetter(0)
+
+# ---------------- Sorted keys ----------------
+class SortedKeys:
+    # sorted list of (key, id) pairs with binary-search ranges
+    # additions and removals are buffered and applied on the next query, so a full rebuild is one sort
+    # and a bulk regrade or delete is one filtering pass instead of one list delete per pair
+    __slots__ = ("items", "pending", "removed")
+    MERGE_MIN = 32  # below this many buffered pairs, insert (or delete) them one by one
+
+    def __init__(self):
+        self.items = []
+        self.pending = set()
+        self.removed = set()  # pairs of items to drop
+
+    def __len__(self):
+        return len(self.items) + len(self.pending) - len(self.removed)
+
+    def add(self, key, sid):
+        self.pending.add((key, sid))
+
+    def discard(self, key, sid):
+        item = (key, sid)
+        if item in self.pending:
+            self.pending.discard(item)
+        else:
+            self.removed.add(item)
+
+    def flush(self):
+        removed = self.removed
+        if len(removed) < self.MERGE_MIN:
+            for item in removed:
+                i = bisect_left(self.items, item)
+                if i < len(self.items) and self.items[i] == item:
+                    del self.items[i]
+        else:
+            self.items = [item for item in self.items if item not in removed]
+        removed.clear()
+        if len(self.pending) < self.MERGE_MIN:
+            for item in self.pending:
+                insort(self.items, item)
+        else:
+            self.items += self.pending
+            self.items.sort()
+        self.pending.clear()
+
+    def sorted(self):
+        if self.pending or self.removed: self.flush()
+        return self.items
+
+    def prefix_bounds(self, prefix):
+        items = self.sorted()
+        return bisect_left(items, prefix, key=_key), bisect_left(items, prefix + MAX_CHAR, key=_key)
+
+# ---------------- Student index ----------------
+class StudentIndex:
+    # secondary indexes over a gradebook, kept up to date as a gradebook listener:
+    #   names (casefolded, sorted) for prefix search, grade buckets, year sets, the failing set,
+    #   and sorted overall / per-year averages
+    # year_averages_of(sid): {year: average} the year sort uses, the record's own by default; the app passes the
+    # classifier's credit-weighted averages (the values its column shows), that listener must come first
+    def __init__(self, gradebook, year_averages_of=None):
+        self.gradebook = gradebook
+        self.averages_by_year = year_averages_of or (lambda sid: gradebook.students[sid].year_averages())
+        self.reset()
+
+    def reset(self):
+        # per student: id -> value (dict lookups keep the sort keys in C)
+        self.order_of = {}  # insertion order, for the unsorted listing
+        self.name_of = {}  # casefolded name
+        self.average_of = {}
+        self.grade_of = {}
+        self.year_averages_of = {}  # {year: average}
+        self.next_order = 0
+        # indexes
+        self.names = SortedKeys()
+        self.averages = SortedKeys()
+        self.year_averages = {}  # year -> SortedKeys of (year average, id)
+        self.grades = {}  # grade -> set of ids
+        self.years = {}  # year -> set of ids
+        self.failing = set()  # ids with a module below 40
+
+    def __len__(self):
+        return len(self.order_of)
+
+    def flush(self):
+        # merge buffered keys now (e.g. on a worker thread after a load) instead of on the first query
+        for keys in (self.names, self.averages, *self.year_averages.values()):
+            keys.sorted()
+
+    # ---------------- Listener ----------------
+    def changed(self, sid, old, new):
+        # old/new are (average, grade, fails); names and years are read from the store
+        order = None
+        if sid in self.order_of:
+            order = self._remove(sid)
+        if new is not None:
+            self._add(sid, order, new)
+
+    def _add(self, sid, order, result):
+        average, grade, fails = result
+        record = self.gradebook.students[sid]
+        if order is None:
+            order = self.next_order
+            self.next_order += 1
+        name = record.get_name().casefold()
+        year_avgs = self.averages_by_year(sid)
+        self.order_of[sid] = order
+        self.name_of[sid] = name
+        self.average_of[sid] = average
+        self.grade_of[sid] = grade
+        self.year_averages_of[sid] = year_avgs
+        self.names.add(name, sid)
+        self.averages.add(average, sid)
+        self.grades.setdefault(grade, set()).add(sid)
+        for year, avg in year_avgs.items():
+            self.years.setdefault(year, set()).add(sid)
+            self.year_averages.setdefault(year, SortedKeys()).add(avg, sid)
+        if fails: self.failing.add(sid)
+
+    def _remove(self, sid):
+        self.names.discard(self.name_of.pop(sid), sid)
+        self.averages.discard(self.average_of.pop(sid), sid)
+        self.grades[self.grade_of.pop(sid)].discard(sid)
+        for year, avg in self.year_averages_of.pop(sid).items():
+            self.years[year].discard(sid)
+            self.year_averages[year].discard(avg, sid)
+        self.failing.discard(sid)
+        return self.order_of.pop(sid)
+
+    # ---------------- Queries ----------------
+    def name_prefix(self, prefix):
+        # ids whose name starts with prefix (case-insensitive), in name order
+        lo, hi = self.names.prefix_bounds(prefix.casefold())
+        return [sid for _, sid in self.names.items[lo:hi]]
+
+    def with_grade(self, grade):
+        return self.grades.get(grade, set())
+
+    def taking_year(self, year):
+        return self.years.get(year, set())
+
+    def search(self, prefix="", grade=None, year=None, failing=False, sort=None, sort_year=None, descending=False):
+        # ids matching every given filter
+        # sort: None (insertion order), "name", "average" or "year" (average of sort_year, students without it last)
+        # the buckets are intersected smallest first, the name prefix is a binary-searched range
+        sets = []
+        if grade is not None: sets.append(self.with_grade(grade))
+        if year is not None: sets.append(self.taking_year(year))
+        if failing: sets.append(self.failing)
+        matches = set.intersection(*sorted(sets, key=len)) if sets else None
+        prefix = prefix.strip()
+        if prefix:
+            named = self.name_prefix(prefix)
+            matches = set(named) if matches is None else matches.intersection(named)
+        return self._ordered(matches, sort, sort_year, descending)
+
+    def _ordered(self, matches, sort, sort_year, descending):
+        # matches None means every student
+        if sort is None:
+            if matches is None:
+                ids = list(self.gradebook.students)
+            else:
+                ids = sorted(matches, key=self.order_of.__getitem__)
+            if descending: ids.reverse()
+            return ids
+        if sort == "year":
+            keys = self.year_averages.get(sort_year, SortedKeys())
+        else:
+            keys = self.names if sort == "name" else self.averages
+        pairs = keys.sorted()
+        missing = []
+        if matches is None:
+            ids = [sid for _, sid in pairs]
+        elif len(matches) * 8 < len(pairs):
+            # small result: sort it directly (by id, then by key) instead of walking the whole index
+            if sort == "year":
+                year_avgs = self.year_averages_of
+                ids = sorted(sid for sid in matches if sort_year in year_avgs[sid])
+                ids.sort(key=lambda sid: year_avgs[sid][sort_year])
+            else:
+                ids = sorted(sorted(matches), key=(self.name_of if sort == "name" else self.average_of).__getitem__)
+        else:
+            ids = [sid for _, sid in pairs if sid in matches]
+        if descending: ids.reverse()
+        if sort == "year":
+            # students who did not take the year go last
+            taking = self.taking_year(sort_year)
+            missing = [sid for sid in (self.order_of if matches is None else matches) if sid not in taking]
+        return ids + missing
+
+def find_index(gradebook):
+    # the StudentIndex listening to a gradebook, None if there is none
+    for listener in gradebook.listeners:
+        if isinstance(listener, StudentIndex):
+            return listener
+    return None
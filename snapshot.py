@@ -0,0 +1,263 @@
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+
+from columnar_store import ColumnarStore
+from grading_engine import GradebookError
+
+# ---------------- Format ----------------
+# header, then the columns of a compacted ColumnarStore, each section 8-byte aligned:
+#   magic | version | byte order | crc32 of everything after the header | counts | (offset, size) per section
+MAGIC = b"SGCSNAP\0"
+VERSION = 2
+LITTLE_ENDIAN = 1
+SECTIONS = (
+    # name, typecode
+    ("average", "d"), ("total", "d"), ("seg_avg", "d"), ("marks", "d"), ("seg_start", "q"),
+    ("id_offsets", "q"), ("name_offsets", "q"), ("symbol_offsets", "q"),
+    ("grade", "i"), ("remark", "i"), ("first", "i"), ("last", "i"), ("count", "i"), ("fails", "i"),
+    ("seg_year", "i"), ("seg_len", "i"), ("seg_next", "i"), ("modules", "i"), ("id_order", "i"),
+    ("id_blob", "B"), ("name_blob", "B"), ("symbol_blob", "B"),
+)
+HEADER = struct.Struct("<8sHHI4Q" + "2Q" * len(SECTIONS))
+SEPARATOR = "\0"  # joins ids/names/symbols inside a blob
+
+class SnapshotError(GradebookError):
+    # raised for files that are not valid snapshots
+    pass
+
+# ---------------- Writing ----------------
+def _text_section(strings):
+    # NUL-joined utf-8 blob plus the start offset of every string (and the end)
+    offsets = array("q", [0])
+    parts = []
+    pos = 0
+    for text in strings:
+        if SEPARATOR in text:
+            raise SnapshotError(f"Cannot store text containing NUL: {text!r}")
+        data = text.encode("utf-8") + b"\0"
+        parts.append(data)
+        pos += len(data)
+        offsets.append(pos)
+    return offsets, array("B", b"".join(parts))
+
+def write_snapshot(path, store):
+    # write any store (DictStore, ColumnarStore, ...) as a binary snapshot; returns the number of students
+    if sys.byteorder != "little":
+        raise SnapshotError("Snapshots are written on little-endian machines only.")
+    if isinstance(store, ColumnarStore):
+        # the store itself is only read (safe from a worker thread), stale marks are dropped on a copy
+        columnar = store
+        if columnar._garbage:
+            columnar = store.copy()
+            columnar.compact()
+    else:
+        columnar = ColumnarStore()
+        for record in store.values():
+            columnar.put(record)
+    ids = columnar._ids
+    id_offsets, id_blob = _text_section(ids)
+    name_offsets, name_blob = _text_section(columnar._names)
+    symbol_offsets, symbol_blob = _text_section(columnar.strings.strings)
+    columns = {
+        "average": columnar._average, "total": columnar._total, "seg_avg": columnar._seg_avg,
+        "marks": columnar._marks, "seg_start": columnar._seg_start,
+        "id_offsets": id_offsets, "name_offsets": name_offsets, "symbol_offsets": symbol_offsets,
+        "grade": columnar._grade, "remark": columnar._remark, "first": columnar._first, "last": columnar._last,
+        "count": columnar._count, "fails": columnar._fails,
+        "seg_year": columnar._seg_year, "seg_len": columnar._seg_len, "seg_next": columnar._seg_next,
+        "modules": columnar._modules, "id_order": array("i", sorted(range(len(ids)), key=ids.__getitem__)),
+        "id_blob": id_blob, "name_blob": name_blob, "symbol_blob": symbol_blob,
+    }
+    with open(path, "wb") as f:
+        f.write(bytes(HEADER.size))
+        crc, pos, table = 0, HEADER.size, []
+        for name, typecode in SECTIONS:
+            data = columns[name].tobytes()
+            pad = bytes(-len(data) % 8)
+            table += [pos, len(data)]
+            for chunk in (data, pad):
+                f.write(chunk)
+                crc = zlib.crc32(chunk, crc)
+            pos += len(data) + len(pad)
+        counts = (len(ids), len(columnar._seg_year), len(columnar._marks), len(columnar.strings))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, LITTLE_ENDIAN, crc, *counts, *table))
+    return len(ids)
+
+# ---------------- Lazy columns ----------------
+class _TextColumn:
+    # i-th string of a NUL-joined blob, decoded only when asked for
+    __slots__ = ("offsets", "blob")
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1] - 1]).decode("utf-8")
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def tolist(self):
+        # decode everything at once (one split instead of one slice per string)
+        if not len(self):
+            return []
+        return bytes(self.blob).decode("utf-8").split(SEPARATOR)[:-1]
+
+class _SymbolTable:
+    __slots__ = ("strings",)
+
+    def __init__(self, strings):
+        self.strings = strings
+
+    def __getitem__(self, idx):
+        return self.strings[idx]
+
+    def __len__(self):
+        return len(self.strings)
+
+class _IdIndex:
+    # id -> row lookups by binary search over the sorted id order, no dict is built
+    __slots__ = ("ids", "order")
+
+    def __init__(self, ids, order):
+        self.ids = ids
+        self.order = order
+
+    def __len__(self):
+        return len(self.order)
+
+    def get(self, sid, default=None):
+        lo = bisect_left(range(len(self.order)), sid, key=lambda i: self.ids[self.order[i]])
+        if lo < len(self.order) and self.ids[self.order[lo]] == sid:
+            return self.order[lo]
+        return default
+
+    def __contains__(self, sid):
+        return self.get(sid) is not None
+
+    def __getitem__(self, sid):
+        row = self.get(sid)
+        if row is None:
+            raise KeyError(sid)
+        return row
+
+# ---------------- Reading ----------------
+class Snapshot(ColumnarStore):
+    # read-only store over a memory-mapped snapshot: the columns are memoryviews of the file,
+    # only the pages that are touched are read
+    def __init__(self, path, verify=True):
+        self.path = path
+        self._mmap = self._buffer = None
+        with open(path, "rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise SnapshotError(f"{path} is not a snapshot (empty file).")
+        try:
+            self._open(verify)
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self, verify):
+        buf = memoryview(self._mmap)
+        self._buffer = buf
+        if len(buf) < HEADER.size:
+            raise SnapshotError(f"{self.path} is not a snapshot (file too short).")
+        fields = HEADER.unpack_from(buf)
+        magic, version, byteorder, crc = fields[:4]
+        if magic != MAGIC:
+            raise SnapshotError(f"{self.path} is not a snapshot.")
+        if version != VERSION:
+            raise SnapshotError(f"Unsupported snapshot version {version} (expected {VERSION}).")
+        if byteorder != LITTLE_ENDIAN or sys.byteorder != "little":
+            raise SnapshotError("Snapshot byte order does not match this machine.")
+        if verify:
+            with buf[HEADER.size:] as body:
+                if zlib.crc32(body) != crc:
+                    raise SnapshotError(f"{self.path} is corrupted (checksum mismatch).")
+        table = fields[8:]
+        col = self._columns = {}  # released by close(), also when a later section is bad
+        for k, (name, typecode) in enumerate(SECTIONS):
+            offset, size = table[2 * k], table[2 * k + 1]
+            if offset + size > len(buf):
+                raise SnapshotError(f"{self.path} is truncated.")
+            with buf[offset:offset + size] as section:
+                col[name] = section.cast(typecode)
+        self._average, self._marks, self._seg_start = col["average"], col["marks"], col["seg_start"]
+        self._total, self._count, self._fails, self._seg_avg = col["total"], col["count"], col["fails"], col["seg_avg"]
+        self._grade, self._remark, self._first, self._last = col["grade"], col["remark"], col["first"], col["last"]
+        self._seg_year, self._seg_len, self._seg_next = col["seg_year"], col["seg_len"], col["seg_next"]
+        self._modules = col["modules"]
+        self._ids = _TextColumn(col["id_offsets"], col["id_blob"])
+        self._names = _TextColumn(col["name_offsets"], col["name_blob"])
+        self._rows = _IdIndex(self._ids, col["id_order"])
+        try:
+            self.strings = _SymbolTable(_TextColumn(col["symbol_offsets"], col["symbol_blob"]).tolist())
+        except UnicodeDecodeError:
+            raise SnapshotError(f"{self.path} is corrupted (bad text section).")
+        self._garbage = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # memoryviews must be released before the map can be closed
+        for view in getattr(self, "_columns", {}).values():
+            view.release()
+        self._columns = {}
+        if self._buffer is not None:
+            self._buffer.release()
+            self._buffer = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def _index_rows(self):
+        # a full pass decodes every id anyway, so swap the binary search for a dict
+        if isinstance(self._rows, _IdIndex):
+            self._rows = dict(zip(self._ids, range(len(self._ids))))
+
+    def values(self):
+        self._index_rows()
+        return super().values()
+
+    def items(self):
+        self._index_rows()
+        return super().items()
+
+    # ---------------- Read-only ----------------
+    def _read_only(self, *args):
+        raise SnapshotError("Snapshots are read-only, copy them with to_store() first.")
+
+    clear = put = set_year = set_result = delete = compact = _read_only
+
+    def to_store(self):
+        # copy into an editable ColumnarStore (bulk array copies, no per-mark Python work)
+        store = ColumnarStore()
+        store.strings.strings = list(self.strings.strings)
+        store.strings.ids = {s: i for i, s in enumerate(store.strings.strings)}
+        for name in ("average", "total", "seg_avg", "marks", "seg_start", "grade", "remark", "first", "last",
+                     "count", "fails", "seg_year", "seg_len", "seg_next", "modules"):
+            getattr(store, "_" + name).frombytes(self._columns[name].cast("B"))
+        store._ids = self._ids.tolist()
+        store._names = self._names.tolist()
+        store._rows = dict(zip(store._ids, range(len(store._ids))))
+        return store
+
+    copy = to_store
@@ -0,0 +1,398 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from itertools import groupby
+
+from columnar_store import ColumnarStore
+from csv_io import iter_chunks
+from grading_engine import GradebookError, Person, mark_totals
+
+DB_EXT = ".db"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    row INTEGER PRIMARY KEY,  -- insertion order, kept when a student is replaced
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    average REAL NOT NULL,
+    grade TEXT NOT NULL,
+    remark TEXT NOT NULL,
+    total REAL NOT NULL,  -- running totals of all the student's marks (see ColumnarStore)
+    count INTEGER NOT NULL,
+    fails INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS students_grade ON students (grade);
+CREATE TABLE IF NOT EXISTS years (
+    student INTEGER NOT NULL REFERENCES students (row),
+    position INTEGER NOT NULL,
+    year TEXT NOT NULL,
+    average REAL NOT NULL,
+    PRIMARY KEY (student, position),
+    UNIQUE (student, year)
+);
+CREATE TABLE IF NOT EXISTS marks (
+    student INTEGER NOT NULL,
+    year TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    module TEXT NOT NULL,
+    mark REAL NOT NULL,
+    PRIMARY KEY (student, year, position),
+    FOREIGN KEY (student, year) REFERENCES years (student, year)
+);
+"""
+# cache entry fields
+ROW, NAME, AVERAGE, GRADE, REMARK, TOTAL, COUNT, FAILS, YEARS = range(9)
+
+def _totals(year_data):
+    return mark_totals([m for data in year_data.values() for m in data["marks"]])
+
+def _year_average(marks):
+    return sum(marks)/len(marks) if marks else 0
+
+def _check_lengths(sid, year_data):
+    for data in year_data.values():
+        if len(data["modules"]) != len(data["marks"]):
+            raise GradebookError(f"Student ID {sid}: {len(data['modules'])} modules but {len(data['marks'])} marks.")
+
+# ---------------- Record view ----------------
+class SQLiteRecord(Person):
+    # one student of a SQLiteStore, same interface as grading_engine.Student
+    # name and result come from the store's cache, marks are read from the database when asked for
+    __slots__ = ("_store", "_sid")
+
+    def __init__(self, store, sid):
+        self._store = store
+        self._sid = sid
+
+    def get_id(self):
+        return self._sid
+
+    def get_name(self):
+        return self._store._entry(self._sid)[NAME]
+
+    @property
+    def average(self):
+        return self._store._entry(self._sid)[AVERAGE]
+
+    @property
+    def grade(self):
+        return self._store._entry(self._sid)[GRADE]
+
+    @property
+    def remark(self):
+        return self._store._entry(self._sid)[REMARK]
+
+    @property
+    def year_data(self):
+        return self._store.year_data(self._sid)
+
+    def all_marks(self):
+        return [m for data in self.year_data.values() for m in data["marks"]]
+
+    def module_count(self):
+        return self._store._entry(self._sid)[COUNT]
+
+    def year_averages(self):
+        return self._store.year_averages(self._sid)
+
+    def summary(self):
+        return f"ID:{self._sid} | Name:{self.get_name()} | Average:{self.average:.2f} | Grade:{self.grade} ({self.remark})"
+
+# ---------------- SQLite store ----------------
+class SQLiteStore:
+    # student store kept in a SQLite file (students / years / marks tables, WAL journal)
+    # every write is its own small transaction, so an edit costs O(1) instead of a whole-file rewrite;
+    # the store itself only counts the students when opened, but a Gradebook reads every summary row once
+    # to build its listeners (search index, classifier): that pass is O(n), marks stay on disk until asked for
+    def __init__(self, path):
+        self.path = path
+        # opened on a worker thread and shared with the Tk thread: a background save or export reads the store
+        # while the table keeps reading it, every use of the connection holds the lock
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._cache = {}  # id -> [row, name, average, grade, remark, total, count, fails, {year: average}]
+        self._complete = False  # True once the cache holds every student
+        self._len = self.conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+        self._depth = 0  # open write transactions (batch() and nested writes)
+
+    def close(self):
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------------- Transactions ----------------
+    @contextmanager
+    def _write(self):
+        # one write: a transaction, or a savepoint inside a batch (a failed write is undone on its own)
+        with self._lock:
+            outer = self._depth == 0
+            self.conn.execute("BEGIN" if outer else "SAVEPOINT write")
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self.conn.execute("ROLLBACK" if outer else "ROLLBACK TO write")
+                if not outer: self.conn.execute("RELEASE write")
+                raise
+            else:
+                self.conn.execute("COMMIT" if outer else "RELEASE write")
+            finally:
+                self._depth -= 1
+
+    @contextmanager
+    def batch(self):
+        # group many writes into one transaction (loads, merges)
+        # an exception (or a cancelled task) rolls the whole batch back and drops the cache
+        # (other threads wait for the end of the batch, they would read its uncommitted rows)
+        with self._lock:
+            outer = self._depth == 0
+            if outer: self.conn.execute("BEGIN")
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                if outer:
+                    self.conn.execute("ROLLBACK")
+                    self._reload()
+                raise
+            else:
+                if outer: self.conn.execute("COMMIT")
+            finally:
+                self._depth -= 1
+
+    # ---------------- Cache ----------------
+    def _reload(self):
+        # forget cached rows (after a rollback), they are read again when needed
+        with self._lock:
+            self._cache = {}
+            self._complete = False
+            self._len = self.conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+
+    def _entry(self, sid):
+        entry = self._cache.get(sid)
+        if entry is None and not self._complete:
+            with self._lock:
+                row = self.conn.execute("SELECT row, name, average, grade, remark, total, count, fails FROM students "
+                                        "WHERE id = ?", (sid,)).fetchone()
+                if row is not None:
+                    years = self.conn.execute("SELECT year, average FROM years WHERE student = ? ORDER BY position",
+                                              (row[0],)).fetchall()
+                    entry = self._cache[sid] = [*row, dict(years)]
+        if entry is None:
+            raise KeyError(sid)
+        return entry
+
+    def _load_all(self):
+        # one ordered pass over students joined with their years (no marks)
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT s.row, s.id, s.name, s.average, s.grade, s.remark, s.total, s.count, s.fails, y.year, y.average "
+                "FROM students s LEFT JOIN years y ON y.student = s.row ORDER BY s.row, y.position")
+            cache = {}
+            for key, group in groupby(rows, key=lambda r: r[:9]):
+                years = {r[9]: r[10] for r in group if r[9] is not None}
+                cache[key[1]] = [key[0], *key[2:], years]
+            self._cache = cache
+            self._complete = True
+
+    # ---------------- Mapping interface ----------------
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, sid):
+        try:
+            self._entry(sid)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        if not self._complete:
+            self._load_all()
+        return iter(list(self._cache))
+
+    def __getitem__(self, sid):
+        self._entry(sid)
+        return SQLiteRecord(self, sid)
+
+    def get(self, sid, default=None):
+        return SQLiteRecord(self, sid) if sid in self else default
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        return (SQLiteRecord(self, sid) for sid in self)
+
+    def items(self):
+        return ((sid, SQLiteRecord(self, sid)) for sid in self)
+
+    def copy(self):
+        # in-memory copy
+        store = ColumnarStore()
+        for record in self.values():
+            store.put(record)
+        return store
+
+    # ---------------- Reading ----------------
+    def year_data(self, sid):
+        # rebuild the {year: {"modules": [...], "marks": [...]}} layout, years in the order they were added
+        entry = self._entry(sid)
+        data = {year: {"modules": [], "marks": []} for year in entry[YEARS]}
+        with self._lock:
+            rows = self.conn.execute("SELECT year, module, mark FROM marks WHERE student = ? ORDER BY year, position",
+                                     (entry[ROW],)).fetchall()
+        for year, module, mark in rows:
+            data[year]["modules"].append(module)
+            data[year]["marks"].append(mark)
+        return data
+
+    def all_marks(self, sid):
+        return [m for data in self.year_data(sid).values() for m in data["marks"]]
+
+    def module_count(self, sid):
+        return self._entry(sid)[COUNT]
+
+    def aggregates(self, sid):
+        entry = self._entry(sid)
+        return entry[TOTAL], entry[COUNT], entry[FAILS]
+
+    def year_averages(self, sid):
+        return dict(self._entry(sid)[YEARS])
+
+    # ---------------- Writing ----------------
+    def _year_rows(self, row, year_data):
+        # (years rows, marks rows) of one student
+        years = [(row, k, year, _year_average(data["marks"])) for k, (year, data) in enumerate(year_data.items())]
+        marks = [(row, year, k, module, mark) for year, data in year_data.items()
+                 for k, (module, mark) in enumerate(zip(data["modules"], data["marks"]))]
+        return years, marks
+
+    def _insert_rows(self, students, years, marks):
+        self.conn.executemany("INSERT INTO students (row, id, name, average, grade, remark, total, count, fails) "
+                              "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", students)
+        self.conn.executemany("INSERT INTO years (student, position, year, average) VALUES (?, ?, ?, ?)", years)
+        self.conn.executemany("INSERT INTO marks (student, year, position, module, mark) VALUES (?, ?, ?, ?, ?)", marks)
+
+    def put(self, student):
+        # store a whole record, replacing any record with the same id (its place in the order is kept)
+        sid, name, year_data = student.get_id(), student.get_name(), student.year_data
+        _check_lengths(sid, year_data)
+        result = (student.average, student.grade, student.remark)
+        totals = _totals(year_data)
+        existing = sid in self
+        with self._write():
+            if existing:
+                row = self._cache[sid][ROW]
+                self.conn.execute("UPDATE students SET name = ?, average = ?, grade = ?, remark = ?, total = ?, "
+                                  "count = ?, fails = ? WHERE row = ?", (name, *result, *totals, row))
+                self.conn.execute("DELETE FROM marks WHERE student = ?", (row,))
+                self.conn.execute("DELETE FROM years WHERE student = ?", (row,))
+            else:
+                row = self.conn.execute("INSERT INTO students (id, name, average, grade, remark, total, count, fails) "
+                                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (sid, name, *result, *totals)).lastrowid
+            self._insert_rows([], *self._year_rows(row, year_data))
+        if not existing: self._len += 1
+        self._cache[sid] = [row, name, *result, *totals, {y: _year_average(d["marks"]) for y, d in year_data.items()}]
+        return SQLiteRecord(self, sid)
+
+    def put_many(self, students, chunk_size=1000):
+        # bulk put (e.g. saving a whole cohort) in one transaction: new students are written
+        # with one executemany per table and chunk, replaced ones go through put()
+        pending = {}  # id -> cache entry of rows built but not inserted yet
+        rows = ([], [], [])  # students, years, marks rows
+
+        def flush():
+            with self._write():
+                self._insert_rows(*rows)
+            self._cache.update(pending)
+            self._len += len(pending)
+            pending.clear()
+            for part in rows: part.clear()
+
+        count = 0
+        with self.batch():
+            next_row = self.conn.execute("SELECT COALESCE(MAX(row), 0) + 1 FROM students").fetchone()[0]
+            for chunk in iter_chunks(students, chunk_size):
+                for student in chunk:
+                    sid, year_data = student.get_id(), student.year_data
+                    if sid in pending or sid in self:
+                        flush()
+                        self.put(student)
+                        continue
+                    _check_lengths(sid, year_data)
+                    result, totals = (student.average, student.grade, student.remark), _totals(year_data)
+                    years, marks = self._year_rows(next_row, year_data)
+                    rows[0].append((next_row, sid, student.get_name(), *result, *totals))
+                    rows[1].extend(years)
+                    rows[2].extend(marks)
+                    pending[sid] = [next_row, student.get_name(), *result, *totals, {y[2]: y[3] for y in years}]
+                    next_row += 1
+                flush()
+                count += len(chunk)
+        return count
+
+    def set_year(self, sid, year, modules, marks):
+        # add a year, or replace its marks
+        _check_lengths(sid, {year: {"modules": modules, "marks": marks}})
+        entry = self._entry(sid)
+        row, years = entry[ROW], entry[YEARS]
+        year_data = self.year_data(sid)
+        year_data[year] = {"modules": list(modules), "marks": list(marks)}
+        totals = _totals(year_data)
+        average = _year_average(marks)
+        with self._write():
+            if year in years:
+                self.conn.execute("DELETE FROM marks WHERE student = ? AND year = ?", (row, year))
+                self.conn.execute("UPDATE years SET average = ? WHERE student = ? AND year = ?", (average, row, year))
+            else:
+                position = self.conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM years WHERE student = ?",
+                                             (row,)).fetchone()[0]
+                self.conn.execute("INSERT INTO years (student, position, year, average) VALUES (?, ?, ?, ?)",
+                                  (row, position, year, average))
+            self.conn.executemany("INSERT INTO marks (student, year, position, module, mark) VALUES (?, ?, ?, ?, ?)",
+                                  [(row, year, k, module, mark) for k, (module, mark) in enumerate(zip(modules, marks))])
+            self.conn.execute("UPDATE students SET total = ?, count = ?, fails = ? WHERE row = ?", (*totals, row))
+        years[year] = average
+        entry[TOTAL:FAILS + 1] = totals
+
+    def set_result(self, sid, average, grade, remark):
+        entry = self._entry(sid)
+        with self._write():
+            self.conn.execute("UPDATE students SET average = ?, grade = ?, remark = ? WHERE row = ?",
+                              (average, grade, remark, entry[ROW]))
+        entry[AVERAGE:REMARK + 1] = [average, grade, remark]
+
+    def delete(self, sid):
+        row = self._entry(sid)[ROW]
+        with self._write():
+            self.conn.execute("DELETE FROM marks WHERE student = ?", (row,))
+            self.conn.execute("DELETE FROM years WHERE student = ?", (row,))
+            self.conn.execute("DELETE FROM students WHERE row = ?", (row,))
+        del self._cache[sid]
+        self._len -= 1
+
+    def clear(self):
+        with self._write():
+            self.conn.execute("DELETE FROM marks")
+            self.conn.execute("DELETE FROM years")
+            self.conn.execute("DELETE FROM students")
+        self._cache = {}
+        self._complete = True
+        self._len = 0
+
+def write_database(path, store):
+    # write any store into a database file (replacing its contents) in one transaction; returns the number of students
+    with SQLiteStore(path) as db:
+        with db.batch():
+            db.clear()
+            return db.put_many(store.values())
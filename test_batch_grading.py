@@ -0,0 +1,33 @@
+import random
+
+from batch_grading import grade_gradebook
+from grading_engine import YEAR_MODULES, Gradebook, Student, calculate_grade
+
+def shuffled_gradebook(n, seed=1):
+    # students whose years were added in any order, some with missing years
+    rng = random.Random(seed)
+    gradebook = Gradebook()
+    for k in range(n):
+        years = rng.sample(list(YEAR_MODULES), rng.randint(1, 3))
+        year_data = {}
+        for y in years:
+            modules = YEAR_MODULES[y][:rng.randint(1, 4)]
+            year_data[y] = {"modules": list(modules), "marks": [rng.uniform(0, 100) for _ in modules]}
+        student = Student(str(k), "Student", year_data)
+        student.regrade()
+        gradebook.put(student)
+    return gradebook
+
+def test_grade_gradebook_matches_calculate_grade_for_any_year_order():
+    gradebook = shuffled_gradebook(5000)
+    ids, years, results = grade_gradebook(gradebook)
+    for i, sid in enumerate(ids):
+        student = gradebook[sid]
+        average, grade, remark = calculate_grade(student.all_marks())
+        assert results["average"][i] == average
+        assert (results["grade"][i], results["remark"][i]) == (grade, remark)
+        for k, y in enumerate(years):
+            if y in student.year_data:
+                assert results["year_averages"][i, k] == calculate_grade(student.year_data[y]["marks"])[0]
+            else:
+                assert results["year_averages"][i, k] != results["year_averages"][i, k]  # NaN
@@ -0,0 +1,46 @@
+from classification import UNCLASSIFIED, ClassificationRules, degree_result, year_result
+from grading_scheme import ModuleCatalog
+
+def year(modules, marks):
+    return {"modules": list(modules), "marks": list(marks)}
+
+def test_one_near_miss_is_compensated_by_the_year_average():
+    # 30 credits each: one module at 35 within the 30-credit limit, year average 53.75
+    result = year_result("Year 2", year("ABCD", [35, 60, 60, 60]))
+    assert (result.passed, result.failed, result.compensated) == (True, [], ["A"])
+    assert (result.average, result.credits) == (53.75, 120)
+
+def test_no_compensation_below_the_minimum_mark_or_over_the_credit_limit():
+    result = year_result("Year 2", year("ABCD", [25, 70, 70, 70]))
+    assert (result.passed, result.failed, result.compensated) == (False, ["A"], [])
+    result = year_result("Year 2", year("ABCD", [35, 35, 80, 80]))
+    assert (result.passed, result.failed, result.compensated) == (False, ["A", "B"], [])
+    # a low year average blocks compensation even for a single near miss
+    result = year_result("Year 2", year("ABCD", [35, 40, 40, 40]))
+    assert (result.passed, result.failed) == (False, ["A"])
+
+def test_compensation_limit_counts_module_credits():
+    catalog = ModuleCatalog({"Year 2": [{"name": "A", "credits": 15}, {"name": "B", "credits": 15}, "C", "D"]})
+    result = year_result("Year 2", year("ABCD", [35, 35, 60, 60]), catalog)
+    assert (result.passed, result.compensated) == (True, ["A", "B"])
+
+def test_resit_is_capped_and_the_better_attempt_kept():
+    # A failed at 20 then resat at 75: the resit counts 40
+    result = year_result("Year 2", year("ABCDA", [20, 60, 60, 60, 75]))
+    assert (result.average, result.credits, result.passed) == (55.0, 120, True)
+    # a first attempt above the cap is kept over a capped resit
+    result = year_result("Year 2", year("ABA", [45, 60, 90]))
+    assert result.average == 52.5
+    rules = ClassificationRules(resit_cap=100)
+    assert year_result("Year 2", year("ABA", [45, 60, 90]), rules=rules).average == 75.0
+
+def test_degree_is_weighted_by_year_and_failed_by_any_year():
+    rules = ClassificationRules({"Year 1": 0, "Year 2": 40, "Year 3": 60})
+    results = {"Year 1": year_result("Year 1", year("AB", [90, 90])),
+               "Year 2": year_result("Year 2", year("AB", [55, 65]))}
+    assert degree_result(results, rules) == (60.0, "Upper Second (2:1)", False)
+    results["Year 3"] = year_result("Year 3", year("AB", [70, 74]))
+    assert degree_result(results, rules) == (67.2, "Upper Second (2:1)", True)
+    results["Year 1"] = year_result("Year 1", year("AB", [10, 90]))
+    assert degree_result(results, rules)[1] == "Fail"
+    assert degree_result({"Year 1": year_result("Year 1", year("A", [80]))}, rules)[1] == UNCLASSIFIED
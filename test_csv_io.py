@@ -0,0 +1,70 @@
+import io
+
+from columnar_store import ColumnarStore
+from csv_io import CSV_HEADER, MAX_ROW_ERRORS, load_students, write_students
+from grading_engine import Gradebook
+from grading_scheme import DEFAULT_SCHEME
+
+HEADER = ",".join(CSV_HEADER) + "\n"
+
+def load(text, verify=DEFAULT_SCHEME, lines=None):
+    store = ColumnarStore()
+    report = load_students(io.StringIO(text, newline=""), store, verify, path="a.csv", lines=lines)
+    return store, report
+
+def test_round_trip_keeps_every_student():
+    gradebook = Gradebook()
+    gradebook.add_student("1", "Ann Lee", "Year 1", ["A", "B"], [72.5, 68.0])
+    gradebook.add_student("2", "Bob Ray", "Year 2", ["C"], [35.0])
+    buffer = io.StringIO()
+    write_students(buffer, gradebook.students.values())
+    store, report = load(buffer.getvalue())
+    assert (report.rows, report.loaded, report.errors) == (2, 2, [])
+    for sid, student in gradebook.students.items():
+        assert store[sid].year_data == student.year_data
+        assert (store[sid].grade, store[sid].remark) == (student.grade, student.remark)
+
+def test_bad_rows_are_skipped_with_their_line_and_column():
+    store, report = load(HEADER +
+                         "1,Ann Lee,Year 1:A:50.0,50.00,C,Good\n"
+                         "x!,Bob Ray,Year 1:A:50.0,50.00,C,Good\n"
+                         "3,Cy Po,Year 1:A|B:50.0,50.00,C,Good\n"
+                         "4,Di Fox,Year 1:A:150.0,150.00,A,Excellent\n"
+                         "5,Ed Hu,Year 1:A:50.0\n"
+                         "1,Ann Lee,Year 2:B:60.0,60.00,B,Very Good\n")
+    assert list(store) == ["1"]
+    found = [(e.line, e.column, e.action) for e in report.errors]
+    assert found == [(3, "ID", "skipped"), (4, "Year_Data", "skipped"), (5, "Year_Data", "skipped"),
+                     (6, None, "skipped"), (7, "ID", "skipped")]
+    assert "2 modules but 1 marks" in report.errors[1].message
+    assert (report.rows, report.loaded, report.skipped) == (6, 1, 5)
+
+def test_wrong_stored_result_is_regraded_and_reported():
+    store, report = load(HEADER + "1,Ann Lee,Year 1:A|B:80.0|90.0,50.00,C,Good\n")
+    assert (store["1"].average, store["1"].grade) == (85.0, "A")
+    assert [(e.line, e.column, e.action) for e in report.errors] == [(2, "Grade", "regraded")]
+    assert report.skipped == 0 and "1 regraded" in report.summary()
+
+def test_stored_results_are_trusted_without_a_scheme():
+    store, report = load(HEADER + "1,Ann Lee,Year 1:A:80.0,50.00,C,Good\n", verify=None)
+    assert (store["1"].average, store["1"].grade, report.errors) == (50.0, "C", [])
+
+def test_missing_columns_and_empty_files_stop_the_load():
+    _, report = load("ID,Name\n1,Ann Lee\n")
+    assert [(e.line, e.message) for e in report.errors] == [(1, "missing column(s) Year_Data")]
+    _, report = load("")
+    assert report.errors[0].message == "empty file" and report.loaded == 0
+
+def test_errors_beyond_the_limit_are_counted_only():
+    bad = "".join(f"{k},Ann Lee,Year 1:A:x,1.00,F,Fail\n" for k in range(MAX_ROW_ERRORS + 5))
+    _, report = load(HEADER + bad)
+    assert len(report.errors) == MAX_ROW_ERRORS
+    assert report.error_count() == MAX_ROW_ERRORS + 5
+    assert report.to_dict()["errors"] == MAX_ROW_ERRORS + 5
+
+def test_lines_record_where_every_loaded_id_is():
+    lines = {}
+    load(HEADER + "1,Ann Lee,Year 1:A:50.0,50.00,C,Good\n\n"
+                  "bad,row\n"
+                  "2,Bob Ray,Year 1:A:60.0,60.00,B,Very Good\n", lines=lines)
+    assert lines == {"1": 2, "2": 5}
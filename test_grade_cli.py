@@ -0,0 +1,60 @@
+import csv
+import json
+
+import pytest
+
+from csv_io import CSV_HEADER
+from grade_cli import EXIT_ERROR, EXIT_OK, EXIT_PROBLEMS, EXIT_USAGE, main
+
+HEADER = ",".join(CSV_HEADER) + "\n"
+
+def cohort(tmp_path, name, rows):
+    path = tmp_path / name
+    path.write_text(HEADER + "".join(rows), newline="")
+    return str(path)
+
+def ids(path):
+    with open(path, newline="") as f:
+        return [row["ID"] for row in csv.DictReader(f)]
+
+def test_clean_grade_writes_every_row(tmp_path):
+    path = cohort(tmp_path, "a.csv", ["1,Ann Lee,Year 1:A|B:80.0|90.0,0.00,F,Fail\n",
+                                      "2,Bob Ray,Year 1:A:55.0,55.00,C,Good\n"])
+    output = str(tmp_path / "out.csv")
+    assert main(["-q", "grade", path, "-o", output]) == EXIT_OK
+    with open(output, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [(r["ID"], r["Average"], r["Grade"]) for r in rows] == [("1", "85.00", "A"), ("2", "55.00", "C")]
+
+def test_bad_rows_are_reported_and_the_good_ones_kept(tmp_path, capsys):
+    path = cohort(tmp_path, "a.csv", ["1,Ann Lee,Year 1:A:80.0,80.00,A,Excellent\n",
+                                      "2,Bob Ray,Year 1:A:x,0.00,F,Fail\n"])
+    output = str(tmp_path / "out.csv")
+    assert main(["-q", "grade", path, "-o", output]) == EXIT_PROBLEMS
+    assert ids(output) == ["1"]
+    assert "a.csv:3" in capsys.readouterr().err
+
+def test_validate_reports_conflicts_across_inputs(tmp_path, capsys):
+    first = cohort(tmp_path, "a.csv", ["1,Ann Lee,Year 1:A:80.0,80.00,A,Excellent\n"])
+    second = cohort(tmp_path, "b.csv", ["2,Bob Ray,Year 1:A:60.0,60.00,B,Very Good\n",
+                                        "1,Ann Lee,Year 1:B:70.0,70.00,A,Excellent\n"])
+    report = str(tmp_path / "report.json")
+    assert main(["-q", "validate", first, second, "--report", report]) == EXIT_PROBLEMS
+    assert "already has marks for Year 1" in capsys.readouterr().err
+    with open(report) as f:
+        files = json.load(f)["files"]
+    assert [(f["file"], f["errors"]) for f in files] == [(first, 0), (second, 1)]
+    assert [(e["line"], e["column"], e["action"]) for e in files[1]["listed"]] == [(3, "ID", "conflict")]
+    assert main(["-q", "validate", first]) == EXIT_OK
+
+def test_missing_input_leaves_no_output(tmp_path, capsys):
+    output = tmp_path / "out.csv"
+    assert main(["-q", "grade", str(tmp_path / "missing.csv"), "-o", str(output)]) == EXIT_ERROR
+    assert "error:" in capsys.readouterr().err
+    assert list(tmp_path.iterdir()) == []
+
+def test_bad_arguments_exit_with_the_usage_code():
+    for argv in ([], ["grade"], ["rank", "a.csv"], ["grade", "a.csv", "-j", "many"]):
+        with pytest.raises(SystemExit) as exit_info:
+            main(argv)
+        assert exit_info.value.code == EXIT_USAGE
@@ -0,0 +1,67 @@
+import pytest
+
+from columnar_store import ColumnarStore
+from grading_engine import Gradebook
+from snapshot import Snapshot, SnapshotError, write_snapshot
+
+def sample_gradebook():
+    # a columnar gradebook with replaced years and a deleted student (stale marks to compact away)
+    gradebook = Gradebook(ColumnarStore())
+    for k in range(50):
+        gradebook.add_student(str(100 + k), f"Student {chr(65 + k % 26)}", "Year 1", ["A", "B"], [40.0 + k, 55.5])
+        if k % 3 == 0:
+            gradebook.add_student(str(100 + k), f"Student {chr(65 + k % 26)}", "Year 2", ["C"], [float(k)])
+    gradebook.update_year("101", "Year 1", ["A", "B", "A"], [30.0, 60.0, 45.0])
+    gradebook.delete_student("110")
+    return gradebook
+
+def same_records(a, b):
+    assert list(a) == list(b)
+    for sid in a:
+        x, y = a[sid], b[sid]
+        assert (x.get_name(), x.year_data, x.average, x.grade, x.remark) == \
+               (y.get_name(), y.year_data, y.average, y.grade, y.remark)
+
+def test_round_trip_and_lookups(tmp_path):
+    gradebook = sample_gradebook()
+    path = str(tmp_path / "cohort.sgcs")
+    assert write_snapshot(path, gradebook.students) == len(gradebook.students)
+    with Snapshot(path) as snap:
+        assert len(snap) == 49
+        assert "110" not in snap and snap.get("999") is None
+        assert snap["101"].year_data == gradebook.students["101"].year_data
+        same_records(gradebook.students, snap)
+        same_records(gradebook.students, snap.to_store())
+
+def test_snapshot_is_read_only(tmp_path):
+    path = str(tmp_path / "cohort.sgcs")
+    write_snapshot(path, sample_gradebook().students)
+    with Snapshot(path) as snap:
+        with pytest.raises(SnapshotError):
+            snap.delete("101")
+        store = snap.to_store()
+    store.delete("101")
+    assert "101" not in store
+
+def test_corrupted_file_is_rejected_by_the_checksum(tmp_path):
+    path = tmp_path / "cohort.sgcs"
+    write_snapshot(str(path), sample_gradebook().students)
+    data = bytearray(path.read_bytes())
+    data[-20] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(SnapshotError, match="checksum"):
+        Snapshot(str(path))
+    with pytest.raises(SnapshotError, match="text"):
+        Snapshot(str(path), verify=False)  # the symbol table is decoded when the file is opened
+
+def test_other_files_are_not_snapshots(tmp_path):
+    for name, data in (("empty.sgcs", b""), ("short.sgcs", b"SGCSNAP"), ("text.sgcs", b"ID,Name\n" * 100)):
+        path = tmp_path / name
+        path.write_bytes(data)
+        with pytest.raises(SnapshotError):
+            Snapshot(str(path))
+    path = tmp_path / "cut.sgcs"
+    write_snapshot(str(path), sample_gradebook().students)
+    path.write_bytes(path.read_bytes()[:-64])
+    with pytest.raises(SnapshotError):
+        Snapshot(str(path), verify=False)
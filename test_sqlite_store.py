@@ -0,0 +1,60 @@
+import sqlite3
+
+import pytest
+
+from grading_engine import Gradebook, Student
+from grading_scheme import DEFAULT_SCHEME
+from sqlite_store import SQLiteStore
+
+def student(sid, name, marks):
+    record = Student(sid, name, {"Year 1": {"modules": [f"M{k}" for k in range(len(marks))], "marks": list(marks)}})
+    record.regrade(DEFAULT_SCHEME)
+    return record
+
+def stored_ids(path):
+    # read the file from a fresh connection, so only committed rows are seen
+    conn = sqlite3.connect(path)
+    try:
+        return [sid for sid, in conn.execute("SELECT id FROM students ORDER BY row")]
+    finally:
+        conn.close()
+
+def test_failed_write_in_a_batch_undoes_only_itself(tmp_path):
+    path = str(tmp_path / "cohort.db")
+    with SQLiteStore(path) as store:
+        with store.batch():
+            store.put(student("1", "Ann Lee", [70.0]))
+            with pytest.raises(ValueError):
+                with store._write():
+                    store.conn.execute("DELETE FROM students")
+                    raise ValueError("write failed")
+            store.put(student("2", "Bob Ray", [50.0]))
+        assert list(store) == ["1", "2"]
+    assert stored_ids(path) == ["1", "2"]
+
+def test_failed_batch_rolls_everything_back(tmp_path):
+    path = str(tmp_path / "cohort.db")
+    with SQLiteStore(path) as store:
+        store.put(student("1", "Ann Lee", [70.0]))
+        with pytest.raises(RuntimeError):
+            with store.batch():
+                store.put(student("2", "Bob Ray", [50.0]))
+                store.delete("1")
+                raise RuntimeError("cancelled")
+        assert (len(store), list(store)) == (1, ["1"])
+        assert store["1"].year_data == {"Year 1": {"modules": ["M0"], "marks": [70.0]}}
+    assert stored_ids(path) == ["1"]
+
+def test_gradebook_changes_survive_reopening(tmp_path):
+    path = str(tmp_path / "cohort.db")
+    gradebook = Gradebook(SQLiteStore(path))
+    gradebook.add_student("1", "Ann Lee", "Year 1", ["A", "B"], [72.5, 68.0])
+    gradebook.add_student("2", "Bob Ray", "Year 1", ["A"], [35.0])
+    gradebook.add_student("3", "Cy Po", "Year 1", ["A"], [55.0])
+    gradebook.update_year("2", "Year 1", ["A", "C"], [45.0, 65.0])
+    gradebook.delete_student("3")
+    gradebook.students.close()
+    with SQLiteStore(path) as store:
+        assert list(store) == ["1", "2"]
+        assert store["2"].year_data == {"Year 1": {"modules": ["A", "C"], "marks": [45.0, 65.0]}}
+        assert (store["2"].average, store["2"].grade) == (55.0, "C")
@@ -0,0 +1,161 @@
+from tkinter import ttk
+
+# ---------------- Virtual table ----------------
+class VirtualTable:
+    # ttk.Treeview that only holds the rows currently on screen
+    # the full row order is a list of ids, the tree items are reused as the user scrolls
+    def __init__(self, parent, columns, row_values, height=8):
+        self.row_values = row_values  # id -> tuple of column values
+        self.height = height  # visible rows
+        self.ids = []  # every row id, in display order
+        self.positions = {}  # id -> index in self.ids
+        self.indexed = 0  # self.positions is up to date for ids[:indexed]
+        self.top = 0  # index of the first visible row
+        self.visible = []  # ids shown in the tree items, top to bottom
+        self.selected = None  # selected id (kept while it scrolls out of view)
+
+        self.tree = ttk.Treeview(parent, columns=columns, show="headings", height=height, selectmode="browse")
+        self.vsb = ttk.Scrollbar(parent, orient="vertical", command=self.yview)
+        self.hsb = ttk.Scrollbar(parent, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscroll=self.hsb.set)
+        self.vsb.pack(side="right", fill="y")
+        self.hsb.pack(side="bottom", fill="x")
+        self.tree.pack(fill="both", expand=True)
+
+        # scrolling
+        self.tree.bind("<MouseWheel>", self.on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Up>", lambda e: self.move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self.move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self.move_selection(-self.height))
+        self.tree.bind("<Next>", lambda e: self.move_selection(self.height))
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+
+    # ---------------- Rows ----------------
+    def __len__(self):
+        return len(self.ids)
+
+    def position(self, sid):
+        # index of an id, None if it is not in the table
+        if self.indexed < len(self.ids):
+            # only the rows after the last insert/delete point are renumbered
+            for i in range(self.indexed, len(self.ids)):
+                self.positions[self.ids[i]] = i
+            self.indexed = len(self.ids)
+        return self.positions.get(sid)
+
+    def set_ids(self, ids):
+        # replace every row (only the visible ones are drawn)
+        self.ids = list(ids)
+        self.positions = {}
+        self.indexed = 0
+        self.top = 0
+        if self.selected is not None and self.position(self.selected) is None:
+            self.selected = None
+        self.render()
+
+    def append(self, sid):
+        self.ids.append(sid)
+        self.see(sid)
+
+    def remove(self, sid):
+        pos = self.position(sid)
+        if pos is None: return
+        del self.ids[pos]
+        del self.positions[sid]
+        self.indexed = min(self.indexed, pos)
+        if self.selected == sid:
+            self.selected = None
+        self.render()
+
+    def clear(self):
+        self.set_ids([])
+
+    def refresh(self, sid):
+        # redraw one row if it is on screen
+        if sid in self.visible:
+            slot = self.visible.index(sid)
+            self.tree.item(self.item_id(slot), values=self.row_values(sid))
+
+    def selected_id(self):
+        return self.selected
+
+    # ---------------- Drawing ----------------
+    def item_id(self, slot):
+        return f"row{slot}"
+
+    def render(self):
+        # fill the visible tree items from self.top
+        self.top = max(0, min(self.top, len(self.ids) - self.height))
+        self.visible = self.ids[self.top:self.top + self.height]
+        for slot, sid in enumerate(self.visible):
+            iid = self.item_id(slot)
+            tag = "evenrow" if (self.top + slot) % 2 == 0 else "oddrow"
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=self.row_values(sid), tags=(tag,))
+            else:
+                self.tree.insert("", "end", iid=iid, values=self.row_values(sid), tags=(tag,))
+        for slot in range(len(self.visible), self.height):
+            if self.tree.exists(self.item_id(slot)):
+                self.tree.delete(self.item_id(slot))
+        # keep the tree selection in step with the selected id
+        if self.selected in self.visible:
+            iid = self.item_id(self.visible.index(self.selected))
+            if self.tree.selection() != (iid,):
+                self.tree.selection_set(iid)
+        elif self.tree.selection():
+            self.tree.selection_set(())
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        if not self.ids:
+            self.vsb.set(0, 1)
+            return
+        total = len(self.ids)
+        self.vsb.set(self.top / total, min(1, (self.top + self.height) / total))
+
+    # ---------------- Scrolling ----------------
+    def yview(self, *args):
+        # vertical scrollbar command: ("moveto", fraction) or ("scroll", n, "units"/"pages")
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.ids))
+            self.render()
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self.height if args[2] == "pages" else 1)
+            self.scroll(step)
+
+    def scroll(self, rows):
+        self.top += rows
+        self.render()
+        return "break"
+
+    def on_wheel(self, event):
+        # Windows/macOS wheel event (delta is a multiple of 120 on Windows)
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def see(self, sid):
+        # scroll so that a row is visible
+        pos = self.position(sid)
+        if pos is None: return
+        if pos < self.top:
+            self.top = pos
+        elif pos >= self.top + self.height:
+            self.top = pos - self.height + 1
+        self.render()
+
+    # ---------------- Selection ----------------
+    def on_select(self, event=None):
+        selection = self.tree.selection()
+        if selection:
+            slot = int(selection[0][3:])
+            if slot < len(self.visible):
+                self.selected = self.visible[slot]
+
+    def move_selection(self, step):
+        if not self.ids: return "break"
+        pos = self.position(self.selected) if self.selected is not None else None
+        pos = 0 if pos is None else max(0, min(len(self.ids) - 1, pos + step))
+        self.selected = self.ids[pos]
+        self.see(self.selected)
+        return "break"